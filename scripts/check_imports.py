@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""导入耗时检查 - 防止重依赖回到模块顶层
+
+在新的解释器中逐个导入下列模块，检查：
+- 没有加载禁止的重依赖（Web 服务不加载 pandas / yfinance，抓取模块导入时不加载任何抓取依赖）
+- 累计导入耗时不超过预算（预算留有余量，只用于发现数量级上的退化）
+
+有违反时以非零状态退出，可在部署前或 CI 中运行：python scripts/check_imports.py
+"""
+
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from src.utils.profiling import import_times
+
+# 抓取相关的重依赖（只应在抓取函数内部导入）
+SCRAPER_DEPS = {'yfinance', 'finnhub', 'pandas', 'numpy', 'dotenv', 'requests', 'bs4'}
+
+# 模块 -> (禁止加载的顶层包, 导入耗时预算秒)
+CHECKS = {
+    'src.scrapers': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.options': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.news': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.ratings': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.econ_calendar': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.calendar_sources': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.earnings': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.stock_info': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.ticker_info': (SCRAPER_DEPS, 0.3),
+    'src.scrapers.quotes': (SCRAPER_DEPS, 0.3),
+    'src.generators.build': (SCRAPER_DEPS, 0.5),
+    'src.generators.backfill': (SCRAPER_DEPS, 0.5),
+    'src.server.app': ({'pandas', 'numpy', 'yfinance', 'finnhub'}, 1.5),
+}
+
+# 超预算时列出的最耗时导入条数
+TOP_IMPORTS = 5
+
+
+def check(module: str, forbidden: set, budget: float) -> list:
+    """返回该模块的问题列表（空列表表示通过）"""
+    entries = import_times(module)
+    loaded = {name.split('.')[0] for _, name, _, _ in entries}
+    seconds = next((cum for depth, name, _, cum in entries if depth == 0 and name == module), 0) / 1e6
+    print(f"{module:<32} {seconds * 1000:8.1f} ms")
+
+    problems = [f"{module} imports {dep}" for dep in sorted(loaded & forbidden)]
+    if seconds > budget:
+        problems.append(f"{module} import took {seconds:.2f}s (budget {budget:.2f}s)")
+        heaviest = sorted(entries, key=lambda e: e[2], reverse=True)[:TOP_IMPORTS]
+        problems.extend(f"    {name}: {self_us / 1000:.1f} ms" for _, name, self_us, _ in heaviest)
+    return problems
+
+
+def main() -> int:
+    problems = []
+    for module, (forbidden, budget) in CHECKS.items():
+        problems.extend(check(module, forbidden, budget))
+
+    if problems:
+        print("\nImport check failed:")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+    print("\nImport check passed")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
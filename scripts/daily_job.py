@@ -1,32 +1,58 @@
 #!/usr/bin/env python3
 """每日定时任务 - 抓取数据并生成报告"""
 
+import argparse
 import subprocess
 import sys
 from datetime import datetime
 from pathlib import Path
 
 BASE_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from src.utils import metrics
+from src.utils.profiling import Profiler
+
+# 抓取模块在数据源不可用时的退出码（与 src.scrapers.base.EXIT_SOURCE_DOWN 一致）
+EXIT_SOURCE_DOWN = 3
+
+# 智能分析总耗时上限（秒），超时的部分使用缓存或原始标题
+ANALYSIS_BUDGET = 45
+
+# --profile 时的剖析器：各步骤改为在本进程内运行，结果写入 profiles/
+PROFILER = None
 
 def log(message: str):
     """打印带时间戳的日志"""
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     print(f"[{timestamp}] {message}")
 
+def run_module(module: str, args: list = (), timeout: float = 300) -> subprocess.CompletedProcess:
+    """运行一个步骤模块：默认在子进程中运行，剖析模式下在本进程内运行"""
+    if PROFILER:
+        return PROFILER.run_module(module, list(args))
+    return subprocess.run(
+        [sys.executable, '-m', module, *args],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+
 def run_scraper(name: str, module: str) -> bool:
     """运行单个数据抓取模块"""
     log(f"开始抓取: {name}")
     try:
-        result = subprocess.run(
-            [sys.executable, '-m', module],
-            cwd=BASE_DIR,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5分钟超时
-        )
+        with metrics.span('job', step=module):
+            result = run_module(module, timeout=300)  # 5分钟超时
         if result.returncode == 0:
             log(f"✓ {name} 完成")
             return True
+        elif result.returncode == EXIT_SOURCE_DOWN:
+            # 数据源故障或已熔断：上次数据保留并标记为过期
+            reason = (result.stdout.strip().splitlines() or [''])[-1]
+            log(f"✗ {name} 数据源不可用，沿用上次数据: {reason}")
+            return False
         else:
             log(f"✗ {name} 失败: {result.stderr}")
             return False
@@ -41,13 +67,8 @@ def run_build() -> bool:
     """生成报告"""
     log("开始生成报告")
     try:
-        result = subprocess.run(
-            [sys.executable, '-m', 'src.generators.build', '--type', 'combined'],
-            cwd=BASE_DIR,
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
+        with metrics.span('job', step='src.generators.build'):
+            result = run_module('src.generators.build', ['--type', 'combined'], timeout=60)
         if result.returncode == 0:
             log("✓ 报告生成完成")
             return True
@@ -59,31 +80,37 @@ def run_build() -> bool:
         return False
 
 def run_analysis() -> bool:
-    """运行 Claude 新闻分析"""
-    log("开始 Claude 智能分析")
+    """运行新闻智能分析（有 claude 命令时用 Claude，否则用本地启发式后端）"""
+    log("开始智能分析")
     try:
-        result = subprocess.run(
-            [sys.executable, '-m', 'src.analyzers.news_analyzer'],
-            cwd=BASE_DIR,
-            capture_output=True,
-            text=True,
-            timeout=120  # 2分钟超时
-        )
+        with metrics.span('job', step='src.analyzers.news_analyzer'):
+            result = run_module('src.analyzers.news_analyzer',
+                                ['--backend', 'auto', '--budget', str(ANALYSIS_BUDGET)],
+                                timeout=ANALYSIS_BUDGET + 30)
         if result.returncode == 0:
-            log("✓ Claude 分析完成")
+            log("✓ 智能分析完成")
             return True
         else:
-            log(f"✗ Claude 分析失败: {result.stderr}")
+            log(f"✗ 智能分析失败: {result.stderr}")
             return False
     except subprocess.TimeoutExpired:
-        log("✗ Claude 分析超时")
+        log("✗ 智能分析超时")
         return False
     except Exception as e:
-        log(f"✗ Claude 分析错误: {e}")
+        log(f"✗ 智能分析错误: {e}")
         return False
 
 
 def main():
+    global PROFILER
+    parser = argparse.ArgumentParser(description='每日数据更新任务')
+    parser.add_argument('--profile', action='store_true',
+                        help='在本进程内依次运行各步骤并剖析（cProfile、采样火焰图、导入耗时），输出到 profiles/')
+    args = parser.parse_args()
+    if args.profile:
+        PROFILER = Profiler('daily_job')
+
+    metrics.start_run('daily_job')
     log("=" * 50)
     log("开始每日数据更新任务")
     log("=" * 50)
@@ -96,6 +123,7 @@ def main():
         ("财经日历", "src.scrapers.econ_calendar"),
         ("财报日历", "src.scrapers.earnings"),
         ("股票信息", "src.scrapers.stock_info"),
+        ("盘前行情", "src.scrapers.quotes"),
     ]
 
     success_count = 0
@@ -105,8 +133,23 @@ def main():
 
     log(f"数据抓取完成: {success_count}/{len(scrapers)} 成功")
 
-    # 注意：Claude 分析需要在本地运行（使用 scripts/analyze.py）
-    # Docker 容器内没有 claude CLI
+    # 新闻事件聚类和股票 -> 新闻倒排索引（依赖新闻数据，聚类排序还用到股票信息）
+    run_scraper("新闻聚类", "src.analyzers.news_clusters")
+    run_scraper("新闻索引", "src.analyzers.symbol_index")
+
+    # 期权 IV / 希腊值计算（依赖期权链数据）
+    run_scraper("期权希腊值", "src.analyzers.greeks")
+
+    # 期权异动检测（更新按行权价的滚动基线）
+    run_scraper("期权异动", "src.analyzers.unusual_options")
+
+    # 板块汇总（依赖股票信息、期权和评级数据）
+    run_scraper("板块汇总", "src.analyzers.sectors")
+
+    # 新闻智能分析（容器内没有 claude CLI 时使用本地启发式后端，
+    # 本地运行 scripts/analyze.py 产生的 Claude 结果会通过缓存自动替换）
+    if success_count > 0:
+        run_analysis()
 
     # 生成报告
     if success_count > 0:
@@ -114,6 +157,9 @@ def main():
     else:
         log("所有数据抓取失败，跳过报告生成")
 
+    log(f"耗时报告: {metrics.REPORT_FILE}")
+    if PROFILER:
+        log(f"剖析结果: {PROFILER.write_summary().parent}")
     log("=" * 50)
     log("每日任务结束")
     log("=" * 50)
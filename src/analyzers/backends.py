@@ -0,0 +1,370 @@
+"""分析后端模块 - 新闻分析的可插拔实现
+
+- claude：调用本地 Claude Code CLI，质量最高，仅在本地环境可用
+- heuristic：本地关键词打标签 + 股票代码提取，无外部依赖，毫秒级完成
+- stub：把任务 POST 到一个 HTTP 服务（测试时指向桩服务）
+
+所有后端实现相同的三个任务：新闻摘要、重点关注领域、个股点评。
+任务失败时返回 None（新闻摘要返回缺失的键），由调用方决定回退方式。
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from collections import Counter
+
+from src.utils import metrics
+from src.utils.news import related_symbols
+
+# 单个任务默认超时（秒）
+DEFAULT_TIMEOUT = 60
+
+SYSTEM_ROLE = "你是一位专业的美股市场分析师。"
+JSON_ONLY = "只输出纯 JSON，不要 markdown 代码块，不要任何其他文字。"
+
+# 关键词分类：中文标签 -> (英文标签, 关键词)
+TAG_KEYWORDS = {
+    '宏观': ('Macro', ['fed', 'federal reserve', 'inflation', 'cpi', 'ppi', 'rate', 'jobs', 'payroll',
+                      'gdp', 'treasury', 'yield', 'tariff', 'recession', 'economy', 'powell']),
+    '科技': ('Tech', ['ai', 'chip', 'semiconductor', 'software', 'cloud', 'nvidia', 'apple', 'microsoft',
+                     'google', 'alphabet', 'meta', 'amazon', 'iphone', 'data center']),
+    '金融': ('Finance', ['bank', 'lender', 'jpmorgan', 'goldman', 'credit', 'loan', 'insurer', 'fintech']),
+    '能源': ('Energy', ['oil', 'crude', 'opec', 'gas', 'energy', 'exxon', 'chevron', 'brent']),
+    '汽车': ('Auto', ['tesla', 'ev', 'electric vehicle', 'automaker', 'ford', 'gm', 'rivian', 'deliveries']),
+    '医药': ('Healthcare', ['drug', 'fda', 'pharma', 'vaccine', 'biotech', 'health', 'obesity']),
+    '消费': ('Consumer', ['retail', 'walmart', 'target', 'consumer', 'sales', 'restaurant', 'travel']),
+    '加密': ('Crypto', ['bitcoin', 'crypto', 'ethereum', 'coinbase', 'blockchain']),
+}
+DEFAULT_TAG = ('市场', 'Market')
+
+
+def extract_json(text: str):
+    """从模型输出中提取 JSON"""
+    text = text.strip()
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0]
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0]
+
+    # 找到 JSON 的开始和结束
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    if starts:
+        start_idx = min(starts)
+        end_char = '}' if text[start_idx] == '{' else ']'
+        end_idx = text.rfind(end_char) + 1
+        if end_idx > start_idx:
+            text = text[start_idx:end_idx]
+
+    return json.loads(text.strip())
+
+
+def run_claude(prompt: str, timeout: float = DEFAULT_TIMEOUT):
+    """调用 Claude Code CLI，返回解析后的 JSON；失败返回 None"""
+    try:
+        with metrics.upstream_span('claude', 'cli'):
+            result = subprocess.run(
+                ['claude', '-p', prompt, '--output-format', 'text'],
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+    except subprocess.TimeoutExpired:
+        print("Claude CLI timeout")
+        return None
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+    if result.returncode != 0:
+        print(f"Claude CLI error: {result.stderr}")
+        return None
+
+    try:
+        return extract_json(result.stdout)
+    except json.JSONDecodeError as e:
+        print(f"JSON parse error: {e}")
+        print(f"Response was: {result.stdout[:500]}")
+        return None
+
+
+
+def news_summary_prompt(batch: list) -> str:
+    """新闻摘要 prompt（每条新闻带 key，结果按 key 对应）"""
+    news_text = "\n".join([
+        f"- key={key}: {n.get('headline', '')} (相关股票: {', '.join(related_symbols(n)) or '无'})"
+        for key, n in batch
+    ])
+    return f"""{SYSTEM_ROLE}请为以下每条新闻生成一句话摘要，同时提供中文和英文版本。
+
+## 新闻
+{news_text}
+
+请按以下 JSON 格式输出，每条新闻一项，key 与输入保持一致：
+
+[
+    {{
+        "key": "输入中的 key",
+        "tag": "中文分类标签(如:科技/金融/宏观/能源等)",
+        "tag_en": "English tag (e.g., Tech/Finance/Macro/Energy)",
+        "summary": "一句话中文摘要，包含投资逻辑",
+        "summary_en": "One-line English summary with investment insight"
+    }}
+]
+
+要求：
+1. 中文摘要要简洁有力，突出投资价值
+2. 英文翻译要地道专业，符合金融行业表达习惯
+3. tag/tag_en 使用简短的分类标签
+4. {JSON_ONLY}"""
+
+
+def focus_areas_prompt(context: dict) -> str:
+    """重点关注领域 prompt"""
+    return f"""{SYSTEM_ROLE}请基于以下今日市场数据，找出 3-5 个今日重点关注领域，同时提供中文和英文版本。
+
+## 今日新闻
+{context['news_text']}
+
+## 投行评级变化
+{context['ratings_text']}
+
+## 期权市场数据
+{context['options_text']}
+
+## 今日财报
+{context['earnings_text']}
+
+请按以下 JSON 格式输出：
+
+{{
+    "focus_areas": [
+        {{
+            "title": "中文关注领域名称",
+            "title_en": "English focus area name",
+            "reason": "为什么今天需要关注这个领域",
+            "reason_en": "Why this area deserves attention today"
+        }}
+    ]
+}}
+
+要求：
+1. focus_areas 要结合新闻、评级、期权数据综合分析
+2. {JSON_ONLY}"""
+
+
+def symbol_notes_prompt(symbols: dict) -> str:
+    """个股点评 prompt"""
+    symbols_text = "\n".join([f"- {symbol}: {'; '.join(facts)}" for symbol, facts in symbols.items()])
+    return f"""{SYSTEM_ROLE}请为以下每只股票写一句今日点评，同时提供中文和英文版本。
+
+## 个股数据
+{symbols_text}
+
+请按以下 JSON 格式输出，每只股票一项：
+
+[
+    {{
+        "symbol": "股票代码",
+        "note": "一句话中文点评",
+        "note_en": "One-line English note"
+    }}
+]
+
+要求：
+1. 点评要结合给出的数据，不要编造数据
+2. {JSON_ONLY}"""
+
+
+def _parse_summaries(result, batch: list) -> dict:
+    """把后端返回的摘要列表整理为 {key: summary}"""
+    if not isinstance(result, list):
+        return {}
+    keys = {key for key, _ in batch}
+    return {
+        item['key']: {k: item.get(k) for k in ('tag', 'tag_en', 'summary', 'summary_en')}
+        for item in result
+        if isinstance(item, dict) and item.get('key') in keys and item.get('summary')
+    }
+
+
+def _parse_focus_areas(result):
+    """整理重点关注领域结果"""
+    if not isinstance(result, dict):
+        return None
+    return result.get('focus_areas', [])
+
+
+def _parse_symbol_notes(result):
+    """整理个股点评结果"""
+    if not isinstance(result, list):
+        return None
+    return [item for item in result if isinstance(item, dict) and item.get('symbol')]
+
+
+class AnalyzerBackend(ABC):
+    """分析后端基类（三个任务均须实现，缺少任何一个时创建实例即失败）"""
+
+    # 后端名称（也用作缓存分区）
+    name = 'base'
+    # 结果质量等级，越高越好；合并结果时优先使用高等级后端的缓存
+    quality = 0
+
+    def available(self) -> bool:
+        """当前环境是否可用"""
+        return True
+
+    @abstractmethod
+    def summarize_news(self, batch: list, timeout: float = DEFAULT_TIMEOUT) -> dict:
+        """对一批 (key, news) 生成摘要，返回 {key: summary}"""
+
+    @abstractmethod
+    def focus_areas(self, context: dict, timeout: float = DEFAULT_TIMEOUT):
+        """生成今日重点关注领域，失败返回 None"""
+
+    @abstractmethod
+    def symbol_notes(self, symbols: dict, timeout: float = DEFAULT_TIMEOUT):
+        """生成个股点评，失败返回 None"""
+
+
+class ClaudeCLIBackend(AnalyzerBackend):
+    """Claude Code CLI 后端（需要本地安装 claude 命令）"""
+
+    name = 'claude'
+    quality = 2
+
+    def available(self) -> bool:
+        return shutil.which('claude') is not None
+
+    def summarize_news(self, batch: list, timeout: float = DEFAULT_TIMEOUT) -> dict:
+        return _parse_summaries(run_claude(news_summary_prompt(batch), timeout), batch)
+
+    def focus_areas(self, context: dict, timeout: float = DEFAULT_TIMEOUT):
+        return _parse_focus_areas(run_claude(focus_areas_prompt(context), timeout))
+
+    def symbol_notes(self, symbols: dict, timeout: float = DEFAULT_TIMEOUT):
+        if not symbols:
+            return []
+        return _parse_symbol_notes(run_claude(symbol_notes_prompt(symbols), timeout))
+
+
+class HeuristicBackend(AnalyzerBackend):
+    """本地启发式后端：关键词打标签 + 相关股票提取，无需网络"""
+
+    name = 'heuristic'
+    quality = 1
+
+    @staticmethod
+    def classify(text: str) -> tuple:
+        """按关键词命中数给文本打标签，返回 (中文标签, 英文标签)"""
+        words = set(re.findall(r"[a-z][a-z\-']*", text.lower()))
+        lowered = text.lower()
+        best, best_hits = DEFAULT_TAG, 0
+        for tag, (tag_en, keywords) in TAG_KEYWORDS.items():
+            hits = sum(1 for kw in keywords if (kw in lowered if ' ' in kw else kw in words))
+            if hits > best_hits:
+                best, best_hits = (tag, tag_en), hits
+        return best
+
+    def summarize_news(self, batch: list, timeout: float = DEFAULT_TIMEOUT) -> dict:
+        summaries = {}
+        for key, news in batch:
+            headline = news.get('headline', '')
+            tag, tag_en = self.classify(f"{headline} {news.get('summary', '')}")
+            symbols = related_symbols(news)
+            suffix = f" ({', '.join(symbols[:3])})" if symbols else ''
+            summaries[key] = {
+                'tag': tag,
+                'tag_en': tag_en,
+                'summary': headline[:60] + suffix,
+                'summary_en': headline[:80] + suffix,
+            }
+        return summaries
+
+    def focus_areas(self, context: dict, timeout: float = DEFAULT_TIMEOUT):
+        tag_counts = Counter()
+        tag_symbols = {}
+        for news in context.get('news', []):
+            tag = self.classify(f"{news.get('headline', '')} {news.get('summary', '')}")
+            if tag == DEFAULT_TAG:
+                continue
+            tag_counts[tag] += 1
+            tag_symbols.setdefault(tag, []).extend(related_symbols(news))
+
+        areas = []
+        for (tag, tag_en), count in tag_counts.most_common(4):
+            symbols = list(dict.fromkeys(tag_symbols.get((tag, tag_en), [])))[:4]
+            symbols_text = f"，涉及 {', '.join(symbols)}" if symbols else ''
+            symbols_text_en = f", involving {', '.join(symbols)}" if symbols else ''
+            areas.append({
+                'title': tag,
+                'title_en': tag_en,
+                'reason': f"今日 {count} 条相关新闻{symbols_text}",
+                'reason_en': f"{count} related headlines today{symbols_text_en}",
+            })
+        return areas
+
+    def symbol_notes(self, symbols: dict, timeout: float = DEFAULT_TIMEOUT):
+        return [
+            {'symbol': symbol, 'note': '；'.join(facts[:2]), 'note_en': '; '.join(facts[:2])}
+            for symbol, facts in symbols.items() if facts
+        ]
+
+
+class StubServerBackend(AnalyzerBackend):
+    """HTTP 后端：把任务 POST 到 ANALYZER_STUB_URL（测试时指向桩服务）
+
+    请求体为 {"task": 任务名, "payload": 任务输入}，响应体为任务结果 JSON。
+    """
+
+    name = 'stub'
+    quality = 0
+
+    def __init__(self, url: str = None):
+        self.url = url or os.getenv('ANALYZER_STUB_URL', '')
+
+    def available(self) -> bool:
+        return bool(self.url)
+
+    def _post(self, task: str, payload, timeout: float):
+        import requests
+
+        try:
+            with metrics.upstream_span('stub', task):
+                response = requests.post(self.url, json={'task': task, 'payload': payload}, timeout=timeout)
+                response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Stub backend error ({task}): {e}")
+            return None
+
+    def summarize_news(self, batch: list, timeout: float = DEFAULT_TIMEOUT) -> dict:
+        payload = [{'key': key, 'headline': n.get('headline', ''), 'related': related_symbols(n)}
+                   for key, n in batch]
+        return _parse_summaries(self._post('news', payload, timeout), batch)
+
+    def focus_areas(self, context: dict, timeout: float = DEFAULT_TIMEOUT):
+        payload = {k: v for k, v in context.items() if k != 'news'}
+        return _parse_focus_areas(self._post('focus_areas', payload, timeout))
+
+    def symbol_notes(self, symbols: dict, timeout: float = DEFAULT_TIMEOUT):
+        return _parse_symbol_notes(self._post('symbols', symbols, timeout))
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (ClaudeCLIBackend, HeuristicBackend, StubServerBackend)
+}
+
+
+def get_backend(name: str = None) -> AnalyzerBackend:
+    """按名称获取后端；auto 时优先使用 Claude CLI，不可用则回退到启发式"""
+    name = name or os.getenv('ANALYZER_BACKEND', 'auto')
+    if name == 'auto':
+        claude = ClaudeCLIBackend()
+        return claude if claude.available() else HeuristicBackend()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown analyzer backend: {name}")
+    return BACKENDS[name]()
@@ -0,0 +1,322 @@
+"""期权隐含波动率与希腊值计算模块 - 向量化 Black-Scholes
+
+从 data/options_chain.json 读取期权链价格，对全部合约一次性求解 IV、
+delta / gamma / vega，并按标的汇总 IV 期限结构、25 Delta 偏度和 Gamma 敞口。
+"""
+
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import metrics
+from src.utils.jsonio import read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+
+# 无风险利率（年化，连续复利）
+RISK_FREE_RATE = 0.045
+
+# IV 求解边界与精度
+IV_LOWER = 1e-4
+IV_UPPER = 5.0
+IV_TOLERANCE = 1e-4
+NEWTON_ITERATIONS = 20
+BISECTION_ITERATIONS = 60
+
+# 时间价值低于最小报价单位的合约不参与 IV 求解（价格信息不足）
+MIN_OPTION_PRICE = 0.01
+
+# 每份合约对应的股数
+CONTRACT_MULTIPLIER = 100
+
+# 美东收盘时间（到期日按 16:00 计算剩余时间）
+EXPIRY_HOUR = 16
+
+# 剩余时间下限：1 小时，避免到期日当天除零
+MIN_TIME_TO_EXPIRY = 1 / (365 * 24)
+
+SQRT_2PI = np.sqrt(2 * np.pi)
+
+
+def load_json(filename: str) -> dict:
+    """加载 JSON 数据文件"""
+    return read_json(DATA_DIR / filename)
+
+
+def norm_pdf(x: np.ndarray) -> np.ndarray:
+    """标准正态分布密度"""
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x: np.ndarray) -> np.ndarray:
+    """标准正态分布函数（Abramowitz-Stegun 7.1.26 近似，误差 < 1.5e-7）"""
+    z = np.abs(x) / np.sqrt(2)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741
+                + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def _d1_d2(spot, strike, t, rate, sigma):
+    """计算 d1 / d2"""
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * sigma * sigma) * t) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+
+def bs_price(spot, strike, t, rate, sigma, is_call) -> np.ndarray:
+    """Black-Scholes 期权价格（is_call 为布尔数组）"""
+    d1, d2 = _d1_d2(spot, strike, t, rate, sigma)
+    discount = strike * np.exp(-rate * t)
+    call = spot * norm_cdf(d1) - discount * norm_cdf(d2)
+    put = discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_vega(spot, strike, t, rate, sigma) -> np.ndarray:
+    """Black-Scholes vega（对 sigma 的导数，未缩放）"""
+    d1, _ = _d1_d2(spot, strike, t, rate, sigma)
+    return spot * norm_pdf(d1) * np.sqrt(t)
+
+
+def implied_volatility(price, spot, strike, t, is_call, rate: float = RISK_FREE_RATE) -> np.ndarray:
+    """向量化求解隐含波动率
+
+    先对全部合约并行做 Newton 迭代，未收敛的合约再用二分法兜底。
+    时间价值不足一个报价单位或高于理论上限的合约返回 NaN。
+    """
+    price = np.asarray(price, dtype=float)
+    spot = np.broadcast_to(np.asarray(spot, dtype=float), price.shape)
+    strike = np.asarray(strike, dtype=float)
+    t = np.asarray(t, dtype=float)
+    is_call = np.asarray(is_call, dtype=bool)
+
+    discount = strike * np.exp(-rate * t)
+    lower = np.where(is_call, np.maximum(spot - discount, 0), np.maximum(discount - spot, 0))
+    upper = np.where(is_call, spot, discount)
+    valid = ((price - lower >= MIN_OPTION_PRICE) & (price < upper)
+             & (strike > 0) & (t > 0))
+
+    iv = np.full(price.shape, np.nan)
+    if not valid.any():
+        return iv
+
+    p, s, k, tt, c = price[valid], spot[valid], strike[valid], t[valid], is_call[valid]
+
+    # Brenner-Subrahmanyam 初值
+    sigma = np.clip(np.sqrt(2 * np.pi / tt) * p / s, 0.05, 3.0)
+    converged = np.zeros(p.shape, dtype=bool)
+
+    for _ in range(NEWTON_ITERATIONS):
+        active = ~converged
+        if not active.any():
+            break
+        diff = bs_price(s[active], k[active], tt[active], rate, sigma[active], c[active]) - p[active]
+        vega = bs_vega(s[active], k[active], tt[active], rate, sigma[active])
+        done = np.abs(diff) < IV_TOLERANCE
+        step = np.where(vega > 1e-10, diff / np.maximum(vega, 1e-10), 0.0)
+
+        idx = np.flatnonzero(active)
+        converged[idx[done]] = True
+        # vega 过小时 Newton 无法前进，交给二分法
+        stuck = ~done & (vega <= 1e-10)
+        sigma[idx[~done]] = np.clip(sigma[idx[~done]] - step[~done], IV_LOWER, IV_UPPER)
+        sigma[idx[stuck]] = np.nan
+
+    # 二分法兜底（价格对 sigma 单调递增）
+    remaining = ~converged
+    if remaining.any():
+        lo = np.full(remaining.sum(), IV_LOWER)
+        hi = np.full(remaining.sum(), IV_UPPER)
+        rs, rk, rt, rc, rp = s[remaining], k[remaining], tt[remaining], c[remaining], p[remaining]
+        for _ in range(BISECTION_ITERATIONS):
+            mid = 0.5 * (lo + hi)
+            too_high = bs_price(rs, rk, rt, rate, mid, rc) > rp
+            hi = np.where(too_high, mid, hi)
+            lo = np.where(too_high, lo, mid)
+        sigma[remaining] = 0.5 * (lo + hi)
+
+    iv[valid] = sigma
+    return iv
+
+
+def compute_greeks(spot, strike, t, sigma, is_call, rate: float = RISK_FREE_RATE) -> dict:
+    """向量化计算 delta / gamma / vega（vega 按 1 个波动率点计）"""
+    d1, _ = _d1_d2(spot, strike, t, rate, sigma)
+    sqrt_t = np.sqrt(t)
+    pdf = norm_pdf(d1)
+    cdf = norm_cdf(d1)
+    return {
+        'delta': np.where(is_call, cdf, cdf - 1.0),
+        'gamma': pdf / (spot * sigma * sqrt_t),
+        'vega': spot * pdf * sqrt_t / 100,
+    }
+
+
+def chains_to_frame(chains: dict, now: datetime = None) -> pd.DataFrame:
+    """把列式期权链拼接为一个 DataFrame（每行一个合约）"""
+    now = now or datetime.now()
+    frames = []
+    for symbol, chain in chains.items():
+        contracts = chain.get('contracts', {})
+        if not contracts.get('strike'):
+            continue
+        frame = pd.DataFrame(contracts)
+        frame['symbol'] = symbol
+        frame['spot'] = float(chain['spot'])
+        frames.append(frame)
+
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+
+    # 剩余年化时间（到期日 16:00）
+    expiry = pd.to_datetime(df['expiry']) + pd.Timedelta(hours=EXPIRY_HOUR)
+    seconds = (expiry - pd.Timestamp(now)).dt.total_seconds().to_numpy()
+    df['t'] = np.maximum(seconds / (365 * 86400), MIN_TIME_TO_EXPIRY)
+    df['days'] = np.maximum(seconds / 86400, 0).round(1)
+
+    # 有买卖报价时用中间价，否则用最新成交价
+    has_quote = (df['bid'] > 0) & (df['ask'] > 0)
+    df['price'] = np.where(has_quote, (df['bid'] + df['ask']) / 2, df['last'])
+    return df
+
+
+def price_contracts(df: pd.DataFrame, rate: float = RISK_FREE_RATE) -> pd.DataFrame:
+    """为全部合约计算 IV 与希腊值"""
+    if df.empty:
+        return df
+
+    spot = df['spot'].to_numpy()
+    strike = df['strike'].to_numpy(dtype=float)
+    t = df['t'].to_numpy()
+    is_call = (df['type'] == 'C').to_numpy()
+
+    iv = implied_volatility(df['price'].to_numpy(dtype=float), spot, strike, t, is_call, rate)
+    greeks = compute_greeks(spot, strike, t, iv, is_call, rate)
+
+    df = df.assign(iv=iv, **greeks)
+    return df
+
+
+def _round(value, digits: int = 4):
+    """NaN 转为 None，其余四舍五入"""
+    return None if pd.isna(value) else round(float(value), digits)
+
+
+def summarize_underlyings(df: pd.DataFrame) -> list:
+    """按标的汇总：IV 期限结构、25 Delta 偏度、Gamma 敞口"""
+    if df.empty:
+        return []
+
+    priced = df.dropna(subset=['iv'])
+    if priced.empty:
+        return []
+
+    # Gamma 敞口：每 1% 标的变动对应的美元 gamma，call 为正、put 为负
+    is_call = (priced['type'] == 'C').to_numpy()
+    gex = (np.where(is_call, 1.0, -1.0) * priced['gamma'] * priced['open_interest']
+           * CONTRACT_MULTIPLIER * priced['spot'] ** 2 * 0.01)
+    priced = priced.assign(
+        gex=gex,
+        call_gex=np.where(is_call, gex, 0.0),
+        put_gex=np.where(is_call, 0.0, gex),
+        distance=(priced['strike'] - priced['spot']).abs(),
+    )
+    by_symbol = priced.groupby('symbol').agg(
+        spot=('spot', 'first'),
+        gex=('gex', 'sum'),
+        call_gex=('call_gex', 'sum'),
+        put_gex=('put_gex', 'sum'),
+        contracts=('iv', 'size'),
+        front_expiry=('expiry', 'min'),
+    )
+
+    # 期限结构：每个到期日最接近平值行权价的 call/put IV 均值
+    keys = ['symbol', 'expiry']
+    atm = priced[priced['distance'] == priced.groupby(keys)['distance'].transform('min')]
+    term = atm.groupby(keys).agg(days=('days', 'first'), atm_iv=('iv', 'mean')).reset_index()
+
+    # 偏度：最近到期日 25 Delta put IV - 25 Delta call IV
+    front = priced[priced['expiry'] == priced['symbol'].map(by_symbol['front_expiry'])]
+    target = np.where(front['type'] == 'C', 0.25, -0.25)
+    front = front.assign(delta_gap=(front['delta'] - target).abs())
+    wing = front.loc[front.groupby(['symbol', 'type'])['delta_gap'].idxmin()]
+    wing_iv = wing.pivot(index='symbol', columns='type', values='iv')
+    skew = wing_iv.get('P', pd.Series(dtype=float)) - wing_iv.get('C', pd.Series(dtype=float))
+
+    term_by_symbol = {
+        symbol: [
+            {'expiry': row.expiry, 'days': float(row.days), 'atm_iv': _round(row.atm_iv)}
+            for row in rows.itertuples()
+        ]
+        for symbol, rows in term.groupby('symbol')
+    }
+
+    results = []
+    for symbol, row in by_symbol.iterrows():
+        term_structure = term_by_symbol.get(symbol, [])
+        front_point = next((p for p in term_structure if p['expiry'] == row['front_expiry']), {})
+        results.append({
+            'symbol': symbol,
+            'spot': round(float(row['spot']), 2),
+            'atm_iv': front_point.get('atm_iv'),
+            'skew_25d': _round(skew.get(symbol)),
+            'gex': round(float(row['gex'])),
+            'call_gex': round(float(row['call_gex'])),
+            'put_gex': round(float(row['put_gex'])),
+            'contracts': int(row['contracts']),
+            'term_structure': term_structure,
+        })
+
+    # 按 Gamma 敞口绝对值排序
+    results.sort(key=lambda x: abs(x['gex']), reverse=True)
+    return results
+
+
+def compute_vol_surface() -> dict:
+    """读取期权链，计算 IV / 希腊值并保存汇总结果"""
+    print("Computing implied volatility and greeks...")
+
+    chain_data = load_json('options_chain.json')
+    chains = chain_data.get('chains', {})
+
+    start = time.perf_counter()
+    df = price_contracts(chains_to_frame(chains))
+    underlyings = summarize_underlyings(df)
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    today = datetime.now()
+    result = {
+        'date': chain_data.get('date', today.strftime('%Y-%m-%d')),
+        'fetch_time': today.strftime('%Y-%m-%d %H:%M:%S'),
+        'risk_free_rate': RISK_FREE_RATE,
+        'contracts_total': int(len(df)),
+        'contracts_priced': int(df['iv'].notna().sum()) if not df.empty else 0,
+        'elapsed_ms': elapsed_ms,
+        'underlyings': underlyings
+    }
+
+    # 保存到文件
+    output_path = DATA_DIR / 'greeks.json'
+    write_json(output_path, result)
+
+    print(f"Priced {result['contracts_priced']}/{result['contracts_total']} contracts "
+          f"in {elapsed_ms} ms, saved to {output_path}")
+    return result
+
+
+if __name__ == '__main__':
+    metrics.start_run('greeks')
+    with metrics.span('greeks'):
+        data = compute_vol_surface()
+    print(f"\nTop gamma exposure:")
+    for u in data['underlyings'][:5]:
+        print(f"  {u['symbol']}: ATM IV {u['atm_iv']}, skew {u['skew_25d']}, GEX ${u['gex']:,}")
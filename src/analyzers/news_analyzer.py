@@ -1,48 +1,114 @@
-"""新闻智能分析模块 - 使用 Claude Code CLI 生成中文摘要和投资逻辑"""
+"""新闻智能分析模块 - 生成中英文新闻摘要和投资逻辑
 
+具体的分析由可插拔后端完成（见 backends.py）。分析拆成互相独立的小任务并发执行：
+- 新闻摘要：按批次发送，每条新闻按内容哈希缓存，已摘要过的新闻不再重复发送
+- 重点关注领域：综合新闻、评级、期权、财报数据
+- 个股点评：期权成交量靠前和有评级变化的股票
+单个任务超时或失败只影响该部分，其余部分照常输出。
+"""
+
+import argparse
+import hashlib
 import json
-import subprocess
-import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from src.analyzers.backends import BACKENDS, AnalyzerBackend, get_backend
+from src.analyzers.news_clusters import top_news
+from src.utils import metrics
+from src.utils.jsonio import read_json, write_json
+from src.utils.news import related_symbols
+
 # 路径配置
 BASE_DIR = Path(__file__).parent.parent.parent
 DATA_DIR = BASE_DIR / 'data'
+CACHE_FILE = DATA_DIR / 'analysis_cache.json'
+
+# 参与分析的新闻事件数量（每个事件取一条代表报道）/ 每批摘要的新闻数量
+MAX_NEWS = 15
+NEWS_BATCH_SIZE = 5
+
+# 输出的核心新闻数量
+CORE_NEWS_COUNT = 7
+
+# 个股点评数量
+SYMBOL_NOTES_COUNT = 6
 
+# 并发数与单个任务超时（秒）
+ANALYSIS_WORKERS = 4
+CHUNK_TIMEOUT = 60
+
+# 缓存保留天数
+CACHE_TTL_DAYS = 7
 
 def load_json(filename: str) -> dict:
     """加载 JSON 数据文件"""
-    filepath = DATA_DIR / filename
-    if filepath.exists():
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return read_json(DATA_DIR / filename)
 
 
-def analyze_news() -> dict:
-    """使用 Claude Code CLI 分析新闻并生成中文摘要"""
+def content_hash(*parts) -> str:
+    """计算内容哈希（用作缓存键）"""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
 
-    # 加载原始数据
-    news_data = load_json('news.json')
-    ratings_data = load_json('ratings.json')
-    options_data = load_json('options.json')
-    earnings_data = load_json('earnings.json')
 
-    # 准备新闻内容
-    news_list = news_data.get('news', [])[:15]
+# ===== 缓存 =====
+
+def load_cache() -> dict:
+    """加载分析缓存 {后端: {任务: {键: 条目}}}，并丢弃过期条目"""
+    cache = read_json(CACHE_FILE)
+    # 旧版缓存没有后端分区，均由 Claude 生成
+    if 'news' in cache:
+        cache = {'claude': cache}
+    cutoff = (datetime.now() - timedelta(days=CACHE_TTL_DAYS)).strftime('%Y-%m-%d')
+    return {
+        backend: {
+            section: {k: v for k, v in entries.items() if v.get('cached_at', '') >= cutoff}
+            for section, entries in sections.items()
+        }
+        for backend, sections in cache.items()
+    }
+
+
+def best_cached(cache: dict, section: str, key: str, min_quality: int = 0):
+    """按后端质量从高到低查找缓存结果"""
+    ranked = sorted(BACKENDS.values(), key=lambda b: b.quality, reverse=True)
+    for backend in ranked:
+        if backend.quality < min_quality:
+            break
+        entry = cache.get(backend.name, {}).get(section, {}).get(key)
+        if entry:
+            return entry['value']
+    return None
+
+
+def save_cache(cache: dict):
+    """保存分析缓存"""
+    write_json(CACHE_FILE, cache)
+
+
+def cache_entry(value) -> dict:
+    """包装缓存条目"""
+    return {'value': value, 'cached_at': datetime.now().strftime('%Y-%m-%d')}
+
+
+# ===== 准备输入 =====
+
+def build_context(news_list: list, ratings_data: dict, options_data: dict, earnings_data: dict) -> dict:
+    """准备各任务共用的文本上下文"""
     news_text = "\n".join([
-        f"- {n.get('headline', '')} (相关股票: {', '.join(n.get('related', []))})"
+        f"- {n.get('headline', '')} (相关股票: {', '.join(related_symbols(n)) or '无'})"
         for n in news_list
     ])
 
-    # 准备评级变化
     rating_changes = ratings_data.get('recent_changes', [])[:10]
     ratings_text = "\n".join([
-        f"- {r.get('symbol')}: {r.get('firm')} {r.get('action', '')} to {r.get('to_grade', '')}"
+        f"- {r.get('symbol')}: {r.get('company')} {r.get('action', '')} to {r.get('to_grade', '')}"
         for r in rating_changes
     ])
 
-    # 准备期权数据
     market_overview = options_data.get('market_overview', {})
     top_stocks = options_data.get('top_25_stocks', [])[:10]
     options_text = f"""
@@ -51,7 +117,6 @@ P/C Ratio: {market_overview.get('pc_ratio', 'N/A')}
 期权成交量 TOP 5: {', '.join([s.get('symbol', '') for s in top_stocks[:5]])}
 """
 
-    # 准备财报日历
     before_market = earnings_data.get('before_market', [])[:5]
     after_market = earnings_data.get('after_market', [])[:5]
     earnings_text = f"""
@@ -59,115 +124,178 @@ P/C Ratio: {market_overview.get('pc_ratio', 'N/A')}
 盘后财报: {', '.join([e.get('symbol', '') for e in after_market])}
 """
 
-    # 构建 prompt
-    prompt = f"""你是一位专业的美股市场分析师。请基于以下今日市场数据，生成简洁的分析报告，同时提供中文和英文版本。
-
-## 今日新闻
-{news_text}
-
-## 投行评级变化
-{ratings_text}
-
-## 期权市场数据
-{options_text}
-
-## 今日财报
-{earnings_text}
-
-请按以下 JSON 格式输出分析结果，只输出 JSON，不要其他任何内容：
-
-{{
-    "core_news": [
-        {{
-            "tag": "中文分类标签(如:科技/金融/宏观/能源等)",
-            "tag_en": "English tag (e.g., Tech/Finance/Macro/Energy)",
-            "summary": "一句话中文摘要，包含投资逻辑",
-            "summary_en": "One-line English summary with investment insight"
-        }},
-        // 最多 7 条核心新闻
-    ],
-    "focus_areas": [
-        {{
-            "title": "中文关注领域名称",
-            "title_en": "English focus area name",
-            "reason": "为什么今天需要关注这个领域",
-            "reason_en": "Why this area deserves attention today"
-        }},
-        // 3-5 个今日重点关注领域
-    ]
-}}
-
-要求：
-1. 中文摘要要简洁有力，突出投资价值
-2. 英文翻译要地道专业，符合金融行业表达习惯
-3. tag/tag_en 使用简短的分类标签
-4. focus_areas 要结合新闻、评级、期权数据综合分析
-5. 只输出纯 JSON，不要 markdown 代码块，不要任何其他文字"""
-
-    # 调用 Claude Code CLI
-    try:
-        result = subprocess.run(
-            ['claude', '-p', prompt, '--output-format', 'text'],
-            capture_output=True,
-            text=True,
-            timeout=120
+    return {
+        'news_text': news_text,
+        'ratings_text': ratings_text,
+        'options_text': options_text,
+        'earnings_text': earnings_text,
+        'news': news_list,
+    }
+
+
+def collect_symbol_facts(news_list: list, ratings_data: dict, options_data: dict) -> dict:
+    """汇总需要点评的股票及其数据要点"""
+    facts = {}
+
+    for stock in options_data.get('top_25_stocks', [])[:SYMBOL_NOTES_COUNT]:
+        call_vol = stock.get('call_volume', 0)
+        put_vol = stock.get('put_volume', 0)
+        pc_ratio = round(put_vol / call_vol, 2) if call_vol > 0 else 0
+        facts.setdefault(stock['symbol'], []).append(
+            f"期权成交 {stock.get('total_volume', 0):,}, P/C {pc_ratio}, 最热 {stock.get('hottest_option', '')}"
         )
 
-        if result.returncode != 0:
-            print(f"Claude CLI error: {result.stderr}")
-            return get_default_result(news_list)
+    for r in ratings_data.get('recent_changes', [])[:10]:
+        symbol = r.get('symbol')
+        if symbol in facts or len(facts) < SYMBOL_NOTES_COUNT:
+            facts.setdefault(symbol, []).append(
+                f"{r.get('company')} {r.get('action', '')} {r.get('from_grade', '')} -> {r.get('to_grade', '')}"
+            )
+
+    for n in news_list:
+        for symbol in related_symbols(n):
+            if symbol in facts:
+                facts[symbol].append(f"新闻: {n.get('headline', '')}")
+
+    return facts
+
+
+def analyze_news(backend: AnalyzerBackend = None, budget: float = None) -> dict:
+    """分析新闻并生成中英文摘要
 
-        response_text = result.stdout.strip()
+    backend 默认按 ANALYZER_BACKEND 选择（auto：有 claude 命令用 Claude，否则用本地启发式）。
+    budget 为总耗时上限（秒），超时未完成的任务按失败处理，对应部分使用缓存或默认结果。
+    合并结果时各部分优先使用质量更高的后端缓存，本地运行 Claude 后容器内的结果也随之升级。
+    """
+    backend = backend or get_backend()
+    deadline = time.monotonic() + budget if budget else None
+    print(f"Analyzer backend: {backend.name}" + (f", budget {budget}s" if budget else ''))
 
-        # 尝试提取 JSON
-        if "```json" in response_text:
-            response_text = response_text.split("```json")[1].split("```")[0]
-        elif "```" in response_text:
-            response_text = response_text.split("```")[1].split("```")[0]
+    # 加载原始数据
+    news_data = load_json('news.json')
+    ratings_data = load_json('ratings.json')
+    options_data = load_json('options.json')
+    earnings_data = load_json('earnings.json')
 
-        # 找到 JSON 的开始和结束
-        start_idx = response_text.find('{')
-        end_idx = response_text.rfind('}') + 1
-        if start_idx != -1 and end_idx > start_idx:
-            response_text = response_text[start_idx:end_idx]
+    news_list = top_news(news_data, MAX_NEWS)
+    context = build_context(news_list, ratings_data, options_data, earnings_data)
+    symbol_facts = collect_symbol_facts(news_list, ratings_data, options_data)
 
-        result_data = json.loads(response_text.strip())
+    cache = load_cache()
+    own_cache = cache.setdefault(backend.name, {})
+    news_cache = own_cache.setdefault('news', {})
+    focus_cache = own_cache.setdefault('focus_areas', {})
+    symbol_cache = own_cache.setdefault('symbols', {})
 
-        # 保存分析结果
-        output_file = DATA_DIR / 'analysis.json'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result_data, f, ensure_ascii=False, indent=2)
+    # 同等或更高质量后端已经分析过的内容不再重复分析
+    def covered(section: str, key: str) -> bool:
+        return best_cached(cache, section, key, min_quality=backend.quality) is not None
 
-        print(f"Analysis saved to {output_file}")
-        return result_data
+    # 按内容哈希区分已缓存与待分析的新闻
+    keyed_news = [(content_hash(n.get('headline', ''), n.get('summary', '')), n) for n in news_list]
+    pending = [(key, n) for key, n in keyed_news if not covered('news', key)]
+    batches = [pending[i:i + NEWS_BATCH_SIZE] for i in range(0, len(pending), NEWS_BATCH_SIZE)]
 
-    except subprocess.TimeoutExpired:
-        print("Claude CLI timeout")
-        return get_default_result(news_list)
-    except json.JSONDecodeError as e:
-        print(f"JSON parse error: {e}")
-        print(f"Response was: {response_text[:500]}")
-        return get_default_result(news_list)
-    except Exception as e:
-        print(f"Error: {e}")
-        return get_default_result(news_list)
+    focus_key = content_hash(context)
+    symbols_key = content_hash(symbol_facts)
 
+    stats = {
+        'news_cached': len(keyed_news) - len(pending),
+        'news_requested': len(pending),
+        'failed_chunks': 0,
+    }
 
-def get_default_result(news_list: list) -> dict:
-    """返回默认结果"""
-    return {
-        "core_news": [
-            {"tag": "市场", "summary": n.get('headline', '')[:60]}
-            for n in news_list[:7]
-        ],
-        "focus_areas": []
+    # 任务开始时按剩余预算收紧超时，排队中的任务也不会越过总预算
+    def run_task(method, payload):
+        timeout = CHUNK_TIMEOUT
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise TimeoutError('analysis budget exhausted')
+        return method(payload, timeout)
+
+    # 并发执行各任务（已缓存的部分直接跳过）
+    executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS)
+    futures = {}
+    for batch in batches:
+        futures[executor.submit(run_task, backend.summarize_news, batch)] = ('news', batch)
+    if not covered('focus_areas', focus_key):
+        futures[executor.submit(run_task, backend.focus_areas, context)] = ('focus_areas', None)
+    if not covered('symbols', symbols_key):
+        futures[executor.submit(run_task, backend.symbol_notes, symbol_facts)] = ('symbols', None)
+
+    done, not_done = wait(futures, timeout=budget)
+    executor.shutdown(wait=False, cancel_futures=True)
+    stats['failed_chunks'] += len(not_done)
+
+    for future in done:
+        task, batch = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"Analysis task {task} failed: {e}")
+            stats['failed_chunks'] += 1
+            continue
+
+        if task == 'news':
+            if len(result) < len(batch):
+                stats['failed_chunks'] += 1
+            for key, summary in result.items():
+                news_cache[key] = cache_entry(summary)
+        elif result is None:
+            stats['failed_chunks'] += 1
+        elif task == 'focus_areas':
+            focus_cache[focus_key] = cache_entry(result)
+        else:
+            symbol_cache[symbols_key] = cache_entry(result)
+
+    save_cache(cache)
+    metrics.cache_result('analysis', True, stats['news_cached'])
+    metrics.cache_result('analysis', False, stats['news_requested'])
+
+    # 合并结果：优先取质量最高的缓存，缺失的新闻摘要回退到原始标题
+    core_news = []
+    for key, n in keyed_news[:CORE_NEWS_COUNT]:
+        core_news.append(best_cached(cache, 'news', key) or default_news_item(n))
+
+    result_data = {
+        'core_news': core_news,
+        'focus_areas': best_cached(cache, 'focus_areas', focus_key) or [],
+        'symbol_notes': best_cached(cache, 'symbols', symbols_key) or [],
+        'backend': backend.name,
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'stats': stats,
     }
 
+    # 保存分析结果
+    output_file = DATA_DIR / 'analysis.json'
+    write_json(output_file, result_data)
+
+    print(f"Analysis saved to {output_file} "
+          f"(cached {stats['news_cached']}, requested {stats['news_requested']}, "
+          f"failed chunks {stats['failed_chunks']})")
+    return result_data
+
+
+def default_news_item(news: dict) -> dict:
+    """单条新闻的默认结果（原始标题）"""
+    return {"tag": "市场", "summary": news.get('headline', '')[:60]}
+
 
 def main():
     """主函数"""
-    print("Starting news analysis with Claude Code CLI...")
-    result = analyze_news()
+    parser = argparse.ArgumentParser(description='Analyze market news')
+    parser.add_argument('--backend', choices=['auto', *BACKENDS], default=None,
+                        help='Analyzer backend (default: $ANALYZER_BACKEND or auto)')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='Overall latency budget in seconds')
+    args = parser.parse_args()
+
+    print("Starting news analysis...")
+    metrics.start_run('analysis')
+    backend = get_backend(args.backend)
+    with metrics.span('analysis', backend=backend.name):
+        result = analyze_news(backend, args.budget)
     print(f"Generated {len(result.get('core_news', []))} news summaries")
     print(f"Generated {len(result.get('focus_areas', []))} focus areas")
 
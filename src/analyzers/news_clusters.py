@@ -0,0 +1,224 @@
+"""新闻去重聚类模块 - MinHash + LSH 把近似重复的报道合并为事件
+
+Finnhub general_news 经常对同一事件返回多条措辞相近的报道。这里对
+标题 + 摘要的词集合计算 MinHash 签名，用 LSH 分桶找候选，估计 Jaccard
+相似度超过阈值即归入同一事件。事件按报道数量和股票相关度排序，
+分析与报告只取每个事件的代表报道。
+
+签名与事件归属保存在 data/news_index.json（只保留最近几天），
+跨次运行的同一事件保持相同的事件 ID，重复运行结果不变。
+
+每日任务在抓取新闻后运行 python -m src.analyzers.news_clusters，把事件写回
+data/news.json 的 events 字段。
+"""
+
+import hashlib
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src.utils.jsonio import read_json, write_json
+from src.utils.news import related_symbols
+from src.utils.universe import get_universe
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+INDEX_FILE = DATA_DIR / 'news_index.json'
+NEWS_FILE = DATA_DIR / 'news.json'
+
+# 事件排序时视为关注股票的股票池板块：核心自选股和指数
+# （data/stock_info.json 还包含从新闻、期权等数据中发现的股票，不能作为关注列表）
+WATCHED_SECTIONS = ('stock_options', 'stock_info', 'index_options', 'quote_indexes')
+
+# MinHash 签名长度 = 分桶数 × 每桶行数（16×2 时 Jaccard 约 0.25 以上即成为候选）
+NUM_BANDS = 16
+ROWS_PER_BAND = 2
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+
+# 估计 Jaccard 相似度达到该值视为同一事件
+SIMILARITY_THRESHOLD = 0.5
+
+# 索引保留天数
+INDEX_TTL_DAYS = 3
+
+# 排序权重：每只关注股票 / 其他股票的相关度加分
+WATCHED_SYMBOL_WEIGHT = 1.0
+OTHER_SYMBOL_WEIGHT = 0.3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 固定的哈希参数，保证签名跨次运行可比较
+_PERMUTATIONS = [
+    (
+        int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % (_MERSENNE_PRIME - 1) + 1,
+        int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME,
+    )
+    for i in range(NUM_PERM)
+]
+
+STOPWORDS = {
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'at', 'by', 'with', 'as', 'is',
+    'are', 'was', 'be', 'its', 'it', 'from', 'that', 'this', 'after', 'over', 'says', 'said', 'new',
+}
+
+
+def tokenize(news: dict) -> set:
+    """标题 + 摘要的词集合（小写、去停用词）"""
+    text = f"{news.get('headline', '')} {news.get('summary', '')}".lower()
+    return {w for w in re.findall(r"[a-z0-9][a-z0-9\-']*", text) if w not in STOPWORDS}
+
+
+def minhash(tokens: set) -> list:
+    """计算 MinHash 签名"""
+    if not tokens:
+        return [_MAX_HASH] * NUM_PERM
+    hashed = [int.from_bytes(hashlib.blake2b(t.encode('utf-8'), digest_size=4).digest(), 'big')
+              for t in tokens]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashed)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def similarity(sig_a: list, sig_b: list) -> float:
+    """由签名估计 Jaccard 相似度"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def band_keys(signature: list) -> list:
+    """LSH 分桶键"""
+    return [
+        f"{band}:{'.'.join(map(str, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))}"
+        for band in range(NUM_BANDS)
+    ]
+
+
+class NewsIndex:
+    """跨次运行的新闻签名索引：新闻 ID -> (签名, 事件 ID, 日期)"""
+
+    def __init__(self, items: dict = None):
+        self.items = items or {}
+        self.buckets = {}
+        for news_id, item in self.items.items():
+            self._add_to_buckets(news_id, item['sig'])
+
+    @classmethod
+    def load(cls, path: Path = INDEX_FILE) -> 'NewsIndex':
+        cutoff = (datetime.now() - timedelta(days=INDEX_TTL_DAYS)).strftime('%Y-%m-%d')
+        items = read_json(path).get('items', {})
+        return cls({k: v for k, v in items.items() if v.get('seen', '') >= cutoff})
+
+    def save(self, path: Path = INDEX_FILE):
+        write_json(path, {'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 'items': self.items})
+
+    def _add_to_buckets(self, news_id: str, signature: list):
+        for key in band_keys(signature):
+            self.buckets.setdefault(key, []).append(news_id)
+
+    def find_event(self, signature: list):
+        """查找与签名最相似的已有事件，没有返回 None"""
+        candidates = {news_id for key in band_keys(signature) for news_id in self.buckets.get(key, [])}
+        best_event, best_score = None, SIMILARITY_THRESHOLD
+        for news_id in candidates:
+            score = similarity(signature, self.items[news_id]['sig'])
+            if score >= best_score:
+                best_event, best_score = self.items[news_id]['event'], score
+        return best_event
+
+    def assign(self, news: dict) -> str:
+        """返回新闻所属事件 ID（新闻首次出现时写入索引）"""
+        news_id = str(news.get('id') or hashlib.blake2b(
+            news.get('headline', '').encode('utf-8'), digest_size=8).hexdigest())
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        item = self.items.get(news_id)
+        if item:
+            item['seen'] = today
+            return item['event']
+
+        signature = minhash(tokenize(news))
+        event_id = self.find_event(signature) or news_id
+        self.items[news_id] = {'sig': signature, 'event': event_id, 'seen': today}
+        self._add_to_buckets(news_id, signature)
+        return event_id
+
+
+def cluster_news(news_list: list, watched: set = None, index: NewsIndex = None) -> list:
+    """把新闻聚合为事件并排序
+
+    返回事件列表 [{event_id, size, score, symbols, lead, members}]，lead 为
+    事件中最早出现在列表里的报道（Finnhub 按时间倒序，即最新的一条）。
+    """
+    index = index or NewsIndex()
+    watched = watched or set()
+
+    events = {}
+    for position, news in enumerate(news_list):
+        event_id = index.assign(news)
+        event = events.setdefault(event_id, {
+            'event_id': event_id,
+            'lead': position,
+            'members': [],
+            'symbols': [],
+        })
+        event['members'].append(position)
+        for symbol in related_symbols(news):
+            if symbol not in event['symbols']:
+                event['symbols'].append(symbol)
+
+    for event in events.values():
+        event['size'] = len(event['members'])
+        relevance = sum(
+            WATCHED_SYMBOL_WEIGHT if symbol in watched else OTHER_SYMBOL_WEIGHT
+            for symbol in event['symbols']
+        )
+        event['score'] = round(event['size'] + relevance, 2)
+
+    # 分数相同时保持原有顺序（越新越靠前）
+    return sorted(events.values(), key=lambda e: (-e['score'], e['lead']))
+
+
+def update_events(news_list: list, watched: set = None) -> list:
+    """聚类并更新持久化索引（抓取新闻后调用）"""
+    index = NewsIndex.load()
+    events = cluster_news(news_list, watched, index)
+    index.save()
+    return events
+
+
+def top_news(news_data: dict, limit: int) -> list:
+    """按事件排序取前 limit 条代表报道，每条附带 cluster_size
+
+    优先使用 news.json 中抓取时写入的 events；没有时现场聚类（不更新索引）。
+    """
+    news_list = news_data.get('news', [])
+    events = news_data.get('events') or cluster_news(news_list)
+    return [
+        {**news_list[event['lead']], 'cluster_size': event['size']}
+        for event in events[:limit]
+        if event['lead'] < len(news_list)
+    ]
+
+
+def watched_symbols() -> set:
+    """股票池中关注的股票（WATCHED_SECTIONS 中存在的板块）"""
+    universe = get_universe()
+    return {symbol for section in WATCHED_SECTIONS if section in universe.sections
+            for symbol in universe.symbols(section)}
+
+
+def update_news_events() -> list:
+    """对 data/news.json 中的新闻聚类，事件写回同一文件"""
+    news_data = read_json(NEWS_FILE)
+    watched = watched_symbols()
+    events = update_events(news_data.get('news', []), watched)
+    news_data.update({'event_count': len(events), 'events': events})
+    write_json(NEWS_FILE, news_data)
+    return events
+
+
+if __name__ == '__main__':
+    events = update_news_events()
+    print(f"Clustered news into {len(events)} events, saved to {NEWS_FILE}")
@@ -0,0 +1,157 @@
+"""板块汇总 - 把个股数据按行业板块聚合
+
+以股票信息（行业、市值、涨跌幅）为主表，左连接期权成交量和投行目标价，
+对合并后的表做一次 groupby 得到各板块：
+- 涨跌家数和宽度（(上涨 - 下跌) / 家数）
+- 市值加权涨跌幅
+- 期权 P/C 比（板块内 put 成交量之和 / call 成交量之和）
+- 平均目标价潜在涨幅
+
+全部为列运算，股票池扩大到数千只时耗时仍在毫秒级。
+"""
+
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import metrics
+from src.utils.jsonio import read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+OUTPUT_FILE = DATA_DIR / 'sectors.json'
+
+# 没有行业信息的股票（ETF、指数）归入的板块名，不参与板块排名
+UNCLASSIFIED = ''
+
+
+def build_frame(stock_info: dict, options: dict, ratings: dict) -> pd.DataFrame:
+    """合并为每只股票一行的表：sector, market_cap, change_pct, call_volume, put_volume, upside_pct"""
+    stocks = stock_info.get('stocks', {})
+    if not stocks:
+        return pd.DataFrame()
+    frame = pd.DataFrame.from_dict(stocks, orient='index')
+    frame = frame.reindex(columns=['sector', 'industry', 'market_cap', 'change_pct'])
+    frame['sector'] = frame['sector'].fillna(UNCLASSIFIED)
+
+    option_rows = options.get('stock_options') or options.get('top_25_stocks') or []
+    if option_rows:
+        volumes = pd.DataFrame(option_rows).set_index('symbol')[['call_volume', 'put_volume']]
+        frame = frame.join(volumes[~volumes.index.duplicated()])
+    else:
+        frame = frame.assign(call_volume=np.nan, put_volume=np.nan)
+
+    rating_rows = ratings.get('ratings') or []
+    if rating_rows:
+        upside = pd.DataFrame(rating_rows).set_index('symbol')['upside_pct']
+        frame = frame.join(upside[~upside.index.duplicated()])
+    else:
+        frame['upside_pct'] = np.nan
+
+    numeric = ['market_cap', 'change_pct', 'call_volume', 'put_volume', 'upside_pct']
+    frame[numeric] = frame[numeric].apply(pd.to_numeric, errors='coerce')
+    return frame
+
+
+def aggregate(frame: pd.DataFrame) -> pd.DataFrame:
+    """按板块聚合（frame 来自 build_frame）"""
+    change = frame['change_pct']
+    weighted = frame['market_cap'].where(change.notna())
+    frame = frame.assign(
+        advancing=(change > 0).astype(int),
+        declining=(change < 0).astype(int),
+        cap_change=change * weighted,
+        cap_weight=weighted,
+    )
+    grouped = frame.groupby('sector').agg(
+        symbols=('change_pct', 'size'),
+        advancing=('advancing', 'sum'),
+        declining=('declining', 'sum'),
+        market_cap=('market_cap', 'sum'),
+        cap_change=('cap_change', 'sum'),
+        cap_weight=('cap_weight', 'sum'),
+        avg_change=('change_pct', 'mean'),
+        call_volume=('call_volume', 'sum'),
+        put_volume=('put_volume', 'sum'),
+        avg_upside=('upside_pct', 'mean'),
+        rated=('upside_pct', 'count'),
+    )
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grouped['breadth'] = (grouped['advancing'] - grouped['declining']) / grouped['symbols']
+        grouped['cap_weighted_change'] = np.where(grouped['cap_weight'] > 0,
+                                                  grouped['cap_change'] / grouped['cap_weight'], np.nan)
+        grouped['pc_ratio'] = np.where(grouped['call_volume'] > 0,
+                                       grouped['put_volume'] / grouped['call_volume'], np.nan)
+    return grouped.drop(columns=['cap_change', 'cap_weight']).sort_values('market_cap', ascending=False)
+
+
+def _round(value, digits: int = 2):
+    """NaN 转为 None，其余四舍五入"""
+    return None if pd.isna(value) else round(float(value), digits)
+
+
+def to_records(grouped: pd.DataFrame) -> list:
+    return [
+        {
+            'sector': sector,
+            'symbols': int(row.symbols),
+            'advancing': int(row.advancing),
+            'declining': int(row.declining),
+            'breadth': _round(row.breadth),
+            'market_cap': _round(row.market_cap, 0),
+            'cap_weighted_change': _round(row.cap_weighted_change),
+            'avg_change': _round(row.avg_change),
+            'pc_ratio': _round(row.pc_ratio),
+            'call_volume': int(row.call_volume),
+            'put_volume': int(row.put_volume),
+            'avg_upside': _round(row.avg_upside, 1),
+            'rated': int(row.rated),
+        }
+        for sector, row in zip(grouped.index, grouped.itertuples())
+    ]
+
+
+def aggregate_sectors() -> dict:
+    """读取个股数据，按板块聚合并保存"""
+    print("Aggregating sectors...")
+    start = time.perf_counter()
+
+    frame = build_frame(read_json(DATA_DIR / 'stock_info.json'),
+                        read_json(DATA_DIR / 'options.json'),
+                        read_json(DATA_DIR / 'ratings.json'))
+    sectors, market = [], {}
+    if not frame.empty:
+        classified = frame[frame['sector'] != UNCLASSIFIED]
+        grouped = aggregate(classified)
+        sectors = to_records(grouped)
+        # 全市场汇总：所有有行业信息的股票视为一个板块
+        overall = aggregate(classified.assign(sector='market'))
+        market = to_records(overall)[0] if len(overall) else {}
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    result = {
+        'date': datetime.now().strftime('%Y-%m-%d'),
+        'fetch_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'symbols': int(len(frame)),
+        'elapsed_ms': elapsed_ms,
+        'market': market,
+        'sectors': sectors,
+    }
+    write_json(OUTPUT_FILE, result)
+
+    print(f"Aggregated {result['symbols']} symbols into {len(sectors)} sectors in {elapsed_ms} ms, "
+          f"saved to {OUTPUT_FILE}")
+    return result
+
+
+if __name__ == '__main__':
+    metrics.start_run('sectors')
+    with metrics.span('sectors'):
+        data = aggregate_sectors()
+    for s in data['sectors']:
+        print(f"  {s['sector']:<24} {s['symbols']:3d} symbols  {s['cap_weighted_change']}%  "
+              f"breadth {s['breadth']}  P/C {s['pc_ratio']}  upside {s['avg_upside']}%")
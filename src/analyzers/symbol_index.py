@@ -0,0 +1,118 @@
+"""股票 -> 新闻倒排索引 - 按股票代码查找相关新闻
+
+索引建立在只追加的新闻日志（data/news_log.jsonl）之上，只记录每条新闻
+在日志中的字节偏移：{股票代码: [偏移, ...]}（按时间先后）。每次抓取后
+从上次处理到的位置继续读日志，增量更新；查询时直接 seek 到偏移读取，
+耗时与日志长度无关，只和返回条数有关。
+"""
+
+import threading
+from pathlib import Path
+
+from src.utils.jsonio import loads, read_json, write_json
+from src.utils.news import related_symbols
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+NEWS_LOG_FILE = DATA_DIR / 'news_log.jsonl'
+INDEX_FILE = DATA_DIR / 'news_symbol_index.json'
+
+# 单次查询默认返回条数
+DEFAULT_LIMIT = 10
+
+
+def update_symbol_index(log_file: Path = NEWS_LOG_FILE, index_file: Path = INDEX_FILE) -> int:
+    """从上次处理到的位置继续读取新闻日志，更新倒排索引，返回新增新闻数"""
+    index = read_json(index_file)
+    offset = index.get('log_offset', 0)
+    symbols = index.get('symbols', {})
+
+    try:
+        size = log_file.stat().st_size
+    except FileNotFoundError:
+        return 0
+    # 日志被截断或替换时重建索引
+    if size < offset:
+        offset, symbols = 0, {}
+
+    added = 0
+    with open(log_file, 'rb') as f:
+        f.seek(offset)
+        while True:
+            position = f.tell()
+            line = f.readline()
+            # 未写完的尾行留到下次处理
+            if not line or not line.endswith(b'\n'):
+                break
+            offset = f.tell()
+            try:
+                news = loads(line)
+            except ValueError:
+                continue
+            for symbol in related_symbols(news):
+                symbols.setdefault(symbol.upper(), []).append(position)
+            added += 1
+
+    if added or offset != index.get('log_offset'):
+        write_json(index_file, {
+            'log_offset': offset,
+            'symbols': symbols,
+        })
+    return added
+
+
+class SymbolNewsIndex:
+    """倒排索引的只读视图（索引文件变化时自动重新加载）"""
+
+    def __init__(self, index_file: Path = INDEX_FILE, log_file: Path = NEWS_LOG_FILE):
+        self.index_file = index_file
+        self.log_file = log_file
+        self._mtime = None
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = self.index_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        symbols = read_json(self.index_file).get('symbols', {}) if mtime else {}
+        with self._lock:
+            self._mtime = mtime
+            self._symbols = symbols
+
+    def symbols(self) -> list:
+        """已索引的股票代码"""
+        self._refresh()
+        return sorted(self._symbols)
+
+    def lookup(self, symbol: str, limit: int = DEFAULT_LIMIT) -> list:
+        """返回某只股票最新的 limit 条相关新闻（新的在前）"""
+        self._refresh()
+        offsets = self._symbols.get(symbol.upper(), [])[-limit:]
+        if not offsets:
+            return []
+
+        results = []
+        try:
+            f = open(self.log_file, 'rb')
+        except FileNotFoundError:
+            # 日志被删除或轮转，索引重建前没有可返回的新闻
+            return []
+        with f:
+            for position in reversed(offsets):
+                f.seek(position)
+                try:
+                    results.append(loads(f.readline()))
+                except ValueError:
+                    continue
+        return results
+
+
+if __name__ == '__main__':
+    count = update_symbol_index()
+    index = SymbolNewsIndex()
+    print(f"Indexed {count} new articles, {len(index.symbols())} symbols total")
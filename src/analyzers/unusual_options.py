@@ -0,0 +1,288 @@
+"""期权异动检测 - 按行权价的滚动成交量 / 未平仓量基线
+
+基线按 (标的, 类型, 行权价) 聚合（同一行权价近几个到期日合并），保存最近
+BASELINE_DAYS 个交易日的成交量和未平仓量，存放在 data/options_baseline.npz：
+- 每个行权价一行，环形缓冲 [N, 天数, 2] 加上累计和 / 平方和，
+  新的一天只写一个槽位并更新累计量，均值和标准差 O(1) 得到
+- 同一交易日多次刷新时替换当天的槽位，不会重复计入；窗口已满时当天首次写入移出的
+  最旧值另存一份，再次刷新时先恢复，因此同一天每次刷新得到的基线都相同
+每次刷新只处理本次期权链中的行（O(新行数)），不回看历史数据。
+
+异动条件（当日成交量至少 MIN_VOLUME）：
+- 成交量 / 未平仓量 >= VOL_OI_THRESHOLD（多为新开仓）
+- 或成交量相对基线的 z-score >= Z_SCORE_THRESHOLD（基线至少 MIN_HISTORY_DAYS 天）
+"""
+
+import io
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.utils import metrics
+from src.utils.jsonio import atomic_write, read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+BASELINE_FILE = DATA_DIR / 'options_baseline.npz'
+OUTPUT_FILE = DATA_DIR / 'unusual_options.json'
+
+# 基线窗口（交易日）
+BASELINE_DAYS = 20
+
+# 基线至少需要的天数（不足时只用量仓比判断）
+MIN_HISTORY_DAYS = 5
+
+# 异动阈值
+MIN_VOLUME = 500
+VOL_OI_THRESHOLD = 1.5
+Z_SCORE_THRESHOLD = 3.0
+
+# 超过该天数没有出现的行权价从基线中移除
+STALE_DAYS = 30
+
+# 输出的异动合约数量
+MAX_RESULTS = 25
+
+# 基线字段：成交量、未平仓量
+FIELDS = ('volume', 'open_interest')
+
+
+def _day_number(date: str) -> int:
+    """日期转为距 1970-01-01 的天数"""
+    return int(np.datetime64(date, 'D').astype(np.int64))
+
+
+class Baseline:
+    """按行权价的滚动基线（numpy 数组，保存为 npz）"""
+
+    def __init__(self, keys=None, values=None, pos=None, count=None, last_day=None, sums=None, sumsq=None,
+                 evicted=None, has_evicted=None):
+        n = 0 if keys is None else len(keys)
+        self.keys = list(keys) if keys is not None else []
+        self.values = values if values is not None else np.zeros((n, BASELINE_DAYS, len(FIELDS)), np.int32)
+        self.pos = pos if pos is not None else np.zeros(n, np.int16)
+        self.count = count if count is not None else np.zeros(n, np.int16)
+        self.last_day = last_day if last_day is not None else np.zeros(n, np.int32)
+        self.sums = sums if sums is not None else np.zeros((n, len(FIELDS)), np.float64)
+        self.sumsq = sumsq if sumsq is not None else np.zeros((n, len(FIELDS)), np.float64)
+        # 当天首次写入时移出窗口的最旧值（同一天再次刷新时恢复）
+        self.evicted = evicted if evicted is not None else np.zeros((n, len(FIELDS)), np.int32)
+        self.has_evicted = has_evicted if has_evicted is not None else np.zeros(n, bool)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def load(cls, path: Path = BASELINE_FILE) -> 'Baseline':
+        try:
+            with np.load(path) as data:
+                # 窗口长度改变后旧基线不再适用
+                if data['values'].shape[1:] != (BASELINE_DAYS, len(FIELDS)):
+                    return cls()
+                # 早期的基线文件没有保存移出值
+                evicted = (data['evicted'], data['has_evicted']) if 'evicted' in data.files else (None, None)
+                return cls(data['keys'].tolist(), data['values'], data['pos'], data['count'],
+                           data['last_day'], data['sums'], data['sumsq'], *evicted)
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, path: Path = BASELINE_FILE, today: int = None):
+        """保存基线（顺带移除长期未出现的行权价）"""
+        keep = slice(None)
+        if today is not None and self.keys:
+            keep = self.last_day >= today - STALE_DAYS
+        buffer = io.BytesIO()
+        np.savez(buffer, keys=np.array(self.keys, dtype=str)[keep], values=self.values[keep],
+                 pos=self.pos[keep], count=self.count[keep], last_day=self.last_day[keep],
+                 sums=self.sums[keep], sumsq=self.sumsq[keep],
+                 evicted=self.evicted[keep], has_evicted=self.has_evicted[keep])
+        atomic_write(path, buffer.getvalue())
+
+    def rows(self, keys: list) -> np.ndarray:
+        """返回各 key 的行号，新 key 追加新行"""
+        new_keys = [key for key in keys if key not in self.index]
+        if new_keys:
+            start = len(self.keys)
+            for i, key in enumerate(new_keys):
+                self.index[key] = start + i
+            self.keys.extend(new_keys)
+            n = len(new_keys)
+            self.values = np.concatenate([self.values, np.zeros((n, BASELINE_DAYS, len(FIELDS)), np.int32)])
+            self.pos = np.concatenate([self.pos, np.zeros(n, np.int16)])
+            self.count = np.concatenate([self.count, np.zeros(n, np.int16)])
+            self.last_day = np.concatenate([self.last_day, np.zeros(n, np.int32)])
+            self.sums = np.concatenate([self.sums, np.zeros((n, len(FIELDS)))])
+            self.sumsq = np.concatenate([self.sumsq, np.zeros((n, len(FIELDS)))])
+            self.evicted = np.concatenate([self.evicted, np.zeros((n, len(FIELDS)), np.int32)])
+            self.has_evicted = np.concatenate([self.has_evicted, np.zeros(n, bool)])
+        return np.array([self.index[key] for key in keys], dtype=np.int64)
+
+    def update(self, rows: np.ndarray, day: int, observed: np.ndarray) -> tuple:
+        """写入当天的观测值 [len(rows), 字段数]（rows 不重复）
+
+        返回写入前的基线 (均值, 标准差, 天数)，不含当天，用于判断当天是否异常。
+        """
+        # 同一天再次刷新：先撤销当天已写入的值，并放回当天首次写入时移出的最旧值
+        same_day = self.last_day[rows] == day
+        if same_day.any():
+            r = rows[same_day]
+            slot = (self.pos[r].astype(np.int64) - 1) % BASELINE_DAYS
+            old = self.values[r, slot].astype(np.float64)
+            self.sums[r] -= old
+            self.sumsq[r] -= old * old
+            self.count[r] -= 1
+
+            restore = self.has_evicted[r]
+            r, slot = r[restore], slot[restore]
+            evicted = self.evicted[r]
+            self.values[r, slot] = evicted
+            evicted = evicted.astype(np.float64)
+            self.sums[r] += evicted
+            self.sumsq[r] += evicted * evicted
+            self.count[r] += 1
+
+        count = self.count[rows].astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = self.sums[rows] / count[:, None]
+            variance = np.maximum(self.sumsq[rows] / count[:, None] - mean * mean, 0)
+        baseline = (mean, np.sqrt(variance), self.count[rows].copy())
+
+        # 新的一天写入下一个槽位（同一天写回当天的槽位），窗口已满时先移出最旧的值
+        slot = np.where(same_day, (self.pos[rows].astype(np.int64) - 1) % BASELINE_DAYS, self.pos[rows])
+        full = self.count[rows] >= BASELINE_DAYS
+        self.has_evicted[rows] = full
+        if full.any():
+            r, s = rows[full], slot[full]
+            self.evicted[r] = self.values[r, s]
+            evicted = self.values[r, s].astype(np.float64)
+            self.sums[r] -= evicted
+            self.sumsq[r] -= evicted * evicted
+            self.count[r] -= 1
+
+        observed = observed.astype(np.float64)
+        self.values[rows, slot] = observed.astype(np.int32)
+        self.sums[rows] += observed
+        self.sumsq[rows] += observed * observed
+        self.count[rows] += 1
+        self.pos[rows] = (slot + 1) % BASELINE_DAYS
+        self.last_day[rows] = day
+        return baseline
+
+
+def aggregate_strikes(chains: dict) -> pd.DataFrame:
+    """把列式期权链按 (标的, 类型, 行权价) 汇总成交量和未平仓量
+
+    expiry 取该行权价成交量最大的到期日。
+    """
+    frames = []
+    for symbol, chain in chains.items():
+        contracts = chain.get('contracts', {})
+        if not contracts.get('strike'):
+            continue
+        frame = pd.DataFrame({key: contracts[key] for key in ('type', 'expiry', 'strike', 'volume', 'open_interest')})
+        frame['symbol'] = symbol
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True).sort_values('volume', ascending=False)
+    keys = ['symbol', 'type', 'strike']
+    return df.groupby(keys, sort=False).agg(
+        volume=('volume', 'sum'),
+        open_interest=('open_interest', 'sum'),
+        expiry=('expiry', 'first'),
+    ).reset_index()
+
+
+def detect_unusual(df: pd.DataFrame, mean: np.ndarray, std: np.ndarray, history: np.ndarray) -> pd.DataFrame:
+    """按量仓比和 z-score 标记异动行权价"""
+    volume = df['volume'].to_numpy(dtype=np.float64)
+    open_interest = df['open_interest'].to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vol_oi = np.where(open_interest > 0, volume / open_interest, np.nan)
+        z_score = np.where((history >= MIN_HISTORY_DAYS) & (std[:, 0] > 0),
+                           (volume - mean[:, 0]) / std[:, 0], np.nan)
+
+    by_vol_oi = (volume >= MIN_VOLUME) & (vol_oi >= VOL_OI_THRESHOLD)
+    by_z = (volume >= MIN_VOLUME) & (z_score >= Z_SCORE_THRESHOLD)
+    df = df.assign(
+        vol_oi=vol_oi,
+        z_score=z_score,
+        avg_volume=np.where(history > 0, mean[:, 0], np.nan),
+        history_days=history,
+        flag_vol_oi=by_vol_oi,
+        flag_z=by_z,
+    )
+    flagged = df[by_vol_oi | by_z]
+    # 两个条件都满足的排在前面，其次按 z-score、量仓比
+    return flagged.assign(
+        flags=flagged['flag_vol_oi'].astype(int) + flagged['flag_z'].astype(int),
+    ).sort_values(['flags', 'z_score', 'vol_oi'], ascending=False, na_position='last')
+
+
+def _round(value, digits: int = 2):
+    """NaN 转为 None，其余四舍五入"""
+    return None if pd.isna(value) else round(float(value), digits)
+
+
+def scan_unusual_options() -> dict:
+    """读取期权链，更新滚动基线并保存异动合约"""
+    print("Scanning unusual options activity...")
+
+    chain_data = read_json(DATA_DIR / 'options_chain.json')
+    date = chain_data.get('date') or datetime.now().strftime('%Y-%m-%d')
+    day = _day_number(date)
+
+    start = time.perf_counter()
+    df = aggregate_strikes(chain_data.get('chains', {}))
+    baseline = Baseline.load()
+    unusual = []
+    if not df.empty:
+        keys = (df['symbol'] + '|' + df['type'] + '|' + df['strike'].astype(float).astype(str)).tolist()
+        rows = baseline.rows(keys)
+        mean, std, history = baseline.update(rows, day, df[list(FIELDS)].to_numpy())
+        flagged = detect_unusual(df, mean, std, history)
+        unusual = [
+            {
+                'symbol': row.symbol,
+                'type': row.type,
+                'strike': float(row.strike),
+                'expiry': row.expiry,
+                'volume': int(row.volume),
+                'open_interest': int(row.open_interest),
+                'vol_oi': _round(row.vol_oi),
+                'z_score': _round(row.z_score, 1),
+                'avg_volume': _round(row.avg_volume, 0),
+                'history_days': int(row.history_days),
+                'reasons': [name for name, hit in (('vol_oi', row.flag_vol_oi), ('z_score', row.flag_z)) if hit],
+            }
+            for row in flagged.head(MAX_RESULTS).itertuples()
+        ]
+        baseline.save(today=day)
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    result = {
+        'date': date,
+        'fetch_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'baseline_days': BASELINE_DAYS,
+        'strikes_scanned': int(len(df)),
+        'strikes_tracked': len(baseline.keys),
+        'elapsed_ms': elapsed_ms,
+        'unusual': unusual,
+    }
+    write_json(OUTPUT_FILE, result)
+
+    print(f"Scanned {result['strikes_scanned']} strikes in {elapsed_ms} ms, "
+          f"{len(unusual)} unusual, saved to {OUTPUT_FILE}")
+    return result
+
+
+if __name__ == '__main__':
+    metrics.start_run('unusual_options')
+    with metrics.span('unusual_options'):
+        data = scan_unusual_options()
+    for u in data['unusual'][:10]:
+        print(f"  {u['symbol']} {u['type']}{u['strike']:g} {u['expiry']}: vol {u['volume']:,} "
+              f"OI {u['open_interest']:,} z {u['z_score']} ({', '.join(u['reasons'])})")
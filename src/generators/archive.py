@@ -0,0 +1,190 @@
+"""历史报告归档 - 构建时预渲染的静态归档页
+
+归档按月分页：output/archive/<YYYY-MM>.html 为每月一页，archive/index.html 为
+最新一月，archive/catalog.json 为完整报告列表（/api/reports）。每个文件同时写出
+gzip 预压缩版本（.gz），Web 服务直接发送文件，不做任何渲染。
+
+报告列表和各页内容摘要保存在 data/archive_index.json。每次构建只登记新生成的
+报告，摘要没变的页面不重新渲染、不重新发布；新增报告通常只影响当月页面、
+首页和相邻月份的翻页链接。
+"""
+
+import argparse
+import gzip
+import hashlib
+from datetime import datetime
+from pathlib import Path
+from jinja2 import Environment, FileSystemLoader
+
+from src.generators.publish import publish, unpublish
+from src.utils.jsonio import dumps, read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+TEMPLATE_DIR = Path(__file__).parent / 'templates'
+DATA_DIR = BASE_DIR / 'data'
+OUTPUT_DIR = BASE_DIR / 'output'
+STATE_FILE = DATA_DIR / 'archive_index.json'
+
+# 归档页在 output/ 下的目录
+ARCHIVE_PREFIX = 'archive'
+
+# 报告类型显示名称（中 / 英）
+TYPE_NAMES = {
+    'daily': ('综合日报', 'Daily Report'),
+    'premarket': ('盘前报告', 'Pre-Market'),
+    'options': ('期权日报', 'Options'),
+}
+
+# 归档页使用的模板（内容摘要包含模板本身，模板修改后全部页面重新渲染）
+TEMPLATES = ('archive.html', 'base.html')
+
+# gzip 压缩级别（构建时压缩一次，取最高级别）
+GZIP_LEVEL = 9
+
+
+def parse_report_name(filename: str):
+    """解析报告文件名（YYYY-MM-DD[-类型].html），不是日期报告时返回 None"""
+    name = Path(filename).stem
+    parts = name.split('-')
+    date = '-'.join(parts[:3])
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return None
+    report_type = parts[3] if len(parts) > 3 else 'daily'
+    zh, en = TYPE_NAMES.get(report_type, (report_type, report_type))
+    return {
+        'date': date,
+        'type': report_type,
+        'type_display': zh,
+        'type_display_en': en,
+        'filename': filename,
+        'url': f'/report/{date}?report_type={report_type}',
+    }
+
+
+def scan_reports(output_dir: Path = OUTPUT_DIR) -> dict:
+    """扫描 output/ 下已有的日期报告（首次建立归档或 --rebuild 时使用）"""
+    reports = {}
+    for file in output_dir.glob('*.html'):
+        report = parse_report_name(file.name)
+        if report:
+            reports[file.name] = report
+    return reports
+
+
+def paginate(reports: list) -> list:
+    """按月分页，返回 [{month, days: [{date, reports}], newer, older}]（新的在前）"""
+    months = {}
+    for report in sorted(reports, key=lambda r: (r['date'], r['type']), reverse=True):
+        days = months.setdefault(report['date'][:7], {})
+        days.setdefault(report['date'], []).append(report)
+
+    keys = sorted(months, reverse=True)
+    return [
+        {
+            'month': month,
+            'days': [{'date': date, 'reports': items} for date, items in months[month].items()],
+            'newer': keys[i - 1] if i > 0 else None,
+            'older': keys[i + 1] if i + 1 < len(keys) else None,
+        }
+        for i, month in enumerate(keys)
+    ]
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    """确定性的 gzip 压缩（mtime 固定为 0，内容不变则结果不变）"""
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def with_gzip(pages: dict) -> dict:
+    """为每个页面附加 .gz 预压缩版本"""
+    result = {}
+    for name, content in pages.items():
+        data = content if isinstance(content, bytes) else content.encode('utf-8')
+        result[f'{name}.gz'] = gzip_bytes(data)
+        result[name] = data
+    return result
+
+
+def update_archive(new_reports: list = None, rebuild: bool = False) -> list:
+    """登记新报告并重新渲染有变化的归档页，返回发布的页面名
+
+    new_reports 为本次构建生成的报告文件名；首次运行或 rebuild 时扫描 output/。
+    """
+    state = {} if rebuild else read_json(STATE_FILE)
+    reports = state.get('reports')
+    if reports is None:
+        reports = scan_reports(OUTPUT_DIR)
+    for filename in new_reports or []:
+        report = parse_report_name(filename)
+        if report:
+            reports[filename] = report
+
+    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+    template = env.get_template('archive.html')
+    template_digest = hashlib.blake2b(digest_size=8)
+    for name in TEMPLATES:
+        template_digest.update((TEMPLATE_DIR / name).read_bytes())
+
+    pages = paginate(list(reports.values()))
+    old_digests = state.get('pages', {})
+    digests = {}
+    changed = {}
+    for i, page in enumerate(pages):
+        names = [f"{ARCHIVE_PREFIX}/{page['month']}.html"]
+        if i == 0:
+            names.append(f'{ARCHIVE_PREFIX}/index.html')
+        digest = hashlib.blake2b(template_digest.digest() + dumps(page), digest_size=12).hexdigest()
+        for name in names:
+            digests[name] = digest
+            if old_digests.get(name) != digest or not (OUTPUT_DIR / name).exists():
+                changed[name] = page
+
+    catalog_name = f'{ARCHIVE_PREFIX}/catalog.json'
+    catalog = dumps({'reports': [r for page in pages for day in page['days'] for r in day['reports']]})
+    digests[catalog_name] = hashlib.blake2b(catalog, digest_size=12).hexdigest()
+
+    rendered = {}
+    for name, page in changed.items():
+        rendered[name] = template.render(page=page, months=len(pages))
+    if not pages:
+        index_name = f'{ARCHIVE_PREFIX}/index.html'
+        digests[index_name] = template_digest.hexdigest()
+        if old_digests.get(index_name) != digests[index_name] or not (OUTPUT_DIR / index_name).exists():
+            rendered[index_name] = template.render(page=None, months=0)
+    if old_digests.get(catalog_name) != digests[catalog_name] or not (OUTPUT_DIR / catalog_name).exists():
+        rendered[catalog_name] = catalog
+
+    if rendered:
+        publish(with_gzip(rendered))
+    # 报告被删除后不再有内容的月份页（经发布器下线，manifest 中的记录一并删除）
+    removed = [
+        name
+        for path in (OUTPUT_DIR / ARCHIVE_PREFIX).glob('*.html')
+        if f'{ARCHIVE_PREFIX}/{path.name}' not in digests
+        for name in (f'{ARCHIVE_PREFIX}/{path.name}', f'{ARCHIVE_PREFIX}/{path.name}.gz')
+    ]
+    if removed:
+        unpublish(removed)
+    write_json(STATE_FILE, {
+        'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'reports': reports,
+        'pages': digests,
+    })
+    return sorted(rendered)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the static report archive')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Rescan output/ and re-render every archive page')
+    args = parser.parse_args()
+
+    updated = update_archive(rebuild=args.rebuild)
+    print(f"Archive pages updated: {', '.join(updated) if updated else 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""历史报告重建 - 从输入快照重新渲染一段日期的合并日报
+
+    python -m src.generators.backfill --from 2026-10-01 --to 2026-10-17
+
+- 每个日期读取 data/history/<date>.json.gz（见 src.generators.history），用与当天构建
+  相同的 render_combined 渲染日报页面和 Tab 片段
+- 多个日期分发到进程池并行渲染；每个工作进程只创建一次模板环境，编译好的模板在
+  该进程负责的所有日期间复用
+- 快照和模板都没有变化、且日报仍在 output/ 时跳过该日期（摘要保存在
+  data/backfill_state.json）；渲染结果与现有文件相同的页面不重新发布
+- 不改动 index.html（始终是最新一次构建的日报），完成后登记到归档页
+"""
+
+import argparse
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from src.generators.archive import update_archive
+from src.generators.build import TEMPLATE_DIR, get_environment, render_combined, setup_output_dir
+from src.generators.history import load_snapshot, snapshot_dates, snapshot_path
+from src.generators.publish import publish
+from src.utils import metrics
+from src.utils.jsonio import read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+OUTPUT_DIR = BASE_DIR / 'output'
+STATE_FILE = DATA_DIR / 'backfill_state.json'
+
+
+def templates_digest() -> bytes:
+    """全部模板文件的摘要（任一模板变化时所有日期都需要重新渲染）"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in sorted(TEMPLATE_DIR.rglob('*.html')):
+        digest.update(str(path.relative_to(TEMPLATE_DIR)).encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.digest()
+
+
+def input_digest(date: str, template_digest: bytes) -> str:
+    """某天的输入摘要：模板 + 快照文件"""
+    return hashlib.blake2b(template_digest + snapshot_path(date).read_bytes(), digest_size=12).hexdigest()
+
+
+def render_date(date: str) -> tuple:
+    """渲染某天的日报（在工作进程中执行），返回 (日期, 页面)"""
+    stages = metrics.StageTimer('backfill')
+    pages = render_combined(get_environment(), load_snapshot(date), stages)
+    stages.done()
+    return date, pages
+
+
+def unchanged(name: str, content: str) -> bool:
+    """渲染结果是否与 output/ 中现有文件相同"""
+    path = OUTPUT_DIR / name
+    return path.exists() and path.read_bytes() == content.encode('utf-8')
+
+
+def backfill(start: str = None, end: str = None, workers: int = None, force: bool = False) -> dict:
+    """重建 [start, end] 内有快照的日期，返回 {'rendered', 'published', 'skipped'} 日期列表"""
+    dates = snapshot_dates(start, end)
+    state = read_json(STATE_FILE)
+    digests = state.get('dates', {})
+    template_digest = templates_digest()
+
+    current = {date: input_digest(date, template_digest) for date in dates}
+    todo = [
+        date for date in dates
+        if force or digests.get(date) != current[date] or not (OUTPUT_DIR / f'{date}-daily.html').exists()
+    ]
+    result = {'rendered': todo, 'published': [], 'skipped': [d for d in dates if d not in todo]}
+    if not todo:
+        return result
+
+    setup_output_dir()
+    workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+    print(f"Rendering {len(todo)} dates with {workers} workers "
+          f"({len(result['skipped'])} unchanged dates skipped)")
+
+    def handle(date: str, pages: dict):
+        # 只发布内容有变化的页面，整天都没变化时不发布
+        changed = {name: content for name, content in pages.items() if not unchanged(name, content)}
+        if changed:
+            publish(changed)
+            result['published'].append(date)
+        digests[date] = current[date]
+        print(f"  {date}: {len(changed)}/{len(pages)} pages changed")
+
+    try:
+        if workers == 1:
+            for date in todo:
+                handle(*render_date(date))
+        else:
+            # 每个工作进程在启动时创建一次模板环境
+            with ProcessPoolExecutor(max_workers=workers, initializer=get_environment) as pool:
+                for date, pages in pool.map(render_date, todo):
+                    handle(date, pages)
+    finally:
+        write_json(STATE_FILE, {
+            'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'dates': digests,
+        })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild combined reports for a date range from stored snapshots')
+    parser.add_argument('--from', dest='start', help='First date (YYYY-MM-DD), defaults to the oldest snapshot')
+    parser.add_argument('--to', dest='end', help='Last date (YYYY-MM-DD), defaults to the newest snapshot')
+    parser.add_argument('--workers', type=int, default=None, help='Parallel render processes (default: CPU count)')
+    parser.add_argument('--force', action='store_true', help='Re-render dates whose inputs have not changed')
+    args = parser.parse_args()
+    for value in (args.start, args.end):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                parser.error(f"invalid date: {value}")
+
+    metrics.start_run('backfill')
+    with metrics.span('backfill'):
+        result = backfill(args.start, args.end, args.workers, args.force)
+    if not result['rendered'] and not result['skipped']:
+        print("No snapshots in range")
+        return
+
+    with metrics.span('archive'):
+        updated = update_archive([f'{date}-daily.html' for date in result['published']])
+    if updated:
+        print(f"Archive pages updated: {', '.join(updated)}")
+    print(f"Backfill done: {len(result['published'])} published, "
+          f"{len(result['rendered']) - len(result['published'])} unchanged after render, "
+          f"{len(result['skipped'])} skipped")
+
+
+if __name__ == '__main__':
+    main()
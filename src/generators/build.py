@@ -1,12 +1,20 @@
 """报告生成模块 - 使用 Jinja2 渲染 HTML"""
 
-import json
 import argparse
-import shutil
 from datetime import datetime
 from pathlib import Path
 from jinja2 import Environment, FileSystemLoader
 
+from src.analyzers.news_clusters import top_news
+from src.analyzers.symbol_index import SymbolNewsIndex
+from src.generators.archive import update_archive
+from src.generators.changes import SECTION_FILES, detect_changes, record_hash
+from src.generators.history import save_snapshot
+from src.generators.publish import MANIFEST_FILE, publish
+from src.utils import metrics
+from src.utils.jsonio import atomic_write, dumps, read_json, write_json
+from src.utils.profiling import Profiler
+
 
 # 路径配置
 BASE_DIR = Path(__file__).parent.parent.parent
@@ -14,14 +22,95 @@ TEMPLATE_DIR = Path(__file__).parent / 'templates'
 DATA_DIR = BASE_DIR / 'data'
 OUTPUT_DIR = BASE_DIR / 'output'
 
+# Tooltip 需要的股票信息字段
+TOOLTIP_FIELDS = [
+    'name', 'current_price', 'change', 'change_pct', 'volume_formatted',
+    'market_cap_formatted', 'day_high', 'day_low', 'sector'
+]
+
+# Tooltip 中显示的相关新闻条数
+TOOLTIP_NEWS_COUNT = 3
+
+# 合并日报读取的数据文件（全部保存进历史快照）
+REPORT_FILES = (
+    'calendar.json', 'earnings.json', 'ratings.json', 'news.json', 'stock_info.json',
+    'sectors.json', 'analysis.json', 'options.json', 'greeks.json', 'unusual_options.json', 'quotes.json',
+)
+
+# 盘前数据文件（页面显示其中最新的更新时间）
+PREMARKET_FILES = ('calendar.json', 'earnings.json', 'ratings.json', 'news.json')
+
+# 各 Tab 片段读取的数据文件；输入、模板都没有变化的片段不再重新渲染和发布
+FRAGMENT_FILES = {
+    'premarket.html': ('calendar.json', 'earnings.json', 'ratings.json', 'news.json', 'stock_info.json',
+                       'sectors.json', 'analysis.json', 'quotes.json'),
+    'options.html': ('options.json', 'greeks.json', 'unusual_options.json', 'stock_info.json'),
+    'tooltips.json': ('stock_info.json',),
+}
+
+# 已发布片段的输入指纹 {相对 output/ 的路径: 哈希}
+FRAGMENT_STATE_FILE = DATA_DIR / 'fragment_state.json'
+
+# 行情走势小图（SVG viewBox）的宽高
+SPARKLINE_SIZE = (100, 28)
+
+# 进程内共享的模板环境（编译过的模板在多次渲染间复用）
+_environment = None
+
+
+def sparkline_points(points: list) -> str:
+    """[[时间戳, 价格], ...] -> SVG polyline 的 points（横轴按点序号，纵轴按价格区间缩放）"""
+    if len(points) < 2:
+        return ''
+    width, height = SPARKLINE_SIZE
+    prices = [price for _, price in points]
+    low, high = min(prices), max(prices)
+    span = (high - low) or 1
+    step = width / (len(prices) - 1)
+    return ' '.join(f'{i * step:.1f},{height - (price - low) / span * height:.1f}' for i, price in enumerate(prices))
+
+
+def get_environment() -> Environment:
+    global _environment
+    if _environment is None:
+        _environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
+        _environment.filters['sparkline'] = sparkline_points
+        _environment.globals['sparkline_size'] = SPARKLINE_SIZE
+    return _environment
+
 
 def load_json(filename: str) -> dict:
     """加载 JSON 数据文件"""
-    filepath = DATA_DIR / filename
-    if filepath.exists():
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+    return read_json(DATA_DIR / filename)
+
+
+def stale_sections(data_files: dict, today: str = None) -> dict:
+    """找出过期的数据板块 {板块: 上次成功抓取时间}
+
+    抓取失败时数据文件保留上次内容并在 _meta 中标记 stale；
+    没有 _meta 的旧文件按数据日期（与报告日期 today 比较）判断。
+    """
+    today = today or datetime.now().strftime('%Y-%m-%d')
+    stale = {}
+    for section, data in data_files.items():
+        if not data:
+            continue
+        meta = data.get('_meta', {})
+        if meta.get('stale') or data.get('date', today) != today:
+            stale[section] = meta.get('fetched_at') or data.get('fetch_time') or data.get('date', '')
+    return stale
+
+
+def report_stale(files: dict, today: str) -> dict:
+    """合并日报中显示"数据过期"的板块"""
+    return stale_sections({
+        'calendar': files.get('calendar.json', {}),
+        'earnings': files.get('earnings.json', {}),
+        'ratings': files.get('ratings.json', {}),
+        'news': files.get('news.json', {}),
+        'options': files.get('options.json', {}),
+        'quotes': files.get('quotes.json', {}),
+    }, today)
 
 
 def setup_output_dir():
@@ -34,7 +123,7 @@ def setup_output_dir():
     css_src = TEMPLATE_DIR / 'styles.css'
     css_dst = assets_dir / 'styles.css'
     if css_src.exists():
-        shutil.copy(css_src, css_dst)
+        atomic_write(css_dst, css_src.read_bytes())
 
 
 def build_premarket_report(analysis_data: dict = None) -> str:
@@ -59,6 +148,8 @@ def build_premarket_report(analysis_data: dict = None) -> str:
             calendar_events.append({
                 'time': event.get('time', '')[11:16],  # 只取时间部分
                 'event': event.get('event', ''),
+                'impact': event.get('impact', 'medium'),
+                'actual': event.get('actual'),
                 'estimate': event.get('estimate'),
                 'prev': event.get('prev')
             })
@@ -94,13 +185,12 @@ def build_premarket_report(analysis_data: dict = None) -> str:
         core_news = analysis_data.get('core_news', [])
         focus_areas = analysis_data.get('focus_areas', [])
     else:
-        # 默认使用原始新闻标题
-        if news_data.get('news'):
-            for i, news in enumerate(news_data['news'][:7], 1):
-                core_news.append({
-                    'tag': '市场',
-                    'summary': news.get('headline', '')[:60]
-                })
+        # 默认使用原始新闻标题（近似重复的报道只取一条）
+        for news in top_news(news_data, 7):
+            core_news.append({
+                'tag': '市场',
+                'summary': news.get('headline', '')[:60]
+            })
 
     # 渲染 HTML
     html = template.render(
@@ -117,15 +207,9 @@ def build_premarket_report(analysis_data: dict = None) -> str:
     # 保存文件
     setup_output_dir()
 
-    # 保存为日期命名的文件
+    # 保存为日期命名的文件，同时更新 index.html
     output_file = OUTPUT_DIR / f'{today}-premarket.html'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
-
-    # 同时更新 index.html
-    index_file = OUTPUT_DIR / 'index.html'
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    publish({output_file.name: html, 'index.html': html})
 
     print(f"Premarket report saved to {output_file}")
     return str(output_file)
@@ -189,8 +273,7 @@ def build_options_report(analysis_data: dict = None) -> str:
     setup_output_dir()
 
     output_file = OUTPUT_DIR / f'{today}-options.html'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    publish({output_file.name: html})
 
     print(f"Options report saved to {output_file}")
     return str(output_file)
@@ -211,20 +294,95 @@ def get_file_update_time(filename: str) -> str:
     return '--'
 
 
-def build_combined_report(premarket_analysis: dict = None, options_analysis: dict = None) -> str:
-    """生成合并的日报 HTML（带 Tab 切换）"""
-    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
-    template = env.get_template('combined.html')
+def collect_combined_inputs(premarket_analysis: dict = None) -> dict:
+    """读取合并日报的全部输入（数据文件、更新时间、变化检测、tooltip 新闻）
 
+    结果可以原样保存为历史快照（src.generators.history），之后用 render_combined
+    重新渲染出同样的页面。
+    """
     today = datetime.now().strftime('%Y-%m-%d')
+    files = {name: load_json(name) for name in REPORT_FILES}
+    stock_info = files['stock_info.json'].get('stocks', {})
+
+    # 与上次报告对比
+    changes = detect_changes({section: files[name] for section, name in SECTION_FILES.items()})
+    if changes['changed_sections']:
+        print(f"Changed sections: {', '.join(changes['changed_sections'])}")
+
+    # Tooltip 中该股票最新的相关新闻
+    news_index = SymbolNewsIndex()
+    tooltip_news = {
+        symbol: [
+            {'headline': n.get('headline', ''), 'url': n.get('url', ''), 'datetime': n.get('datetime', '')}
+            for n in news_index.lookup(symbol, TOOLTIP_NEWS_COUNT)
+        ]
+        for symbol, info in stock_info.items() if info.get('name')
+    }
+
+    return {
+        'date': today,
+        'built_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'files': files,
+        'update_times': {name: get_file_update_time(name) for name in PREMARKET_FILES + ('options.json',)},
+        'changes': changes,
+        'tooltip_news': tooltip_news,
+        'premarket_analysis': premarket_analysis,
+    }
+
+
+def fragment_fingerprints(env: Environment, inputs: dict) -> dict:
+    """各 Tab 片段的输入指纹 {相对 output/ 的路径: 哈希}
+
+    包括片段读取的数据文件、过期标记、模板源码，盘前片段另含变化检测结果和外部分析，
+    tooltip 另含相关新闻。
+    """
+    files = inputs['files']
+    stale = report_stale(files, inputs['date'])
+    extras = {
+        'premarket.html': [inputs.get('changes'), inputs.get('premarket_analysis')],
+        'tooltips.json': [inputs.get('tooltip_news')],
+    }
+    fingerprints = {}
+    for fragment, names in FRAGMENT_FILES.items():
+        parts = [files.get(name) for name in names] + extras.get(fragment, []) + [stale]
+        if fragment.endswith('.html'):
+            parts += [env.loader.get_source(env, template)[0]
+                      for template in (f'fragments/{fragment}', 'macros.html')]
+        fingerprints[f"fragments/{inputs['date']}/{fragment}"] = record_hash(parts)
+    return fingerprints
+
+
+def unchanged_fragments(fingerprints: dict) -> set:
+    """输入与上次发布时相同、且仍在 manifest 中的片段路径"""
+    published = read_json(FRAGMENT_STATE_FILE)
+    files = read_json(MANIFEST_FILE).get('files', {})
+    return {path for path, fingerprint in fingerprints.items()
+            if published.get(path) == fingerprint and path in files}
+
+
+def render_combined(env: Environment, inputs: dict, stages: metrics.StageTimer, skip: set = frozenset()) -> dict:
+    """按输入渲染某一天的合并日报，返回 {相对 output/ 的路径: 内容}（不含 index.html）
+
+    skip 中的片段（相对 output/ 的路径）不渲染，也不出现在返回结果中。
+    backfill 重放的旧快照可能缺少之后才加入 REPORT_FILES 的数据文件，缺少的按空数据渲染。
+    """
+    files = inputs['files']
+    today = inputs['date']
+    fragment_dir = f'fragments/{today}'
+    pages = {}
 
     # ===== 盘前数据 =====
-    calendar_data = load_json('calendar.json')
-    earnings_data = load_json('earnings.json')
-    ratings_data = load_json('ratings.json')
-    news_data = load_json('news.json')
-    stock_info_data = load_json('stock_info.json')
+    stages.lap('load_premarket')
+    calendar_data = files.get('calendar.json', {})
+    earnings_data = files.get('earnings.json', {})
+    ratings_data = files.get('ratings.json', {})
+    news_data = files.get('news.json', {})
+    stock_info_data = files.get('stock_info.json', {})
     stock_info = stock_info_data.get('stocks', {}) if stock_info_data else {}
+    premarket_analysis = inputs.get('premarket_analysis')
+
+    # 盘前行情（src.scrapers.quotes 轮询）
+    quotes = files.get('quotes.json', {})
 
     # 处理日历事件
     calendar_events = []
@@ -233,16 +391,24 @@ def build_combined_report(premarket_analysis: dict = None, options_analysis: dic
             calendar_events.append({
                 'time': event.get('time', '')[11:16],
                 'event': event.get('event', ''),
+                'impact': event.get('impact', 'medium'),
+                'actual': event.get('actual'),
                 'estimate': event.get('estimate'),
                 'prev': event.get('prev')
             })
+    week_events = calendar_data.get('week_events', [])[:8]
+
+    # 板块汇总（src.analyzers.sectors）
+    sectors = files.get('sectors.json', {})
 
     # 处理财报数据
     earnings = None
     if earnings_data:
         earnings = {
             'before_market': earnings_data.get('before_market', [])[:10],
-            'after_market': earnings_data.get('after_market', [])[:10]
+            'after_market': earnings_data.get('after_market', [])[:10],
+            'recent_results': earnings_data.get('recent_results', [])[:10],
+            'week_ahead': earnings_data.get('week_ahead', [])
         }
 
     # 处理评级变化 - 按股票合并
@@ -274,27 +440,30 @@ def build_combined_report(premarket_analysis: dict = None, options_analysis: dic
     rating_changes = list(grouped.values())[:8]
 
     # 智能分析数据 - 优先从 analysis.json 读取
-    analysis_data = load_json('analysis.json')
+    analysis_data = files.get('analysis.json', {})
     core_news = []
     focus_areas = []
+    symbol_notes = []
 
     if analysis_data:
         core_news = analysis_data.get('core_news', [])
         focus_areas = analysis_data.get('focus_areas', [])
+        symbol_notes = analysis_data.get('symbol_notes', [])
     elif premarket_analysis:
         core_news = premarket_analysis.get('core_news', [])
         focus_areas = premarket_analysis.get('focus_areas', [])
     else:
-        if news_data.get('news'):
-            for i, news in enumerate(news_data['news'][:7], 1):
-                core_news.append({
-                    'tag': '市场',
-                    'summary': news.get('headline', '')[:60]
-                })
+        # 默认使用原始新闻标题（近似重复的报道只取一条）
+        for news in top_news(news_data, 7):
+            core_news.append({
+                'tag': '市场',
+                'summary': news.get('headline', '')[:60]
+            })
 
     # ===== 期权数据 =====
-    options_data = load_json('options.json')
-    market_overview = options_data.get('market_overview', {})
+    stages.lap('load_options')
+    options_data = files.get('options.json', {})
+    market_overview = dict(options_data.get('market_overview', {}))
 
     sentiment = market_overview.get('sentiment', '中性')
     if '看涨' in sentiment:
@@ -331,43 +500,104 @@ def build_combined_report(premarket_analysis: dict = None, options_analysis: dic
             'pc_ratio': pc_ratio
         })
 
-    # ===== 获取更新时间 =====
-    # 盘前数据更新时间取最新的数据文件
-    premarket_files = ['calendar.json', 'earnings.json', 'ratings.json', 'news.json']
-    premarket_times = [get_file_update_time(f) for f in premarket_files]
-    premarket_update_time = max(premarket_times) if premarket_times else '--:--'
+    # 波动率曲面汇总（IV 期限结构 / 偏度 / Gamma 敞口）
+    greeks_data = files.get('greeks.json', {})
+    vol_surface = greeks_data.get('underlyings', [])[:15]
 
-    options_update_time = get_file_update_time('options.json')
+    # 期权异动（成交量相对 20 日基线或未平仓量明显放大的行权价）
+    unusual_data = files.get('unusual_options.json', {})
+    unusual_options = unusual_data.get('unusual', [])[:15]
 
-    # 渲染 HTML
-    html = template.render(
+    # ===== 更新时间 =====
+    # 盘前数据更新时间取最新的数据文件
+    update_times = inputs.get('update_times', {})
+    premarket_update_time = max(update_times.get(name, '--') for name in PREMARKET_FILES)
+    options_update_time = update_times.get('options.json', '--')
+
+    changes = inputs.get('changes', {})
+    stale = report_stale(files, today)
+    if stale:
+        print(f"Stale sections: {', '.join(stale)}")
+
+    # 渲染页面外壳（各 Tab 内容由浏览器按需加载）
+    stages.lap('render')
+    html = env.get_template('combined.html').render(
         date=today,
         premarket_update_time=premarket_update_time,
         options_update_time=options_update_time,
-        # 盘前数据
-        calendar_events=calendar_events,
-        earnings=earnings,
-        rating_changes=rating_changes,
-        core_news=core_news,
-        focus_areas=focus_areas,
-        stock_info=stock_info,
-        # 期权数据
-        market_overview=market_overview,
-        index_options=index_options,
-        top_25_stocks=top_25_stocks,
     )
 
+    # 渲染各 Tab 片段
+    if f'{fragment_dir}/premarket.html' not in skip:
+        pages[f'{fragment_dir}/premarket.html'] = env.get_template('fragments/premarket.html').render(
+            quotes=quotes,
+            calendar_events=calendar_events,
+            week_events=week_events,
+            sectors=sectors,
+            earnings=earnings,
+            rating_changes=rating_changes,
+            core_news=core_news,
+            focus_areas=focus_areas,
+            symbol_notes=symbol_notes,
+            stock_info=stock_info,
+            changes=changes,
+            stale=stale,
+        )
+    if f'{fragment_dir}/options.html' not in skip:
+        pages[f'{fragment_dir}/options.html'] = env.get_template('fragments/options.html').render(
+            market_overview=market_overview,
+            index_options=index_options,
+            top_25_stocks=top_25_stocks,
+            vol_surface=vol_surface,
+            unusual_options=unusual_options,
+            stock_info=stock_info,
+            stale=stale,
+        )
+
+    # Tooltip 数据（首次 hover 时加载），附带该股票最新的相关新闻
+    stages.lap('tooltips')
+    if f'{fragment_dir}/tooltips.json' not in skip:
+        tooltip_news = inputs.get('tooltip_news', {})
+        tooltips = {
+            symbol: {
+                **{field: info.get(field) for field in TOOLTIP_FIELDS},
+                'news': tooltip_news.get(symbol, []),
+            }
+            for symbol, info in stock_info.items() if info.get('name')
+        }
+        pages[f'{fragment_dir}/tooltips.json'] = dumps(tooltips).decode('utf-8')
+
+    pages[f'{today}-daily.html'] = html
+    return pages
+
+
+def build_combined_report(premarket_analysis: dict = None, options_analysis: dict = None) -> str:
+    """生成合并的日报 HTML（带 Tab 切换），并保存当天的输入快照供 backfill 使用
+
+    输入和模板都与上次发布时相同的 Tab 片段不重新渲染和发布（页面外壳和 index.html 每次都发布）。
+    """
+    stages = metrics.StageTimer('build')
+    stages.lap('collect')
+    inputs = collect_combined_inputs(premarket_analysis)
+    today = inputs['date']
+    save_snapshot(today, inputs)
+
+    env = get_environment()
+    fingerprints = fragment_fingerprints(env, inputs)
+    skip = unchanged_fragments(fingerprints)
+    if skip:
+        print(f"Unchanged fragments: {', '.join(sorted(skip))}")
+    pages = render_combined(env, inputs, stages, skip)
+
     # 保存文件
+    stages.lap('publish')
     setup_output_dir()
 
+    # 保存为日期命名的文件，同时更新 index.html
     output_file = OUTPUT_DIR / f'{today}-daily.html'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
-
-    # 同时更新 index.html
-    index_file = OUTPUT_DIR / 'index.html'
-    with open(index_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    publish({**pages, 'index.html': pages[output_file.name]})
+    write_json(FRAGMENT_STATE_FILE, fingerprints)
+    stages.done()
 
     print(f"Combined report saved to {output_file}")
     return str(output_file)
@@ -377,17 +607,41 @@ def main():
     parser = argparse.ArgumentParser(description='Build financial reports')
     parser.add_argument('--type', choices=['premarket', 'options', 'both', 'combined'],
                         default='combined', help='Report type to generate')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the build (cProfile, sampled flamegraph, import times) into profiles/')
     args = parser.parse_args()
 
-    if args.type == 'combined':
-        build_combined_report()
-    elif args.type == 'both':
-        build_premarket_report()
-        build_options_report()
-    elif args.type == 'premarket':
-        build_premarket_report()
-    elif args.type == 'options':
-        build_options_report()
+    metrics.start_run('build')
+
+    def build():
+        with metrics.span('build', report=args.type):
+            reports = []
+            if args.type == 'combined':
+                reports.append(build_combined_report())
+            elif args.type == 'both':
+                reports.append(build_premarket_report())
+                reports.append(build_options_report())
+            elif args.type == 'premarket':
+                reports.append(build_premarket_report())
+            elif args.type == 'options':
+                reports.append(build_options_report())
+
+        # 登记新报告，增量更新静态归档页
+        with metrics.span('archive'):
+            updated = update_archive([Path(r).name for r in reports])
+        if updated:
+            print(f"Archive pages updated: {', '.join(updated)}")
+
+    if not args.profile:
+        build()
+        return
+
+    profiler = Profiler('build')
+    import_seconds = profiler.profile_imports('src.generators.build')
+    _, error = profiler.profile(f'build.{args.type}', build, imports=import_seconds)
+    print(f"Profile written to {profiler.write_summary().parent}")
+    if error:
+        raise error
 
 
 if __name__ == '__main__':
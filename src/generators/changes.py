@@ -0,0 +1,205 @@
+"""报告变化检测模块 - 对比本次与上次数据快照
+
+把各数据文件展开为以 (类型, 股票, 字段) 为键的记录并做哈希，
+与上次快照逐键比较，输出结构化差异：新增评级变化、P/C 大幅波动、
+新增财报、价格大幅变动，以及内容发生变化的板块列表。
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from pathlib import Path
+
+from src.utils.jsonio import read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+SNAPSHOT_FILE = DATA_DIR / 'snapshot.json'
+CHANGES_FILE = DATA_DIR / 'changes.json'
+
+# P/C 比率变动超过该值视为大幅波动
+PC_SWING_THRESHOLD = 0.2
+
+# 价格变动超过该百分比视为大幅变动
+PRICE_MOVE_THRESHOLD = 2.0
+
+# 各板块对应的数据文件
+SECTION_FILES = {
+    'calendar': 'calendar.json',
+    'earnings': 'earnings.json',
+    'ratings': 'ratings.json',
+    'news': 'news.json',
+    'options': 'options.json',
+    'stock_info': 'stock_info.json',
+}
+
+
+def record_hash(value) -> str:
+    """计算单条记录的短哈希"""
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def extract_records(data: dict) -> dict:
+    """把各板块数据展开为键值记录: {section: {key: value}}"""
+    records = {section: {} for section in SECTION_FILES}
+
+    for event in data.get('calendar', {}).get('us_events', []):
+        key = f"event:{event.get('time', '')}:{event.get('event', '')}"
+        records['calendar'][key] = {k: event.get(k) for k in ('actual', 'estimate', 'prev')}
+
+    for e in data.get('earnings', {}).get('all_earnings', []):
+        key = f"earnings:{e.get('symbol')}:{e.get('date')}"
+        records['earnings'][key] = {k: e.get(k) for k in ('hour', 'eps_estimate', 'eps_actual')}
+
+    for change in data.get('ratings', {}).get('recent_changes', []):
+        key = (f"rating_change:{change.get('symbol')}:{change.get('company')}:"
+               f"{change.get('date')}:{change.get('to_grade')}")
+        records['ratings'][key] = change
+    for r in data.get('ratings', {}).get('ratings', []):
+        records['ratings'][f"target:{r.get('symbol')}"] = r.get('target_mean')
+
+    for news in data.get('news', {}).get('news', []):
+        records['news'][f"news:{news.get('id')}"] = news.get('headline')
+
+    options = data.get('options', {})
+    for item in options.get('index_options', []) + options.get('top_25_stocks', []):
+        call_vol = item.get('call_volume', 0)
+        put_vol = item.get('put_volume', 0)
+        pc_ratio = round(put_vol / call_vol, 2) if call_vol > 0 else 0
+        records['options'][f"pc_ratio:{item.get('symbol')}"] = pc_ratio
+    overview = options.get('market_overview', {})
+    if overview:
+        records['options']['pc_ratio:__market__'] = overview.get('pc_ratio')
+
+    for symbol, info in data.get('stock_info', {}).get('stocks', {}).items():
+        if info.get('current_price'):
+            records['stock_info'][f"price:{symbol}"] = info.get('current_price')
+
+    return records
+
+
+def build_snapshot(data: dict) -> dict:
+    """生成带哈希的快照"""
+    records = extract_records(data)
+    sections = {}
+    for section, items in records.items():
+        hashed = {key: {'hash': record_hash(value), 'value': value} for key, value in items.items()}
+        sections[section] = {
+            'hash': record_hash(sorted((k, v['hash']) for k, v in hashed.items())),
+            'records': hashed,
+        }
+    return {
+        'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'sections': sections,
+    }
+
+
+def _new_keys(current: dict, previous: dict, prefix: str) -> list:
+    """找出本次新增的记录键"""
+    return [key for key in current if key.startswith(prefix) and key not in previous]
+
+
+def diff_snapshots(current: dict, previous: dict) -> dict:
+    """对比两次快照，生成结构化差异"""
+    cur = current['sections']
+    prev = previous.get('sections', {}) if previous else {}
+
+    def records(snapshot: dict, section: str) -> dict:
+        return snapshot.get(section, {}).get('records', {})
+
+    changed_sections = [
+        section for section in SECTION_FILES
+        if cur.get(section, {}).get('hash') != prev.get(section, {}).get('hash')
+    ]
+
+    diff = {
+        'time': current['time'],
+        'previous_time': previous.get('time') if previous else None,
+        'has_previous': bool(previous),
+        'changed_sections': changed_sections,
+        'new_rating_changes': [],
+        'pc_swings': [],
+        'new_earnings': [],
+        'price_moves': [],
+    }
+
+    # 首次运行没有可比较的快照
+    if not previous:
+        return diff
+
+    cur_ratings, prev_ratings = records(cur, 'ratings'), records(prev, 'ratings')
+    for key in _new_keys(cur_ratings, prev_ratings, 'rating_change:'):
+        diff['new_rating_changes'].append(cur_ratings[key]['value'])
+
+    cur_earnings, prev_earnings = records(cur, 'earnings'), records(prev, 'earnings')
+    for key in _new_keys(cur_earnings, prev_earnings, 'earnings:'):
+        _, symbol, date = key.split(':', 2)
+        diff['new_earnings'].append({'symbol': symbol, 'date': date, **cur_earnings[key]['value']})
+
+    cur_options, prev_options = records(cur, 'options'), records(prev, 'options')
+    for key, item in cur_options.items():
+        old = prev_options.get(key)
+        if not old or old['hash'] == item['hash']:
+            continue
+        if old['value'] is None or item['value'] is None:
+            continue
+        change = round(item['value'] - old['value'], 2)
+        if abs(change) >= PC_SWING_THRESHOLD:
+            diff['pc_swings'].append({
+                'symbol': key.split(':', 1)[1],
+                'from': old['value'],
+                'to': item['value'],
+                'change': change
+            })
+
+    cur_prices, prev_prices = records(cur, 'stock_info'), records(prev, 'stock_info')
+    for key, item in cur_prices.items():
+        old = prev_prices.get(key)
+        if not old or old['hash'] == item['hash'] or not old['value']:
+            continue
+        change_pct = round((item['value'] - old['value']) / old['value'] * 100, 2)
+        if abs(change_pct) >= PRICE_MOVE_THRESHOLD:
+            diff['price_moves'].append({
+                'symbol': key.split(':', 1)[1],
+                'from': old['value'],
+                'to': item['value'],
+                'change_pct': change_pct
+            })
+
+    diff['pc_swings'].sort(key=lambda x: abs(x['change']), reverse=True)
+    diff['price_moves'].sort(key=lambda x: abs(x['change_pct']), reverse=True)
+    diff['new_rating_changes'].sort(key=lambda x: x.get('date', ''), reverse=True)
+    return diff
+
+
+def detect_changes(data: dict) -> dict:
+    """检测本次数据与上次快照的差异
+
+    data 为 {板块名: 数据文件内容}。数据没有任何变化时保留上次的差异结果，
+    避免重复构建把"最新变化"清空；有变化时推进快照并保存新的差异。
+    """
+    current = build_snapshot(data)
+    previous = read_json(SNAPSHOT_FILE)
+
+    diff = diff_snapshots(current, previous)
+    if previous and not diff['changed_sections']:
+        last = read_json(CHANGES_FILE)
+        if last:
+            return {**last, 'changed_sections': []}
+
+    write_json(SNAPSHOT_FILE, current)
+    write_json(CHANGES_FILE, diff)
+
+    return diff
+
+
+if __name__ == '__main__':
+    snapshot_data = {section: read_json(DATA_DIR / filename) for section, filename in SECTION_FILES.items()}
+    changes = detect_changes(snapshot_data)
+    print(f"Changed sections: {', '.join(changes['changed_sections']) or 'none'}")
+    print(f"  New rating changes: {len(changes['new_rating_changes'])}")
+    print(f"  P/C swings: {len(changes['pc_swings'])}")
+    print(f"  New earnings: {len(changes['new_earnings'])}")
+    print(f"  Price moves: {len(changes['price_moves'])}")
@@ -0,0 +1,57 @@
+"""报告输入快照 - 按日期保存合并日报的全部输入
+
+data/ 下的数据文件每天被覆盖，之前日期的报告无法重新生成。每次构建合并日报时，
+把渲染用到的输入（各数据文件内容、数据更新时间、与上次报告的变化、tooltip 相关新闻）
+保存为 data/history/<YYYY-MM-DD>.json.gz，同一天多次构建以最后一次为准。
+backfill 读取这些快照重新渲染历史报告。
+
+gzip 头部不写时间戳，输入不变时快照文件的字节也不变，可以直接用文件内容做摘要。
+"""
+
+import gzip
+import re
+from pathlib import Path
+
+from src.utils.jsonio import atomic_write, dumps, loads
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+HISTORY_DIR = DATA_DIR / 'history'
+
+# 快照文件名
+SNAPSHOT_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})\.json\.gz$')
+
+# 压缩级别（快照每天写一次，读多写少）
+GZIP_LEVEL = 6
+
+
+def snapshot_path(date: str) -> Path:
+    return HISTORY_DIR / f'{date}.json.gz'
+
+
+def save_snapshot(date: str, inputs: dict) -> Path:
+    """保存某天的报告输入"""
+    path = snapshot_path(date)
+    atomic_write(path, gzip.compress(dumps(inputs), compresslevel=GZIP_LEVEL, mtime=0))
+    return path
+
+
+def load_snapshot(date: str) -> dict:
+    """读取某天的报告输入，没有快照时返回空字典"""
+    path = snapshot_path(date)
+    if not path.exists():
+        return {}
+    return loads(gzip.decompress(path.read_bytes()))
+
+
+def snapshot_dates(start: str = None, end: str = None) -> list:
+    """有快照的日期（升序），可按 [start, end] 过滤"""
+    if not HISTORY_DIR.exists():
+        return []
+    dates = []
+    for path in HISTORY_DIR.iterdir():
+        match = SNAPSHOT_PATTERN.match(path.name)
+        if match and (not start or match.group(1) >= start) and (not end or match.group(1) <= end):
+            dates.append(match.group(1))
+    return sorted(dates)
@@ -0,0 +1,129 @@
+"""报告发布模块 - 版本化产物 + 原子切换
+
+每次发布先把页面写入 output/releases/<版本号>/（临时文件 + fsync + rename），
+再用硬链接 + rename 原子替换 output/ 下的对外文件，最后原子更新
+output/manifest.json。Web 服务以 manifest 的变化作为缓存失效信号，
+读方要么看到旧页面、要么看到完整的新页面，不会读到写了一半的文件。
+写入、切换和 manifest 的读-改-写在文件锁内进行，并发的发布（如盘中构建与每日任务）
+不会丢失对方的文件记录。下线页面（unpublish）同样在锁内删除文件和 manifest 记录。
+"""
+
+import fcntl
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from src.utils.jsonio import atomic_write, read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+OUTPUT_DIR = BASE_DIR / 'output'
+RELEASES_DIR = OUTPUT_DIR / 'releases'
+MANIFEST_FILE = OUTPUT_DIR / 'manifest.json'
+LOCK_FILE = OUTPUT_DIR / '.manifest.lock'
+
+# 保留的历史版本数量
+RELEASES_TO_KEEP = 5
+
+
+def content_etag(data: bytes) -> str:
+    """计算内容哈希，用作 ETag"""
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+def _swap_in(release_file: Path, target: Path):
+    """把版本化文件原子替换到对外路径（优先硬链接，不支持时复制）"""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.parent / f'.{target.name}.{os.getpid()}.swap'
+    try:
+        if tmp.exists():
+            tmp.unlink()
+        os.link(release_file, tmp)
+        os.replace(tmp, target)
+    except OSError:
+        if tmp.exists():
+            tmp.unlink()
+        atomic_write(target, release_file.read_bytes())
+
+
+def prune_releases(keep: int = RELEASES_TO_KEEP):
+    """清理旧版本目录，只保留最近 keep 个"""
+    if not RELEASES_DIR.exists():
+        return
+    releases = sorted(p for p in RELEASES_DIR.iterdir() if p.is_dir())
+    for old in releases[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+@contextmanager
+def manifest_lock():
+    """发布器的文件锁：版本目录写入、文件切换 / 删除和 manifest 的读-改-写都在锁内"""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_FILE, 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def write_manifest(files: dict, version: str) -> dict:
+    manifest = {
+        'version': version,
+        'published_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'files': files,
+    }
+    write_json(MANIFEST_FILE, manifest, indent=True)
+    return manifest
+
+
+def publish(pages: dict) -> dict:
+    """发布一组页面 {相对 output/ 的路径: 内容（str 或 bytes）}，返回更新后的 manifest
+
+    同一批页面按给定顺序切换，应先放依赖项（如 Tab 片段），最后放引用它们的页面。
+    """
+    encoded = {
+        name: content if isinstance(content, bytes) else content.encode('utf-8')
+        for name, content in pages.items()
+    }
+
+    digest = hashlib.blake2b(digest_size=4)
+    for name in sorted(encoded):
+        digest.update(name.encode('utf-8'))
+        digest.update(encoded[name])
+    version = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{digest.hexdigest()}"
+
+    # 写入版本目录也在锁内：否则可能被另一次发布的 prune_releases 删掉
+    with manifest_lock():
+        # 1. 写入版本化产物
+        release_dir = RELEASES_DIR / version
+        for name, data in encoded.items():
+            atomic_write(release_dir / name, data)
+
+        # 2. 原子切换对外文件
+        manifest = read_json(MANIFEST_FILE)
+        files = manifest.get('files', {})
+        for name, data in encoded.items():
+            _swap_in(release_dir / name, OUTPUT_DIR / name)
+            files[name] = {
+                'etag': content_etag(data),
+                'size': len(data),
+                'release': version,
+            }
+
+        # 3. 更新 manifest（服务端据此使缓存失效）
+        manifest = write_manifest(files, version)
+
+        prune_releases()
+    return manifest
+
+
+def unpublish(names: list) -> dict:
+    """下线一组页面（相对 output/ 的路径）：删除对外文件和 manifest 记录，返回更新后的 manifest"""
+    with manifest_lock():
+        manifest = read_json(MANIFEST_FILE)
+        files = manifest.get('files', {})
+        for name in names:
+            (OUTPUT_DIR / name).unlink(missing_ok=True)
+            files.pop(name, None)
+        return write_manifest(files, manifest.get('version', ''))
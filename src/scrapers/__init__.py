@@ -1,15 +1,31 @@
-from .options import fetch_options_data
-from .news import fetch_news
-from .ratings import fetch_ratings
-from .econ_calendar import fetch_calendar
-from .earnings import fetch_earnings
-from .stock_info import fetch_stock_info
-
-__all__ = [
-    'fetch_options_data',
-    'fetch_news',
-    'fetch_ratings',
-    'fetch_calendar',
-    'fetch_earnings',
-    'fetch_stock_info'
-]
+"""数据抓取模块
+
+各抓取函数按需加载（PEP 562 模块 __getattr__）：导入本包或单个抓取模块时
+不会连带加载其他模块及 yfinance / finnhub / pandas 等重依赖。
+"""
+
+import importlib
+
+# 导出名 -> 所在子模块
+_EXPORTS = {
+    'fetch_options_data': 'options',
+    'fetch_news': 'news',
+    'fetch_ratings': 'ratings',
+    'fetch_calendar': 'econ_calendar',
+    'fetch_earnings': 'earnings',
+    'fetch_stock_info': 'stock_info',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,278 @@
+"""抓取框架 - 单次调用超时、抖动退避重试、按数据源熔断、过期标记
+
+每个抓取模块创建一个 Scraper，所有上游调用都经由 scraper.call()：
+- 单次调用有硬性超时（在守护线程中执行，挂起的调用不会拖住整个进程）
+- 失败后按指数退避 + 随机抖动重试
+- 同一数据源（yfinance / finnhub / investing）连续失败达到阈值即熔断，
+  后续调用立即失败；熔断状态保存在 data/source_health.json，跨进程生效，
+  冷却期内再次运行的抓取模块启动即失败，不再等待超时
+- 每次 call() 重试用尽后才计一次失败；单个条目的空结果或无效数据
+  （EmptyResponse、KeyError）不计入数据源熔断，只有网络错误和超时计入
+- 输出文件带 _meta 元数据（状态、抓取时间、错误）；整体失败时保留
+  上次数据并标记为过期，由报告生成时显示"数据过期"
+"""
+
+import fcntl
+import os
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from src.utils import metrics
+from src.utils.jsonio import read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+HEALTH_FILE = DATA_DIR / 'source_health.json'
+
+# 单次上游调用超时（秒）
+DEFAULT_CALL_TIMEOUT = 15
+
+# 失败后重试次数 / 退避基数与上限（秒）
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# 连续失败多少次熔断 / 熔断冷却时间（秒）
+FAILURE_THRESHOLD = 4
+COOLDOWN_SECONDS = 600
+
+# 数据源不可用时抓取进程的退出码（daily_job 据此区分"源故障"与其他错误）
+EXIT_SOURCE_DOWN = 3
+
+# _meta 中最多保留的错误条数
+MAX_ERRORS = 20
+
+
+class ScraperError(Exception):
+    """抓取错误基类"""
+
+
+class DeadlineExceeded(ScraperError):
+    """单次调用超时"""
+
+
+class CircuitOpenError(ScraperError):
+    """数据源已熔断"""
+
+
+class EmptyResponse(ScraperError):
+    """上游返回空结果（如 yfinance 请求失败时 info 为 None）"""
+
+
+class SourceUnavailable(ScraperError):
+    """数据源整体不可用（没有拿到任何数据）"""
+
+
+# 单个条目的失败（某只股票无数据、字段缺失），不代表数据源故障，不计入熔断
+ITEM_ERRORS = (EmptyResponse, KeyError)
+
+
+def call_with_deadline(fn, deadline: float, args: tuple = (), kwargs: dict = None):
+    """在守护线程中执行 fn(*args, **kwargs)，超过 deadline 秒抛出 DeadlineExceeded"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['value'] = fn(*args, **(kwargs or {}))
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(deadline)
+    if thread.is_alive():
+        raise DeadlineExceeded(f"call exceeded {deadline}s deadline")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('value')
+
+
+def backoff_delay(attempt: int) -> float:
+    """第 attempt 次重试前的等待时间（指数退避 + 全抖动）"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """单个数据源的熔断器（状态持久化到 HEALTH_FILE）"""
+
+    def __init__(self, source: str, threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN_SECONDS):
+        self.source = source
+        self.threshold = threshold
+        self.cooldown = cooldown
+        state = read_json(HEALTH_FILE).get(source, {})
+        self.failures = state.get('failures', 0)
+        self.opened_until = state.get('opened_until', 0)
+        self.last_error = state.get('last_error')
+        self.last_success = state.get('last_success')
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return time.time() < self.opened_until
+
+    def check(self):
+        """熔断中则立即抛出 CircuitOpenError（冷却结束后放行试探调用）"""
+        if self.is_open:
+            until = datetime.fromtimestamp(self.opened_until).strftime('%H:%M:%S')
+            raise CircuitOpenError(f"{self.source} circuit open until {until}: {self.last_error}")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_until = 0
+            self.last_success = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def record_failure(self, error: Exception):
+        with self._lock:
+            self.failures += 1
+            self.last_error = f"{type(error).__name__}: {error}"[:200]
+            if self.failures >= self.threshold:
+                self.opened_until = time.time() + self.cooldown
+        if self.is_open:
+            self.save()
+
+    def save(self):
+        """写回本数据源的状态；抓取任务、行情轮询和各 Web worker 会同时写，读-改-写在文件锁内"""
+        HEALTH_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(HEALTH_FILE.with_suffix('.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            health = read_json(HEALTH_FILE)
+            health[self.source] = {
+                'failures': self.failures,
+                'opened_until': self.opened_until,
+                'last_error': self.last_error,
+                'last_success': self.last_success,
+            }
+            write_json(HEALTH_FILE, health, indent=True)
+
+
+class Scraper:
+    """抓取任务：包装上游调用并负责带元数据的结果输出
+
+    name 为输出文件名（data/<name>.json），source 为熔断器所属数据源。
+    """
+
+    def __init__(self, name: str, source: str, call_timeout: float = DEFAULT_CALL_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES):
+        self.name = name
+        self.source = source
+        self.call_timeout = call_timeout
+        self.retries = retries
+        self.output_file = DATA_DIR / f'{name}.json'
+        self.breaker = CircuitBreaker(source)
+        self.errors = []
+        self.calls = 0
+        self.symbol = None
+
+    @contextmanager
+    def track(self, symbol: str):
+        """标记当前处理的股票（记入上游调用的 span 明细）"""
+        previous, self.symbol = self.symbol, symbol
+        try:
+            yield
+        finally:
+            self.symbol = previous
+
+    def call(self, fn, *args, **kwargs):
+        """经由熔断、超时和重试执行一次上游调用
+
+        读取 yfinance 惰性属性时用 call(getattr, ticker, 'info')，指标中的操作名即属性名。
+        """
+        return self._call(self._op_name(fn, args), fn, args, kwargs)
+
+    def _op_name(self, fn, args: tuple) -> str:
+        """指标中的操作名：getattr 取属性名，匿名函数用抓取任务名"""
+        if fn is getattr:
+            return args[1]
+        name = getattr(fn, '__name__', '<lambda>')
+        return self.name if name == '<lambda>' else name
+
+    def _call(self, op: str, fn, args: tuple, kwargs: dict):
+        for attempt in range(self.retries + 1):
+            self.breaker.check()
+            self.calls += 1
+            try:
+                with metrics.upstream_span(self.source, op, self.symbol):
+                    result = call_with_deadline(fn, self.call_timeout, args, kwargs)
+            except ITEM_ERRORS:
+                if attempt == self.retries:
+                    raise
+                time.sleep(backoff_delay(attempt))
+            except Exception as e:
+                # 重试用尽才计一次失败：单次调用的多次重试不应独自触发熔断
+                if attempt == self.retries:
+                    self.breaker.record_failure(e)
+                    raise
+                time.sleep(backoff_delay(attempt))
+            else:
+                self.breaker.record_success()
+                return result
+
+    def call_required(self, fn, *args, **kwargs):
+        """同 call()，但空结果也视为失败（会重试，但属于条目失败，不计入熔断）"""
+        def required():
+            result = fn(*args, **kwargs)
+            if not result:
+                raise EmptyResponse(f"empty response from {self.source}")
+            return result
+        return self._call(self._op_name(fn, args), required, (), {})
+
+    def record_error(self, item: str, error: Exception):
+        """记录单个条目（如某只股票）的失败，计入 _meta，不中断整体抓取"""
+        message = f"{item}: {type(error).__name__}: {error}"
+        print(f"  Error {message}")
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(message[:200])
+
+    def meta(self, status: str) -> dict:
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        return {
+            'source': self.source,
+            'status': status,
+            'stale': status == 'stale',
+            'fetched_at': now,
+            'errors': self.errors,
+        }
+
+    def save(self, result: dict, path: Path = None) -> dict:
+        """写入结果；有条目失败时状态为 partial"""
+        result['_meta'] = self.meta('partial' if self.errors else 'ok')
+        write_json(path or self.output_file, result)
+        self.breaker.save()
+        return result
+
+    def mark_stale(self, error: Exception):
+        """数据源不可用：保留上次数据，只更新 _meta 为过期（文件修改时间保持不变）"""
+        previous = read_json(self.output_file)
+        try:
+            stat = self.output_file.stat()
+        except FileNotFoundError:
+            stat = None
+        last_meta = previous.get('_meta', {})
+        meta = self.meta('stale')
+        meta['fetched_at'] = last_meta.get('fetched_at') or previous.get('fetch_time') or previous.get('date')
+        meta['stale_since'] = last_meta.get('stale_since') or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        meta['last_error'] = f"{type(error).__name__}: {error}"[:200]
+        previous['_meta'] = meta
+        write_json(self.output_file, previous)
+        if stat is not None:
+            os.utime(self.output_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.breaker.save()
+
+    def run(self, fetch, *args, **kwargs):
+        """命令行入口：数据源故障时标记过期并以 EXIT_SOURCE_DOWN 退出"""
+        metrics.start_run(self.name)
+        try:
+            self.breaker.check()
+            with metrics.span('scraper', name=self.name):
+                return fetch(*args, **kwargs)
+        except ScraperError as e:
+            print(f"Source {self.source} unavailable for {self.name}: {e}")
+            self.mark_stale(e)
+            sys.exit(EXIT_SOURCE_DOWN)
@@ -0,0 +1,205 @@
+"""财经日历数据源 - 可插拔的适配器
+
+- investing：抓取 Investing.com 财经日历网页（只有当天），解析重要性星级
+- finnhub：Finnhub 经济日历 API，支持日期范围，时间为 UTC
+- static：本地日程文件 config/econ_schedule.json（FOMC 议息决议），
+  网页被拦截时也能给出当周的议息日
+
+所有数据源返回统一结构的事件：
+{date, time, country, event, impact, actual, estimate, prev, unit, source}
+其中 time 为美东时间 HH:MM（未知时为空），impact 为 high / medium / low。
+"""
+
+import os
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+
+from src.scrapers.base import Scraper
+from src.utils.jsonio import read_json
+
+BASE_DIR = Path(__file__).parent.parent.parent
+SCHEDULE_FILE = BASE_DIR / 'config' / 'econ_schedule.json'
+
+# 重要性等级（数值越大越重要）
+IMPACT_LEVELS = {'low': 1, 'medium': 2, 'high': 3}
+
+# Investing.com 请求头
+INVESTING_URL = 'https://www.investing.com/economic-calendar/'
+INVESTING_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Investing.com 重要性图标（bull1-3）-> 等级
+INVESTING_IMPACT = {'bull1': 'low', 'bull2': 'medium', 'bull3': 'high'}
+
+
+def make_event(date: str, time: str, event: str, source: str, impact: str = None, actual=None,
+               estimate=None, prev=None, unit: str = '', country: str = 'US') -> dict:
+    """统一的事件结构（空字符串视为缺失）"""
+    return {
+        'date': date,
+        'time': time or '',
+        'country': country,
+        'event': event.strip(),
+        'impact': impact if impact in IMPACT_LEVELS else 'medium',
+        'actual': actual if actual not in ('', None) else None,
+        'estimate': estimate if estimate not in ('', None) else None,
+        'prev': prev if prev not in ('', None) else None,
+        'unit': unit or '',
+        'source': source,
+    }
+
+
+class CalendarSource(ABC):
+    """财经日历数据源基类（未实现 fetch 的数据源创建实例即失败）"""
+
+    # 数据源名称（也是熔断器名称）
+    name = 'base'
+    # 合并时的优先级，越高越优先采用其预期值 / 前值
+    priority = 0
+    # 能否提供已发布数据的实际值（盘中刷新只调用这类数据源）
+    provides_actuals = True
+    # 能否按日期范围抓取；不能的数据源只返回当天事件，每天都需要抓取一次
+    date_range = True
+
+    def available(self) -> bool:
+        """当前环境是否可用（如缺少 API key）"""
+        return True
+
+    @abstractmethod
+    def fetch(self, scraper: Scraper, start: str, end: str) -> list:
+        """返回 [start, end] 日期范围内的美国事件；数据源故障时抛出异常"""
+
+
+class InvestingSource(CalendarSource):
+    """Investing.com 网页（默认页面只有当天的事件）"""
+
+    name = 'investing'
+    priority = 2
+    date_range = False
+
+    @staticmethod
+    def parse_impact(row) -> str:
+        cell = row.select_one('td.sentiment')
+        if cell is None:
+            return None
+        key = cell.get('data-img_key')
+        if key in INVESTING_IMPACT:
+            return INVESTING_IMPACT[key]
+        stars = len(cell.select('i.grayFullBullishIcon'))
+        return {1: 'low', 2: 'medium', 3: 'high'}.get(stars)
+
+    def parse(self, html: str, today: str) -> list:
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, 'html.parser')
+        events = []
+        for row in soup.select('tr.js-event-item'):
+            flag = row.select_one('td.flagCur')
+            event_elem = row.select_one('td.event a') or row.select_one('td.event')
+            if flag is None or event_elem is None:
+                continue
+            # 只取美国数据
+            country = flag.select_one('span')
+            if 'United States' not in (country.get('title', '') if country else '') and 'USD' not in flag.get_text():
+                continue
+
+            time_elem = row.select_one('td.time')
+            date, time = today, time_elem.get_text(strip=True) if time_elem else ''
+            stamp = row.get('data-event-datetime')  # 形如 2024/03/12 08:30:00
+            if stamp:
+                date, time = stamp[:10].replace('/', '-'), stamp[11:16]
+            if not re.fullmatch(r'\d{2}:\d{2}', time):
+                time = ''  # All Day / Tentative
+
+            def text(selector):
+                elem = row.select_one(selector)
+                return elem.get_text(strip=True).replace('\xa0', '') if elem else None
+
+            events.append(make_event(date, time, event_elem.get_text(strip=True), self.name,
+                                     impact=self.parse_impact(row), actual=text('td.act'),
+                                     estimate=text('td.fore'), prev=text('td.prev')))
+        return events
+
+    def fetch(self, scraper: Scraper, start: str, end: str) -> list:
+        import requests
+
+        today = datetime.now().strftime('%Y-%m-%d')
+        if not start <= today <= end:
+            return []
+        response = scraper.call(requests.get, INVESTING_URL, headers=INVESTING_HEADERS, timeout=10)
+        response.raise_for_status()
+        return self.parse(response.text, today)
+
+
+class FinnhubSource(CalendarSource):
+    """Finnhub 经济日历 API"""
+
+    name = 'finnhub'
+    priority = 1
+
+    def available(self) -> bool:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        return bool(os.getenv('FINNHUB_API_KEY'))
+
+    @staticmethod
+    def local_time(stamp: str) -> tuple:
+        """UTC 时间字符串 -> 本地（容器时区为美东）(日期, HH:MM)"""
+        try:
+            moment = datetime.strptime(stamp[:19], '%Y-%m-%d %H:%M:%S')
+        except (TypeError, ValueError):
+            return (stamp or '')[:10], ''
+        local = moment.replace(tzinfo=timezone.utc).astimezone()
+        return local.strftime('%Y-%m-%d'), local.strftime('%H:%M')
+
+    def fetch(self, scraper: Scraper, start: str, end: str) -> list:
+        import finnhub
+
+        client = finnhub.Client(api_key=os.getenv('FINNHUB_API_KEY'))
+        data = scraper.call(client.calendar_economic, _from=start, to=end) or {}
+        events = []
+        for e in data.get('economicCalendar') or []:
+            if e.get('country') != 'US' or not e.get('event'):
+                continue
+            date, time = self.local_time(e.get('time'))
+            events.append(make_event(date, time, e['event'], self.name, impact=e.get('impact'),
+                                     actual=e.get('actual'), estimate=e.get('estimate'),
+                                     prev=e.get('prev'), unit=e.get('unit')))
+        return events
+
+
+class StaticSource(CalendarSource):
+    """本地日程文件（只有日期和重要性，没有预期值和实际值）"""
+
+    name = 'static'
+    priority = 0
+    provides_actuals = False
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path or os.getenv('ECON_SCHEDULE_FILE') or SCHEDULE_FILE)
+
+    def available(self) -> bool:
+        return self.path.exists()
+
+    def fetch(self, scraper: Scraper, start: str, end: str) -> list:
+        schedule = read_json(self.path).get('events', [])
+        last = max((e['date'] for e in schedule), default='')
+        if last < start:
+            print(f"  Static schedule ends {last or 'empty'}, extend {self.path.name}")
+        return [
+            make_event(e['date'], e.get('time', ''), e['event'], self.name, impact=e.get('impact', 'high'))
+            for e in schedule
+            if start <= e['date'] <= end
+        ]
+
+
+SOURCES = {
+    source.name: source
+    for source in (InvestingSource, FinnhubSource, StaticSource)
+}
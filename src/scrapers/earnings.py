@@ -1,19 +1,189 @@
-"""财报日历抓取模块 - 使用 Finnhub API + yfinance"""
+"""财报日历抓取模块 - 使用 Finnhub API + yfinance
 
-import json
+财报日历保存为滚动窗口（data/earnings_calendar.json），按 (symbol, date) 合并：
+- 每 FULL_REFRESH_HOURS 小时重新抓取整个窗口（前一交易日起到今天后 LOOKAHEAD_DAYS 天），
+  发现新增、改期的财报
+- 其间的刷新（盘中轮询）只抓取前一交易日到今天，补充已发布财报的
+  eps_actual / revenue_actual，并计算超预期幅度（周五盘后的财报在周一补充）
+- 上游返回空结果或明显偏少时（限流、故障）不删除存储中的财报
+- 已有字段不会被上游的空值覆盖；市值来自共享的 Ticker.info 缓存
+- 日历先写入存储再补充市值；市值只为报告会显示的公司逐只查询（按预期营收预选），
+  查不到市值的股票在 PROFILE_TTL 内不再重复查询
+
+data/earnings.json 保持原有的今日财报结构，另附未来一周预览和最近的财报结果。
+"""
+
+import argparse
 import os
-import finnhub
-import yfinance as yf
+import time
 from datetime import datetime, timedelta
-from pathlib import Path
-from dotenv import load_dotenv
 
-load_dotenv()
+from src.scrapers.base import DATA_DIR, CircuitOpenError, Scraper, SourceUnavailable
+from src.scrapers.ticker_info import PROFILE_TTL, fetch_info
+from src.utils.jsonio import read_json, write_json
+
+# 财报日历存储
+STORE_FILE = DATA_DIR / 'earnings_calendar.json'
+
+# 前瞻窗口（天）
+LOOKAHEAD_DAYS = 14
+
+# 抓取结果少于窗口内已存储财报的该比例时，视为上游结果不完整，不移除未出现的财报
+MIN_REMOVAL_RATIO = 0.5
+
+# 整个窗口的重新抓取间隔（小时）
+FULL_REFRESH_HOURS = 12
+
+# 已过去的财报保留天数
+RETENTION_DAYS = 30
+
+# 今日财报显示的公司数
+TODAY_LIMIT = 50
+
+# 周预览的天数和每天显示的公司数
+WEEK_AHEAD_DAYS = 7
+WEEK_AHEAD_PER_DAY = 8
+
+# 最近财报结果的回看天数和条数
+RESULTS_DAYS = 3
+MAX_RESULTS = 15
+
+# 合并时保留的字段（Finnhub 字段 -> 存储字段）
+FIELDS = {
+    'hour': 'hour',  # bmo=盘前, amc=盘后
+    'epsEstimate': 'eps_estimate',
+    'epsActual': 'eps_actual',
+    'revenueEstimate': 'revenue_estimate',
+    'revenueActual': 'revenue_actual',
+}
+
+
+def surprise_pct(actual, estimate):
+    """超预期幅度（%），缺少数据或预期为 0 时返回 None"""
+    if actual is None or not estimate:
+        return None
+    return round((actual - estimate) / abs(estimate) * 100, 1)
+
+
+def previous_trading_day(today: datetime) -> datetime:
+    """前一个交易日（只跳过周末；前一日盘后发布的财报次日才有结果）"""
+    day = today - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def plan_window(store: dict, today: datetime, full: bool = False) -> tuple:
+    """返回本次抓取的 (起始日, 结束日, 是否整个窗口)"""
+    last_full = store.get('full_refreshed_at')
+    stale = not last_full or today - datetime.strptime(last_full, '%Y-%m-%d %H:%M:%S') \
+        >= timedelta(hours=FULL_REFRESH_HOURS)
+    if full or stale or store.get('window_end', '') < today.strftime('%Y-%m-%d'):
+        start, end, full = previous_trading_day(today), today + timedelta(days=LOOKAHEAD_DAYS), True
+    else:
+        start, end = previous_trading_day(today), today
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'), full
+
+
+def merge_events(events: dict, fetched: list, start: str, end: str) -> dict:
+    """把抓取结果按 (symbol, date) 合并进存储，返回变更计数
+
+    抓取窗口内不再出现的财报视为改期，从存储中移除；抓取结果为空或少于窗口内已存储
+    财报的 MIN_REMOVAL_RATIO 时视为上游结果不完整，不做移除。
+    """
+    counts = {'added': 0, 'updated': 0, 'removed': 0}
+    seen = set()
+    for e in fetched:
+        symbol, date = e.get('symbol'), e.get('date')
+        if not symbol or not date:
+            continue
+        key = f'{symbol}|{date}'
+        seen.add(key)
+        old = events.get(key)
+        new = dict(old) if old else {'symbol': symbol, 'date': date, 'market_cap': None}
+        for source, field in FIELDS.items():
+            if e.get(source) is not None:
+                new[field] = e[source]
+            else:
+                new.setdefault(field, None)
+        new['eps_surprise_pct'] = surprise_pct(new['eps_actual'], new['eps_estimate'])
+        new['revenue_surprise_pct'] = surprise_pct(new['revenue_actual'], new['revenue_estimate'])
+        if old is None:
+            counts['added'] += 1
+        elif new != old:
+            counts['updated'] += 1
+        events[key] = new
+
+    stored = [k for k, e in events.items() if start <= e['date'] <= end]
+    if not seen or len(seen) < len(stored) * MIN_REMOVAL_RATIO:
+        counts['kept'] = len([k for k in stored if k not in seen])
+        return counts
+    for key in [k for k in stored if k not in seen]:
+        del events[key]
+        counts['removed'] += 1
+    return counts
+
+
+def cap_candidates(events: dict, start: str, end: str) -> list:
+    """需要查询市值的股票：只取报告会显示的公司（start 当天 TODAY_LIMIT 家，之后每天 WEEK_AHEAD_PER_DAY 家）
+
+    市值未知时按预期营收（Finnhub 日历自带，与公司规模高度相关）预选。
+    """
+    by_day = {}
+    for e in events.values():
+        if start <= e['date'] <= end:
+            by_day.setdefault(e['date'], []).append(e)
+    symbols = set()
+    for date, day in by_day.items():
+        limit = TODAY_LIMIT if date == start else WEEK_AHEAD_PER_DAY
+        ranked = sorted(day, key=lambda e: e.get('revenue_estimate') or 0, reverse=True)
+        symbols.update(e['symbol'] for e in ranked[:limit] if e.get('market_cap') is None)
+    return sorted(symbols)
 
 
-def fetch_earnings() -> dict:
-    """抓取今日财报日历"""
+def fill_market_caps(store: dict, start: str, end: str) -> bool:
+    """为窗口内报告会显示的财报补充市值，返回存储是否有变化
+
+    yfinance 单独熔断，不可用时只是缺少市值排序。查不到市值的股票（ETF、SPAC、小市值公司）
+    记入 store['cap_misses']，PROFILE_TTL 内不再查询。
+    """
+    events, misses = store['events'], store.setdefault('cap_misses', {})
+    now = time.time()
+    for symbol in [s for s, checked in misses.items() if now - checked >= PROFILE_TTL]:
+        del misses[symbol]
+    symbols = [s for s in cap_candidates(events, start, end) if s not in misses]
+    if not symbols:
+        return False
+    caps = Scraper('earnings', source='yfinance', retries=0)
+    try:
+        infos, _ = fetch_info(caps, symbols, ttl=PROFILE_TTL)
+    except CircuitOpenError:
+        return False
+    finally:
+        caps.breaker.save()
+    for symbol in symbols:
+        if infos.get(symbol, {}).get('marketCap') is None:
+            misses[symbol] = now
+    for e in events.values():
+        if e.get('market_cap') is None and e['symbol'] in infos:
+            e['market_cap'] = infos[e['symbol']].get('marketCap')
+    print(f"  Market caps: {len(symbols)} looked up, {len(misses)} symbols without one")
+    return True
+
+
+def _by_market_cap(events) -> list:
+    """按市值排序（大公司优先）"""
+    return sorted(events, key=lambda x: x.get('market_cap') or 0, reverse=True)
+
+
+def fetch_earnings(scraper: Scraper = None, full: bool = False) -> dict:
+    """刷新财报日历存储并输出今日财报、周预览和最近结果"""
+    import finnhub
+    from dotenv import load_dotenv
+
+    load_dotenv()
     print("Fetching earnings calendar...")
+    scraper = scraper or Scraper('earnings', source='finnhub')
 
     api_key = os.getenv('FINNHUB_API_KEY')
     if not api_key:
@@ -23,72 +193,97 @@ def fetch_earnings() -> dict:
 
     today = datetime.now()
     today_str = today.strftime('%Y-%m-%d')
-    tomorrow_str = (today + timedelta(days=1)).strftime('%Y-%m-%d')
-
-    # 使用 Finnhub 获取财报日历
-    earnings = client.earnings_calendar(
-        _from=today_str,
-        to=tomorrow_str,
-        symbol='',
-        international=False
-    )
+    store = read_json(STORE_FILE)
+    events = store.get('events', {})
+    start, end, full = plan_window(store, today, full)
 
-    today_earnings = []
-    if earnings and 'earningsCalendar' in earnings:
-        for e in earnings['earningsCalendar']:
-            if e.get('date') == today_str:
-                # 获取额外的股票信息
-                symbol = e.get('symbol', '')
-                market_cap = None
-
-                try:
-                    ticker = yf.Ticker(symbol)
-                    info = ticker.info
-                    market_cap = info.get('marketCap')
-                except:
-                    pass
-
-                today_earnings.append({
-                    'symbol': symbol,
-                    'date': e.get('date', ''),
-                    'hour': e.get('hour', ''),  # bmo=盘前, amc=盘后
-                    'eps_estimate': e.get('epsEstimate'),
-                    'eps_actual': e.get('epsActual'),
-                    'revenue_estimate': e.get('revenueEstimate'),
-                    'revenue_actual': e.get('revenueActual'),
-                    'market_cap': market_cap
-                })
-
-    # 按市值排序（大公司优先）
-    today_earnings.sort(
-        key=lambda x: x['market_cap'] if x['market_cap'] else 0,
-        reverse=True
-    )
+    # 使用 Finnhub 获取财报日历（只抓取需要刷新的窗口）
+    try:
+        earnings = scraper.call(
+            client.earnings_calendar,
+            _from=start,
+            to=end,
+            symbol='',
+            international=False
+        )
+    except Exception as e:
+        raise SourceUnavailable(f"earnings_calendar failed: {e}") from e
+
+    counts = merge_events(events, (earnings or {}).get('earningsCalendar') or [], start, end)
+    print(f"  Window {start} ~ {end} ({'full' if full else 'actuals'}): "
+          f"{counts['added']} added, {counts['updated']} updated, {counts['removed']} removed")
+    if counts.get('kept'):
+        print(f"  Upstream returned too few events, kept {counts['kept']} missing ones")
+
+    # 清理过期的财报
+    cutoff = (today - timedelta(days=RETENTION_DAYS)).strftime('%Y-%m-%d')
+    events = {k: e for k, e in events.items() if e['date'] >= cutoff}
+
+    now_str = today.strftime('%Y-%m-%d %H:%M:%S')
+    store = {
+        'updated_at': now_str,
+        'full_refreshed_at': now_str if full else store.get('full_refreshed_at'),
+        'window_end': end if full else store.get('window_end', end),
+        'cap_misses': store.get('cap_misses', {}),
+        'events': events,
+    }
+    # 先保存日历：补充市值需要逐只请求，任务超时也不会丢掉本次抓取的结果
+    write_json(STORE_FILE, store)
+
+    week_end = (today + timedelta(days=WEEK_AHEAD_DAYS)).strftime('%Y-%m-%d')
+    if fill_market_caps(store, today_str, week_end):
+        write_json(STORE_FILE, store)
+
+    today_earnings = _by_market_cap(e for e in events.values() if e['date'] == today_str)
 
     # 分类：盘前 vs 盘后
     before_market = [e for e in today_earnings if e['hour'] == 'bmo']
     after_market = [e for e in today_earnings if e['hour'] == 'amc']
 
+    # 未来一周预览（不含今天）
+    upcoming = {}
+    for e in _by_market_cap(e for e in events.values() if today_str < e['date'] <= week_end):
+        upcoming.setdefault(e['date'], []).append(e)
+    week_ahead = [
+        {'date': date, 'count': len(upcoming[date]), 'earnings': upcoming[date][:WEEK_AHEAD_PER_DAY]}
+        for date in sorted(upcoming)
+    ]
+
+    # 最近已发布的财报结果
+    results_from = (today - timedelta(days=RESULTS_DAYS)).strftime('%Y-%m-%d')
+    recent_results = _by_market_cap(
+        e for e in events.values()
+        if results_from <= e['date'] <= today_str and e.get('eps_actual') is not None
+    )
+
     result = {
         'date': today_str,
-        'fetch_time': today.strftime('%Y-%m-%d %H:%M:%S'),
+        'fetch_time': now_str,
         'total_count': len(today_earnings),
         'before_market': before_market[:15],  # 盘前重点财报
         'after_market': after_market[:15],    # 盘后重点财报
-        'all_earnings': today_earnings[:50]   # 全部（前50）
+        'all_earnings': today_earnings[:TODAY_LIMIT],  # 全部（前50）
+        'week_ahead': week_ahead,
+        'recent_results': recent_results[:MAX_RESULTS],
     }
 
     # 保存到文件
-    output_path = Path(__file__).parent.parent.parent / 'data' / 'earnings.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    output_path = scraper.output_file
+    scraper.save(result)
 
-    print(f"Fetched {len(today_earnings)} earnings reports for today, saved to {output_path}")
+    print(f"Fetched {len(today_earnings)} earnings reports for today "
+          f"({len(events)} in calendar), saved to {output_path}")
     return result
 
 
-if __name__ == '__main__':
-    data = fetch_earnings()
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the earnings calendar')
+    parser.add_argument('--full', action='store_true',
+                        help=f'Refetch the whole {LOOKAHEAD_DAYS}-day window instead of recent actuals')
+    args = parser.parse_args()
+
+    earnings_scraper = Scraper('earnings', source='finnhub')
+    data = earnings_scraper.run(fetch_earnings, earnings_scraper, args.full)
 
     print(f"\nBefore Market ({len(data['before_market'])} companies):")
     for e in data['before_market'][:5]:
@@ -97,3 +292,11 @@ if __name__ == '__main__':
     print(f"\nAfter Market ({len(data['after_market'])} companies):")
     for e in data['after_market'][:5]:
         print(f"  {e['symbol']}: EPS Est. {e['eps_estimate']}")
+
+    for r in data['recent_results'][:5]:
+        print(f"  {r['symbol']} {r['date']}: EPS {r['eps_actual']} vs {r['eps_estimate']} "
+              f"({r['eps_surprise_pct']}%)")
+
+
+if __name__ == '__main__':
+    main()
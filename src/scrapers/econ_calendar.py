@@ -1,93 +1,217 @@
-"""财经日历抓取模块 - 使用网页抓取"""
-
-import json
-import requests
-from datetime import datetime
-from pathlib import Path
-from bs4 import BeautifulSoup
-
-
-def fetch_calendar() -> dict:
-    """抓取财经日历（经济数据发布）- 从 Investing.com"""
+"""财经日历抓取模块 - 多数据源合并（见 calendar_sources）
+
+每周第一次运行时从全部数据源抓取当周日程，合并去重后缓存到
+data/econ_calendar_week.json（被拦截的数据源在之后的运行中重试）。只能提供当天
+事件的数据源（如 Investing.com）按天记录已抓取的日期，每天第一次运行时再抓取。之后的刷新
+（盘中）只在有数据类事件（有预期值或前值）刚过发布时间、还没有实际值时，才向能提供
+实际值的数据源请求当天数据，并只更新 actual 字段；讲话、拍卖等永远没有实际值的事件不算待补充，
+发布超过 ACTUALS_WINDOW_HOURS 仍无实际值的事件也不再重试，没有待补充的事件时不发起任何请求。
+"""
+
+import argparse
+import re
+from datetime import datetime, timedelta
+
+from src.scrapers.base import DATA_DIR, Scraper, SourceUnavailable
+from src.scrapers.calendar_sources import IMPACT_LEVELS, SOURCES
+from src.utils.jsonio import read_json, write_json
+
+# 当周日程缓存
+WEEK_FILE = DATA_DIR / 'econ_calendar_week.json'
+
+# 数据源顺序（默认全部启用）
+DEFAULT_SOURCES = ('investing', 'finnhub', 'static')
+
+# 发布后补充实际值的时限（小时），超过后不再为该事件重新抓取
+ACTUALS_WINDOW_HOURS = 2
+
+# 本周预览中显示的最低重要性
+WEEK_MIN_IMPACT = 'high'
+
+# 事件名归一化：统一常见缩写后只保留字母数字
+NAME_REPLACEMENTS = (('m/m', 'mom'), ('y/y', 'yoy'), ('q/q', 'qoq'), ('&', 'and'))
+
+# 事件名中的统计期括注，如 (Sep) / (Q3)
+PERIOD_PATTERN = re.compile(r'\((?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec|q[1-4])\)')
+
+
+def event_name_key(name: str) -> str:
+    """事件名归一化（不同数据源的写法差异，如 CPI m/m 与 CPI MoM）"""
+    name = name.lower()
+    for old, new in NAME_REPLACEMENTS:
+        name = name.replace(old, new)
+    name = PERIOD_PATTERN.sub('', name)
+    return re.sub(r'[^a-z0-9]', '', name)
+
+
+def merge_events(events: dict, incoming: list, priority: dict) -> int:
+    """按 (日期, 归一化事件名) 合并去重，返回新增事件数
+
+    同一事件：预期值 / 前值 / 时间取优先级高的数据源，实际值取任一数据源的非空值，
+    重要性取最高等级。
+    """
+    added = 0
+    for event in incoming:
+        key = f"{event['date']}|{event_name_key(event['event'])}"
+        current = events.get(key)
+        if current is None:
+            events[key] = {**event, 'sources': [event['source']]}
+            added += 1
+            continue
+        preferred = priority.get(event['source'], 0) > priority.get(current['source'], 0)
+        for field in ('time', 'estimate', 'prev', 'unit', 'event'):
+            if event[field] and (preferred or not current[field]):
+                current[field] = event[field]
+        if event['actual'] is not None:
+            current['actual'] = event['actual']
+        if IMPACT_LEVELS[event['impact']] > IMPACT_LEVELS[current['impact']]:
+            current['impact'] = event['impact']
+        if preferred:
+            current['source'] = event['source']
+        if event['source'] not in current['sources']:
+            current['sources'].append(event['source'])
+    return added
+
+
+def update_actuals(events: dict, incoming: list) -> int:
+    """只更新已有事件的实际值，返回更新条数"""
+    updated = 0
+    for event in incoming:
+        current = events.get(f"{event['date']}|{event_name_key(event['event'])}")
+        if current is not None and event['actual'] is not None and current['actual'] != event['actual']:
+            current['actual'] = event['actual']
+            updated += 1
+    return updated
+
+
+def pending_actuals(events: dict, now: datetime) -> list:
+    """ACTUALS_WINDOW_HOURS 内刚发布、还没有实际值的今日数据类事件（有预期值或前值）"""
+    today, clock = now.strftime('%Y-%m-%d'), now.strftime('%H:%M')
+    since = max(now - timedelta(hours=ACTUALS_WINDOW_HOURS), now.replace(hour=0, minute=0)).strftime('%H:%M')
+    return [e for e in events.values()
+            if e['date'] == today and e['actual'] is None and (e['estimate'] or e['prev'])
+            and e['time'] and since <= e['time'] <= clock]
+
+
+def fetch_sources(scraper: Scraper, sources: list, start: str, end: str) -> tuple:
+    """依次调用各数据源，返回 (事件列表, 成功的数据源)；单个数据源失败只记入 _meta"""
+    events, succeeded = [], []
+    for source in sources:
+        if not source.available():
+            continue
+        # 各数据源单独熔断，一个被拦截不影响其他数据源
+        source_scraper = Scraper(scraper.name, source=source.name)
+        try:
+            events.extend(source.fetch(source_scraper, start, end))
+            succeeded.append(source.name)
+        except Exception as e:
+            scraper.record_error(source.name, e)
+        finally:
+            source_scraper.breaker.save()
+    return events, succeeded
+
+
+def fetch_calendar(scraper: Scraper = None, full: bool = False, source_names: tuple = DEFAULT_SOURCES) -> dict:
+    """刷新当周财经日历并输出今日美国经济数据"""
     print("Fetching economic calendar...")
-
-    today = datetime.now()
-    events = []
-
-    try:
-        # 尝试从 Investing.com 抓取
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
-
-        url = 'https://www.investing.com/economic-calendar/'
-        response = requests.get(url, headers=headers, timeout=10)
-
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # 查找日历表格行
-            rows = soup.select('tr.js-event-item')
-
-            for row in rows[:30]:  # 限制数量
-                try:
-                    time_elem = row.select_one('td.time')
-                    country_elem = row.select_one('td.flagCur span')
-                    event_elem = row.select_one('td.event a')
-                    actual_elem = row.select_one('td.act')
-                    forecast_elem = row.select_one('td.fore')
-                    prev_elem = row.select_one('td.prev')
-
-                    if event_elem:
-                        event_time = time_elem.get_text(strip=True) if time_elem else ''
-                        country = country_elem.get('title', '') if country_elem else ''
-                        event_name = event_elem.get_text(strip=True) if event_elem else ''
-
-                        # 只取美国数据
-                        if 'United States' in country or 'USD' in (country_elem.get_text() if country_elem else ''):
-                            events.append({
-                                'time': f"{today.strftime('%Y-%m-%d')} {event_time}",
-                                'country': 'US',
-                                'event': event_name,
-                                'impact': 'medium',
-                                'actual': actual_elem.get_text(strip=True) if actual_elem else None,
-                                'estimate': forecast_elem.get_text(strip=True) if forecast_elem else None,
-                                'prev': prev_elem.get_text(strip=True) if prev_elem else None,
-                                'unit': ''
-                            })
-                except Exception:
-                    continue
-
-    except Exception as e:
-        print(f"  Warning: Could not fetch from Investing.com: {e}")
-        # 返回空数据而不是失败
-        events = []
+    scraper = scraper or Scraper('calendar', source='calendar')
+
+    now = datetime.now()
+    today = now.strftime('%Y-%m-%d')
+    week_start = (now - timedelta(days=now.weekday())).strftime('%Y-%m-%d')
+    week_end = (now + timedelta(days=6 - now.weekday())).strftime('%Y-%m-%d')
+    sources = [SOURCES[name]() for name in source_names]
+    priority = {source.name: source.priority for source in sources}
+
+    cache = read_json(WEEK_FILE)
+    if full or cache.get('week_start') != week_start:
+        cache = {'week_start': week_start, 'sources': []}
+    events = cache.get('events', {})
+    # 只能提供当天事件的数据源：{数据源: [已抓取的日期]}
+    fetched_days = cache.setdefault('fetched_days', {})
+
+    def covered(source) -> bool:
+        if source.date_range:
+            return source.name in cache['sources']
+        return today in fetched_days.get(source.name, [])
+
+    # 本周还没有成功抓取过的数据源（新的一周，或上次被拦截）抓取当周日程，
+    # 只有当天事件的数据源每天第一次运行时抓取
+    missing = [s for s in sources if not covered(s) and s.available()]
+    if missing:
+        fetched, succeeded = fetch_sources(scraper, missing, week_start, week_end)
+        if not succeeded and not events:
+            raise SourceUnavailable(f"all calendar sources failed ({len(scraper.errors)} errors)")
+        added = merge_events(events, fetched, priority)
+        for source in missing:
+            if source.name not in succeeded:
+                continue
+            if source.date_range:
+                cache['sources'].append(source.name)
+            else:
+                fetched_days.setdefault(source.name, []).append(today)
+        print(f"  Week {week_start} ~ {week_end}: {added} events added from {', '.join(succeeded) or 'none'}")
+
+    # 盘中刷新：只为刚发布的事件补充实际值
+    pending = pending_actuals(events, now)
+    actual_sources = [s for s in sources if s.provides_actuals and s not in missing]
+    if pending and actual_sources:
+        fetched, succeeded = fetch_sources(scraper, actual_sources, today, today)
+        updated = update_actuals(events, fetched)
+        print(f"  {len(pending)} events awaiting actuals, {updated} updated from {', '.join(succeeded) or 'none'}")
+    elif not missing:
+        print("  No released events awaiting actuals, using cached week")
+
+    cache.update({'updated_at': now.strftime('%Y-%m-%d %H:%M:%S'), 'events': events})
+    write_json(WEEK_FILE, cache)
+
+    ordered = sorted(events.values(), key=lambda e: (e['date'], e['time'] or '99:99'))
+    us_events = [
+        {**e, 'time': f"{e['date']} {e['time']}".strip()}
+        for e in ordered if e['date'] == today
+    ]
+    week_events = [
+        e for e in ordered
+        if e['date'] > today and IMPACT_LEVELS[e['impact']] >= IMPACT_LEVELS[WEEK_MIN_IMPACT]
+    ]
 
     result = {
-        'date': today.strftime('%Y-%m-%d'),
-        'fetch_time': today.strftime('%Y-%m-%d %H:%M:%S'),
-        'total_events': len(events),
-        'us_events': events,
-        'all_events': events,
-        'note': 'Economic calendar data may be limited. Check Investing.com for full calendar.'
+        'date': today,
+        'fetch_time': now.strftime('%Y-%m-%d %H:%M:%S'),
+        'total_events': len(us_events),
+        'us_events': us_events,
+        'all_events': us_events,
+        'week_events': week_events,
     }
 
     # 保存到文件
-    output_path = Path(__file__).parent.parent.parent / 'data' / 'calendar.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    output_path = scraper.output_file
+    scraper.save(result)
 
-    print(f"Fetched {len(events)} US economic events for today, saved to {output_path}")
+    print(f"Fetched {len(us_events)} US economic events for today, saved to {output_path}")
     return result
 
 
-if __name__ == '__main__':
-    data = fetch_calendar()
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the economic calendar')
+    parser.add_argument('--full', action='store_true', help="Refetch the whole week from every source")
+    parser.add_argument('--sources', default=','.join(DEFAULT_SOURCES),
+                        help=f"Comma-separated sources ({', '.join(SOURCES)})")
+    args = parser.parse_args()
+    source_names = tuple(name.strip() for name in args.sources.split(',') if name.strip())
+    unknown = [name for name in source_names if name not in SOURCES]
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(unknown)}")
+
+    calendar_scraper = Scraper('calendar', source='calendar')
+    data = calendar_scraper.run(fetch_calendar, calendar_scraper, args.full, source_names)
     print(f"\nToday's US Economic Events:")
     for event in data['us_events'][:10]:
         time_str = event['time'].split(' ')[-1] if ' ' in event['time'] else event['time']
-        print(f"  {time_str} - {event['event']}")
+        print(f"  {time_str} - {event['event']} [{event['impact']}]")
         if event['estimate']:
             print(f"           Expected: {event['estimate']}, Previous: {event['prev']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,69 @@
-"""新闻抓取模块 - 使用 Finnhub API"""
+"""新闻抓取模块 - 使用 Finnhub API
+
+抓取结果保存到 data/news.json 并追加到新闻归档日志；事件聚类和股票倒排索引
+由每日任务随后运行的分析步骤（src.analyzers.news_clusters / symbol_index）更新。
+"""
 
-import json
 import os
-import finnhub
 from datetime import datetime, timedelta
 from pathlib import Path
-from dotenv import load_dotenv
 
-load_dotenv()
+from src.scrapers.base import Scraper, SourceUnavailable
+from src.utils.jsonio import append_jsonl, loads, read_json, write_json
+
+# 新闻归档日志（JSON Lines，每行一条，只追加）
+NEWS_LOG_FILE = Path(__file__).parent.parent.parent / 'data' / 'news_log.jsonl'
+
+# 已归档新闻的 ID 及其对应的日志位置（避免每次抓取重读整个日志）
+ARCHIVED_IDS_FILE = Path(__file__).parent.parent.parent / 'data' / 'news_log_ids.json'
+
+
+def archived_ids() -> set:
+    """已归档的新闻 ID：读取 ID 文件，只补读其记录位置之后追加到日志的部分"""
+    state = read_json(ARCHIVED_IDS_FILE)
+    offset = state.get('log_offset', 0)
+    ids = set(state.get('ids', []))
+    try:
+        size = NEWS_LOG_FILE.stat().st_size
+    except FileNotFoundError:
+        return set()
+    # 日志被截断或替换时从头重建
+    if size < offset:
+        offset, ids = 0, set()
+    with open(NEWS_LOG_FILE, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                ids.add(loads(line).get('id'))
+            except ValueError:
+                continue
+    return ids
 
 
-def fetch_news() -> dict:
+def archive_news(news_items: list) -> int:
+    """把未归档过的新闻追加到新闻日志，返回新增条数"""
+    seen_ids = archived_ids()
+    new_items = [n for n in news_items if n.get('id') not in seen_ids]
+    append_jsonl(NEWS_LOG_FILE, new_items)
+    seen_ids.update(n.get('id') for n in new_items)
+    seen_ids.discard(None)
+    write_json(ARCHIVED_IDS_FILE, {
+        'log_offset': NEWS_LOG_FILE.stat().st_size if NEWS_LOG_FILE.exists() else 0,
+        'ids': sorted(seen_ids, key=str),
+    })
+    return len(new_items)
+
+
+def fetch_news(scraper: Scraper = None) -> dict:
     """抓取市场新闻"""
+    import finnhub
+    from dotenv import load_dotenv
+
+    load_dotenv()
     print("Fetching market news...")
+    scraper = scraper or Scraper('news', source='finnhub')
 
     api_key = os.getenv('FINNHUB_API_KEY')
     if not api_key:
@@ -25,7 +76,10 @@ def fetch_news() -> dict:
     yesterday = today - timedelta(days=1)
 
     # 获取市场综合新闻
-    news_list = client.general_news('general', min_id=0)
+    try:
+        news_list = scraper.call(client.general_news, 'general', min_id=0)
+    except Exception as e:
+        raise SourceUnavailable(f"general_news failed: {e}") from e
 
     # 过滤和处理新闻
     processed_news = []
@@ -49,16 +103,19 @@ def fetch_news() -> dict:
     }
 
     # 保存到文件
-    output_path = Path(__file__).parent.parent.parent / 'data' / 'news.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    output_path = scraper.output_file
+    scraper.save(result)
 
     print(f"Fetched {len(processed_news)} news articles, saved to {output_path}")
+
+    archived = archive_news(processed_news)
+    print(f"Archived {archived} new articles to {NEWS_LOG_FILE}")
     return result
 
 
 if __name__ == '__main__':
-    data = fetch_news()
+    news_scraper = Scraper('news', source='finnhub')
+    data = news_scraper.run(fetch_news, news_scraper)
     print(f"\nSample headlines:")
     for news in data['news'][:5]:
         print(f"  - {news['headline'][:80]}...")
@@ -1,35 +1,86 @@
 """期权数据抓取模块 - 使用 yfinance"""
 
-import json
-import yfinance as yf
+import time
 from datetime import datetime
-from pathlib import Path
 
-# 主要指数 ETF
-INDEX_SYMBOLS = ['SPY', 'QQQ', 'IWM', 'DIA', 'VIX']
+from src.scrapers.base import CircuitOpenError, Scraper, SourceUnavailable
+from src.utils import universe
+from src.utils.timeseries import append_points
 
-# 热门个股列表 (高期权成交量股票)
-POPULAR_STOCKS = [
-    'AAPL', 'MSFT', 'NVDA', 'TSLA', 'AMZN', 'META', 'GOOGL', 'AMD', 'NFLX', 'COIN',
-    'PLTR', 'SOFI', 'NIO', 'BABA', 'GME', 'AMC', 'BA', 'DIS', 'INTC', 'MU',
-    'PYPL', 'SQ', 'SHOP', 'UBER', 'RIVN', 'LCID', 'F', 'GM', 'JPM', 'BAC',
-    'XOM', 'CVX', 'PFE', 'MRNA', 'JNJ', 'UNH', 'V', 'MA', 'WMT', 'TGT'
-]
+# 期限结构使用的到期日数量（用于 IV 计算）
+TERM_STRUCTURE_EXPIRIES = 3
 
+# 全市场汇总在时间序列中的代码
+MARKET_SYMBOL = '__MARKET__'
+
+# 期权链保存的列
+CHAIN_COLUMNS = ['strike', 'lastPrice', 'bid', 'ask', 'volume', 'openInterest']
+
+
+def _append_chain(contracts: dict, frame, option_type: str, expiry: str):
+    """将期权链 DataFrame 追加为列式数据"""
+    if frame is None or frame.empty:
+        return
+    frame = frame.reindex(columns=CHAIN_COLUMNS).fillna(0)
+    n = len(frame)
+    contracts['type'].extend([option_type] * n)
+    contracts['expiry'].extend([expiry] * n)
+    contracts['strike'].extend(frame['strike'].astype(float).tolist())
+    contracts['last'].extend(frame['lastPrice'].astype(float).tolist())
+    contracts['bid'].extend(frame['bid'].astype(float).tolist())
+    contracts['ask'].extend(frame['ask'].astype(float).tolist())
+    contracts['volume'].extend(frame['volume'].astype(int).tolist())
+    contracts['open_interest'].extend(frame['openInterest'].astype(int).tolist())
+
+
+def collect_chain(scraper: Scraper, ticker, expirations: list, nearest_chain) -> dict:
+    """收集近几个到期日的期权链价格（列式存储，供希腊值计算使用）"""
+    try:
+        spot = scraper.call(lambda: ticker.fast_info['lastPrice'])
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        scraper.record_error(f"{ticker.ticker} spot", e)
+        spot = None
+    if not spot:
+        return None
+
+    contracts = {key: [] for key in
+                 ['type', 'expiry', 'strike', 'last', 'bid', 'ask', 'volume', 'open_interest']}
+
+    for i, expiry in enumerate(expirations[:TERM_STRUCTURE_EXPIRIES]):
+        try:
+            opt = nearest_chain if i == 0 else scraper.call(ticker.option_chain, expiry)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            scraper.record_error(f"{ticker.ticker} {expiry} chain", e)
+            continue
+        _append_chain(contracts, opt.calls, 'C', expiry)
+        _append_chain(contracts, opt.puts, 'P', expiry)
+
+    return {'spot': float(spot), 'contracts': contracts}
+
+
+def get_options_volume(scraper: Scraper, symbol: str, chains: dict = None) -> dict:
+    """获取单个股票的期权成交量数据
+
+    传入 chains 字典时，同时把近几个到期日的期权链价格收集到 chains[symbol]。
+    单只股票失败记入 _meta 后返回 None；数据源熔断时抛出 CircuitOpenError。
+    """
+    import yfinance as yf
 
-def get_options_volume(symbol: str) -> dict:
-    """获取单个股票的期权成交量数据"""
     try:
         ticker = yf.Ticker(symbol)
 
         # 获取所有到期日
-        expirations = ticker.options
+        expirations = scraper.call(getattr, ticker, 'options')
         if not expirations:
             return None
 
         # 获取最近到期日的期权链
         nearest_expiry = expirations[0]
-        opt = ticker.option_chain(nearest_expiry)
+        opt = scraper.call(ticker.option_chain, nearest_expiry)
 
         calls = opt.calls
         puts = opt.puts
@@ -62,6 +113,11 @@ def get_options_volume(symbol: str) -> dict:
 
         hottest = f"{hottest_call or ''}/{hottest_put or ''}".strip('/')
 
+        if chains is not None:
+            chain = collect_chain(scraper, ticker, expirations, opt)
+            if chain:
+                chains[symbol] = chain
+
         return {
             'symbol': symbol,
             'call_volume': call_volume,
@@ -71,29 +127,36 @@ def get_options_volume(symbol: str) -> dict:
             'hottest_option': hottest,
             'expiry': nearest_expiry
         }
+    except CircuitOpenError:
+        raise
     except Exception as e:
-        print(f"Error fetching options for {symbol}: {e}")
+        scraper.record_error(symbol, e)
         return None
 
 
-def fetch_options_data() -> dict:
+def fetch_options_data(scraper: Scraper = None) -> dict:
     """抓取所有期权数据"""
     print("Fetching options data...")
+    scraper = scraper or Scraper('options', source='yfinance')
 
-    # 抓取指数期权
-    index_options = []
-    for symbol in INDEX_SYMBOLS:
-        data = get_options_volume(symbol)
-        if data:
-            index_options.append(data)
-            print(f"  {symbol}: {data['total_volume']:,} contracts")
+    # 期权链价格（供 IV / 希腊值计算）
+    chains = {}
 
-    # 抓取个股期权
-    stock_options = []
-    for symbol in POPULAR_STOCKS:
-        data = get_options_volume(symbol)
+    # 按抓取计划每只股票只抓取一次，再分发到指数 / 个股板块
+    volumes = {}
+    for symbol in universe.fetch_plan()['options']:
+        with scraper.track(symbol):
+            data = get_options_volume(scraper, symbol, chains)
         if data:
-            stock_options.append(data)
+            volumes[symbol] = data
+
+    index_options = [volumes[s] for s in universe.symbols('index_options') if s in volumes]
+    for data in index_options:
+        print(f"  {data['symbol']}: {data['total_volume']:,} contracts")
+    stock_options = [volumes[s] for s in universe.symbols('stock_options') if s in volumes]
+
+    if not index_options and not stock_options:
+        raise SourceUnavailable(f"no options data fetched ({len(scraper.errors)} errors)")
 
     # 按成交量排序
     stock_options.sort(key=lambda x: x['total_volume'], reverse=True)
@@ -127,20 +190,43 @@ def fetch_options_data() -> dict:
             'sentiment': sentiment
         },
         'index_options': sorted(index_options, key=lambda x: x['total_volume'], reverse=True),
-        'top_25_stocks': top_25_stocks
+        'top_25_stocks': top_25_stocks,
+        'stock_options': stock_options  # 全部个股（供板块汇总）
     }
 
     # 保存到文件
-    output_path = Path(__file__).parent.parent.parent / 'data' / 'options.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    output_path = scraper.output_file
+    scraper.save(result)
 
     print(f"Options data saved to {output_path}")
+
+    # 盘中 P/C 和期权成交量走势（内存映射的时间序列，Web 服务直接读取）
+    now_ts = time.time()
+    append_points('pc_ratio', {
+        **{s: round(d['put_volume'] / d['call_volume'], 4) if d['call_volume'] else None
+           for s, d in volumes.items()},
+        MARKET_SYMBOL: pc_ratio if total_call_volume else None,
+    }, now_ts)
+    append_points('option_volume', {
+        **{s: d['total_volume'] for s, d in volumes.items()},
+        MARKET_SYMBOL: total_volume,
+    }, now_ts)
+
+    # 保存期权链（列式存储，供 src.analyzers.greeks 使用）
+    chain_path = output_path.parent / 'options_chain.json'
+    scraper.save({
+        'date': result['date'],
+        'fetch_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'chains': chains
+    }, chain_path)
+
+    print(f"Option chains for {len(chains)} symbols saved to {chain_path}")
     return result
 
 
 if __name__ == '__main__':
-    data = fetch_options_data()
+    options_scraper = Scraper('options', source='yfinance')
+    data = options_scraper.run(fetch_options_data, options_scraper)
     print(f"\nMarket Overview:")
     print(f"  Total Volume: {data['market_overview']['total_volume']:,}")
     print(f"  P/C Ratio: {data['market_overview']['pc_ratio']}")
@@ -0,0 +1,218 @@
+"""盘前行情 - 指数 ETF、股指期货和 VIX 期限结构的批量轮询
+
+股票取自股票池注册表中 data 为 quotes 的板块（quote_indexes / quote_futures /
+vix_term）。每轮只发一次 yf.download 批量请求（两天的 1 分钟 K 线，含盘前盘后），
+从中取最新价、前一交易日收盘价和当日成交量。
+
+以 --loop 常驻运行时（supervisord 的 quotes 进程）每 QUOTES_INTERVAL 秒轮询一次：
+每根分钟线的收盘价和成交量追加到内存映射的环形缓冲区（src.utils.timeseries 的
+price / volume 序列，Web 服务 /api/series 直接读取），最新行情连同最近
+SPARKLINE_POINTS 个价格原子写入 data/quotes.json，供 /api/quotes 和报告的走势小图
+使用。不带参数时只轮询一次（每日任务中使用）。
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+from src.scrapers.base import EmptyResponse, Scraper, ScraperError
+from src.utils.timeseries import open_series
+from src.utils.universe import get_universe
+
+# 轮询间隔（秒），可用环境变量覆盖
+INTERVAL_ENV = 'QUOTES_INTERVAL'
+DEFAULT_INTERVAL = 60
+
+# 单次批量请求的超时（秒）：一次请求包含全部股票
+CALL_TIMEOUT = 30
+
+# 批量下载单独熔断：按股票调用 Ticker.info 的抓取任务出错时不影响行情轮询
+SOURCE = 'yfinance-download'
+
+# 走势小图保留的点数（1 分钟一个点）
+SPARKLINE_POINTS = 120
+
+# 美股常规交易时段（美东时间），用于区分盘前 / 盘中 / 盘后和取前收盘价
+MARKET_TZ = 'America/New_York'
+REGULAR_OPEN = '09:30'
+REGULAR_CLOSE = '16:00'
+
+# 报告中的显示名称（未列出的直接显示代码）
+LABELS = {
+    'SPY': 'S&P 500', 'QQQ': 'Nasdaq 100', 'DIA': 'Dow 30', 'IWM': 'Russell 2000',
+    'ES=F': 'S&P 500', 'NQ=F': 'Nasdaq 100', 'YM=F': 'Dow 30', 'RTY=F': 'Russell 2000',
+    '^VIX9D': 'VIX 9D', '^VIX': 'VIX', '^VIX3M': 'VIX 3M', '^VIX6M': 'VIX 6M',
+}
+
+# VIX 期限结构比较的近端 / 远端
+VIX_NEAR, VIX_FAR = '^VIX', '^VIX3M'
+
+
+def session_of(moment) -> str:
+    clock = moment.strftime('%H:%M')
+    if clock < REGULAR_OPEN:
+        return 'pre'
+    return 'regular' if clock < REGULAR_CLOSE else 'post'
+
+
+def parse_bars(symbol: str, bars) -> tuple:
+    """从一只股票的分钟线计算行情，返回 (行情, [(时间戳, 收盘价, 成交量)])"""
+    bars = bars.dropna(subset=['Close'])
+    if bars.empty:
+        return None, []
+    if bars.index.tz is not None:
+        bars = bars.tz_convert(MARKET_TZ)
+    last_time = bars.index[-1]
+    today = bars[bars.index.date == last_time.date()]
+    earlier = bars[bars.index.date < last_time.date()]
+    regular = earlier.between_time(REGULAR_OPEN, REGULAR_CLOSE, inclusive='left')
+    closes = (regular if len(regular) else earlier)['Close']
+
+    price = round(float(bars['Close'].iloc[-1]), 4)
+    prev_close = round(float(closes.iloc[-1]), 4) if len(closes) else None
+    change = round(price - prev_close, 4) if prev_close else None
+    quote = {
+        'symbol': symbol,
+        'label': LABELS.get(symbol, symbol),
+        'price': price,
+        'prev_close': prev_close,
+        'change': change,
+        'change_pct': round(change / prev_close * 100, 2) if prev_close else None,
+        'volume': int(today['Volume'].fillna(0).sum()),
+        'time': last_time.strftime('%H:%M'),
+        'session': session_of(last_time),
+    }
+    tail = bars.iloc[-SPARKLINE_POINTS:]
+    points = [
+        (ts.timestamp(), round(float(close), 4), float(volume) if volume == volume else 0.0)
+        for ts, close, volume in zip(tail.index, tail['Close'], tail['Volume'])
+    ]
+    return quote, points
+
+
+def fetch_batch(scraper: Scraper, symbols: list) -> dict:
+    """一次批量请求全部股票的分钟线，返回 {symbol: (行情, 走势点)}"""
+    import yfinance as yf
+
+    frame = scraper.call(yf.download, symbols, period='2d', interval='1m', prepost=True,
+                         group_by='ticker', auto_adjust=False, progress=False, threads=True)
+    if frame is None or frame.empty:
+        raise EmptyResponse(f"no quotes returned for {len(symbols)} symbols")
+    results = {}
+    available = set(frame.columns.get_level_values(0))
+    for symbol in symbols:
+        if symbol not in available:
+            scraper.record_error(symbol, ValueError('no bars returned'))
+            continue
+        quote, points = parse_bars(symbol, frame[symbol])
+        if quote is None:
+            scraper.record_error(symbol, ValueError('no bars returned'))
+            continue
+        results[symbol] = (quote, points)
+    return results
+
+
+def vix_term_structure(quotes: dict) -> dict:
+    """VIX 期限结构：远端 / 近端 > 1 为正向（contango，常态），< 1 为倒挂（恐慌）"""
+    near, far = quotes.get(VIX_NEAR), quotes.get(VIX_FAR)
+    if not near or not far or not near['price']:
+        return {}
+    ratio = round(far['price'] / near['price'], 3)
+    return {'ratio': ratio, 'state': 'contango' if ratio >= 1 else 'backwardation'}
+
+
+def record_series(symbol: str, points: list) -> list:
+    """把分钟线追加到 price / volume 序列，返回最近 SPARKLINE_POINTS 个价格 [[时间戳, 价格]]
+
+    按 K 线时间戳追加：比最新点旧的忽略，同一时间戳（K 线尚未走完）覆盖最新点，
+    因此每轮把最近的 K 线全部交给序列即可，休市期间不会堆积重复的点。
+    """
+    prices, volumes = open_series('price', symbol, writable=True), open_series('volume', symbol, writable=True)
+    try:
+        for ts, close, volume in points:
+            prices.append(ts, close)
+            volumes.append(ts, volume)
+        return [[int(ts), value] for ts, value in prices.latest(SPARKLINE_POINTS)]
+    finally:
+        prices.close()
+        volumes.close()
+
+
+def poll_quotes(scraper: Scraper, interval: int = DEFAULT_INTERVAL) -> dict:
+    """轮询一次全部行情，追加到时间序列并保存 data/quotes.json"""
+    universe = get_universe()
+    sections = universe.sections_for('quotes')
+    symbols = universe.fetch_plan().get('quotes', [])
+    if not symbols:
+        raise ValueError("no quote symbols in universe (sections with data 'quotes')")
+
+    start = time.perf_counter()
+    fetched = fetch_batch(scraper, symbols)
+    quotes, sparklines = {}, {}
+    for symbol, (quote, points) in fetched.items():
+        sparklines[symbol] = record_series(symbol, points)
+        quotes[symbol] = quote
+
+    now = datetime.now()
+    result = {
+        'date': now.strftime('%Y-%m-%d'),
+        'fetch_time': now.strftime('%Y-%m-%d %H:%M:%S'),
+        'interval': interval,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+        'groups': [
+            {'section': section, 'quotes': [quotes[s] for s in universe.symbols(section) if s in quotes]}
+            for section in sections
+        ],
+        'vix_term': vix_term_structure(quotes),
+        'sparklines': sparklines,
+    }
+    scraper.save(result)
+    print(f"Polled {len(quotes)}/{len(symbols)} quotes in {result['elapsed_ms']} ms")
+    return result
+
+
+def make_scraper() -> Scraper:
+    return Scraper('quotes', source=SOURCE, call_timeout=CALL_TIMEOUT, retries=1)
+
+
+def run_loop(interval: int):
+    """常驻轮询：单轮失败只标记过期，下一轮继续"""
+    print(f"Polling quotes every {interval}s")
+    while True:
+        started = time.monotonic()
+        scraper = make_scraper()
+        try:
+            poll_quotes(scraper, interval)
+        except ScraperError as e:
+            print(f"Source {scraper.source} unavailable for quotes: {e}")
+            scraper.mark_stale(e)
+        except Exception as e:
+            print(f"Quote poll failed: {type(e).__name__}: {e}")
+            scraper.mark_stale(e)
+        time.sleep(max(1.0, interval - (time.monotonic() - started)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Poll index ETF, futures and VIX term structure quotes')
+    parser.add_argument('--loop', action='store_true', help='Keep polling at the configured interval')
+    parser.add_argument('--interval', type=int, default=int(os.environ.get(INTERVAL_ENV, DEFAULT_INTERVAL)),
+                        help=f'Seconds between polls (default: ${INTERVAL_ENV} or {DEFAULT_INTERVAL})')
+    args = parser.parse_args()
+
+    if args.loop:
+        run_loop(max(args.interval, 1))
+        return
+
+    scraper = make_scraper()
+    data = scraper.run(poll_quotes, scraper, args.interval)
+    for group in data['groups']:
+        print(f"\n{group['section']}:")
+        for q in group['quotes']:
+            print(f"  {q['symbol']:<8} {q['price']:>10.2f}  {q['change_pct']}%  [{q['session']} {q['time']}]")
+    if data['vix_term']:
+        print(f"\nVIX term structure: {data['vix_term']['state']} ({data['vix_term']['ratio']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,32 +1,27 @@
 """投行评级抓取模块 - 使用 yfinance"""
 
-import json
-import yfinance as yf
 from datetime import datetime
-from pathlib import Path
 
-# 主要关注的股票列表
-WATCHED_STOCKS = [
-    'AAPL', 'MSFT', 'NVDA', 'TSLA', 'AMZN', 'META', 'GOOGL', 'AMD', 'NFLX',
-    'COIN', 'PLTR', 'NIO', 'BABA', 'BA', 'DIS', 'INTC', 'MU',
-    'PYPL', 'SQ', 'SHOP', 'UBER', 'JPM', 'BAC',
-    'XOM', 'CVX', 'PFE', 'JNJ', 'UNH', 'V', 'MA', 'WMT'
-]
+from src.scrapers.base import CircuitOpenError, Scraper, SourceUnavailable
+from src.scrapers.ticker_info import fetch_info
+from src.utils import universe
 
 
-def fetch_ratings() -> dict:
+def fetch_ratings(scraper: Scraper = None) -> dict:
     """抓取投行评级 - 使用 yfinance"""
+    import yfinance as yf
+
     print("Fetching analyst ratings...")
+    scraper = scraper or Scraper('ratings', source='yfinance')
 
     today = datetime.now()
     all_ratings = []
     recent_changes = []
 
-    for symbol in WATCHED_STOCKS:
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+    infos, _ = fetch_info(scraper, universe.symbols('ratings'))
 
+    for symbol, info in infos.items():
+        with scraper.track(symbol):
             # 获取分析师目标价
             target_mean = info.get('targetMeanPrice')
             target_high = info.get('targetHighPrice')
@@ -57,7 +52,7 @@ def fetch_ratings() -> dict:
 
             # 获取最近的升级/降级信息
             try:
-                upgrades = ticker.upgrades_downgrades
+                upgrades = scraper.call(getattr, yf.Ticker(symbol), 'upgrades_downgrades')
                 if upgrades is not None and not upgrades.empty:
                     # 取最近的几条
                     recent = upgrades.head(3)
@@ -70,12 +65,13 @@ def fetch_ratings() -> dict:
                             'action': row.get('Action', ''),
                             'date': str(idx)[:10] if idx else ''
                         })
-            except Exception:
-                pass
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                scraper.record_error(f"{symbol} upgrades", e)
 
-        except Exception as e:
-            print(f"  Error fetching rating for {symbol}: {e}")
-            continue
+    if not all_ratings and not recent_changes:
+        raise SourceUnavailable(f"no ratings fetched ({len(scraper.errors)} errors)")
 
     # 按潜在涨幅排序
     all_ratings.sort(key=lambda x: x.get('upside_pct') or 0, reverse=True)
@@ -92,16 +88,16 @@ def fetch_ratings() -> dict:
     }
 
     # 保存到文件
-    output_path = Path(__file__).parent.parent.parent / 'data' / 'ratings.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    output_path = scraper.output_file
+    scraper.save(result)
 
     print(f"Fetched ratings for {len(all_ratings)} stocks, saved to {output_path}")
     return result
 
 
 if __name__ == '__main__':
-    data = fetch_ratings()
+    ratings_scraper = Scraper('ratings', source='yfinance')
+    data = ratings_scraper.run(fetch_ratings, ratings_scraper)
     print(f"\nTop ratings by upside:")
     for r in data['ratings'][:5]:
         upside = r.get('upside_pct')
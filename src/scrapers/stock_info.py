@@ -1,18 +1,24 @@
 """股票基本信息抓取模块 - 用于 hover 显示"""
 
-import json
-import yfinance as yf
 from datetime import datetime
-from pathlib import Path
 
-# 需要获取信息的股票列表（从其他模块汇总）
-DEFAULT_STOCKS = [
-    'AAPL', 'MSFT', 'NVDA', 'TSLA', 'AMZN', 'META', 'GOOGL', 'AMD', 'NFLX',
-    'COIN', 'PLTR', 'NIO', 'BABA', 'BA', 'DIS', 'INTC', 'MU',
-    'PYPL', 'SQ', 'SHOP', 'UBER', 'JPM', 'BAC', 'GS',
-    'XOM', 'CVX', 'PFE', 'JNJ', 'UNH', 'V', 'MA', 'WMT',
-    'SPY', 'QQQ', 'IWM', 'DIA', '^VIX'
-]
+from src.scrapers.base import DATA_DIR, Scraper, SourceUnavailable
+from src.scrapers.ticker_info import PROFILE_TTL, fetch_info
+from src.utils import universe
+from src.utils.jsonio import read_json
+from src.utils.news import related_symbols
+
+# 报告中出现股票代码的数据文件 -> 含 symbol 字段的列表键
+SYMBOL_SOURCES = {
+    'options.json': ('index_options', 'top_25_stocks'),
+    'ratings.json': ('ratings', 'recent_changes'),
+    'earnings.json': ('before_market', 'after_market', 'all_earnings'),
+    'unusual_options.json': ('unusual',),
+}
+
+# 单次最多补充的股票数（防止新闻 related 字段异常时请求过多）；
+# 报告数据文件中的股票总是保留，只截断来自新闻的部分
+MAX_DISCOVERED = 200
 
 
 def format_number(num):
@@ -31,59 +37,96 @@ def format_number(num):
         return f'{num:.2f}'
 
 
-def fetch_stock_info(symbols: list = None) -> dict:
-    """抓取股票基本信息"""
-    print("Fetching stock info for hover tooltips...")
+def discover_symbols(exclude=()) -> list:
+    """收集其他数据文件中出现的股票代码（报告中所有可 hover 的股票），不含 exclude
 
-    if symbols is None:
-        symbols = DEFAULT_STOCKS
+    报告数据文件中的股票在前；总数超过 MAX_DISCOVERED 时截掉排在后面的新闻相关股票。
+    """
+    normalize = universe.get_universe().normalize
+    exclude = set(exclude)
 
-    stock_info = {}
+    def collect(found) -> list:
+        return [s for s in dict.fromkeys(normalize(s) for s in found if s) if s not in exclude]
 
-    for symbol in symbols:
-        try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
+    reported = []
+    for filename, keys in SYMBOL_SOURCES.items():
+        data = read_json(DATA_DIR / filename)
+        for key in keys:
+            reported.extend(item.get('symbol') for item in data.get(key) or [])
+    reported = collect(reported)
 
-            # 获取今日数据
-            current_price = info.get('currentPrice') or info.get('regularMarketPrice')
-            prev_close = info.get('previousClose') or info.get('regularMarketPreviousClose')
+    exclude.update(reported)
+    mentioned = collect(s for news in read_json(DATA_DIR / 'news.json').get('news', [])
+                        for s in related_symbols(news))
+    room = max(MAX_DISCOVERED - len(reported), 0)
+    if len(mentioned) > room:
+        print(f"  Skipping {len(mentioned) - room} of {len(mentioned)} news-related symbols "
+              f"(limit {MAX_DISCOVERED} discovered symbols)")
+    return reported + mentioned[:room]
 
-            # 计算涨跌幅
-            change_pct = None
-            change_val = None
-            if current_price and prev_close:
-                change_val = current_price - prev_close
-                change_pct = (change_val / prev_close) * 100
 
-            stock_info[symbol] = {
-                'symbol': symbol,
-                'name': info.get('shortName') or info.get('longName') or symbol,
-                'current_price': current_price,
-                'prev_close': prev_close,
-                'change': round(change_val, 2) if change_val else None,
-                'change_pct': round(change_pct, 2) if change_pct else None,
-                'volume': info.get('volume') or info.get('regularMarketVolume'),
-                'volume_formatted': format_number(info.get('volume') or info.get('regularMarketVolume')),
-                'market_cap': info.get('marketCap'),
-                'market_cap_formatted': format_number(info.get('marketCap')),
-                'day_high': info.get('dayHigh') or info.get('regularMarketDayHigh'),
-                'day_low': info.get('dayLow') or info.get('regularMarketDayLow'),
-                'fifty_two_week_high': info.get('fiftyTwoWeekHigh'),
-                'fifty_two_week_low': info.get('fiftyTwoWeekLow'),
-                'pe_ratio': info.get('trailingPE'),
-                'sector': info.get('sector', ''),
-                'industry': info.get('industry', ''),
-            }
-            print(f"  {symbol}: {stock_info[symbol]['name']}")
+def fetch_stock_info(symbols: list = None, scraper: Scraper = None) -> dict:
+    """抓取股票基本信息
+
+    默认为股票池中 stock_info 板块的股票，加上其他数据文件中出现的股票。
+    名称 / 行业等资料只对缓存中缺失或过期的股票请求，价格按批次统一刷新。
+    """
+    print("Fetching stock info for hover tooltips...")
+    scraper = scraper or Scraper('stock_info', source='yfinance')
+
+    if symbols is None:
+        configured = universe.symbols('stock_info')
+        discovered = discover_symbols(exclude=configured)
+        print(f"  {len(configured)} configured + {len(discovered)} referenced in reports")
+        symbols = configured + discovered
+
+    infos, errors = fetch_info(scraper, symbols, ttl=PROFILE_TTL, quotes=True)
+    stock_info = {}
 
-        except Exception as e:
-            print(f"  Error fetching {symbol}: {e}")
+    for symbol in symbols:
+        if symbol not in infos:
             stock_info[symbol] = {
                 'symbol': symbol,
                 'name': symbol,
-                'error': str(e)
+                'error': errors.get(symbol, '')
             }
+            continue
+        info = infos[symbol]
+
+        # 获取今日数据
+        current_price = info.get('currentPrice') or info.get('regularMarketPrice')
+        prev_close = info.get('previousClose') or info.get('regularMarketPreviousClose')
+
+        # 计算涨跌幅
+        change_pct = None
+        change_val = None
+        if current_price and prev_close:
+            change_val = current_price - prev_close
+            change_pct = (change_val / prev_close) * 100
+
+        stock_info[symbol] = {
+            'symbol': symbol,
+            'name': info.get('shortName') or info.get('longName') or symbol,
+            'current_price': current_price,
+            'prev_close': prev_close,
+            'change': round(change_val, 2) if change_val else None,
+            'change_pct': round(change_pct, 2) if change_pct else None,
+            'volume': info.get('volume') or info.get('regularMarketVolume'),
+            'volume_formatted': format_number(info.get('volume') or info.get('regularMarketVolume')),
+            'market_cap': info.get('marketCap'),
+            'market_cap_formatted': format_number(info.get('marketCap')),
+            'day_high': info.get('dayHigh') or info.get('regularMarketDayHigh'),
+            'day_low': info.get('dayLow') or info.get('regularMarketDayLow'),
+            'fifty_two_week_high': info.get('fiftyTwoWeekHigh'),
+            'fifty_two_week_low': info.get('fiftyTwoWeekLow'),
+            'pe_ratio': info.get('trailingPE'),
+            'sector': info.get('sector', ''),
+            'industry': info.get('industry', ''),
+        }
+        print(f"  {symbol}: {stock_info[symbol]['name']}")
+
+    if stock_info and all('error' in info for info in stock_info.values()):
+        raise SourceUnavailable(f"no stock info fetched ({len(scraper.errors)} errors)")
 
     result = {
         'date': datetime.now().strftime('%Y-%m-%d'),
@@ -93,14 +136,14 @@ def fetch_stock_info(symbols: list = None) -> dict:
     }
 
     # 保存到文件
-    output_path = Path(__file__).parent.parent.parent / 'data' / 'stock_info.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    output_path = scraper.output_file
+    scraper.save(result)
 
     print(f"Stock info saved to {output_path}")
     return result
 
 
 if __name__ == '__main__':
-    data = fetch_stock_info()
+    info_scraper = Scraper('stock_info', source='yfinance')
+    data = info_scraper.run(fetch_stock_info, None, info_scraper)
     print(f"\nFetched info for {data['count']} stocks")
@@ -0,0 +1,128 @@
+"""yfinance 基本信息（Ticker.info）共享缓存
+
+评级和 hover 信息都读取 Ticker.info。两个抓取任务经由这里取数：缓存中未过期的
+股票直接复用，只对缺失或过期的股票发起请求，同一轮任务中每只股票只抓取一次。
+缓存只保留用到的字段，保存在 data/ticker_info.json。
+
+名称、行业、市值等资料变化很慢，hover 信息可以用较长的有效期（PROFILE_TTL），
+价格和成交量则按批次一次请求（yf.download）刷新后覆盖到缓存的资料上。
+"""
+
+import time
+
+from src.scrapers.base import DATA_DIR, CircuitOpenError, Scraper
+from src.utils.jsonio import read_json, write_json
+
+CACHE_FILE = DATA_DIR / 'ticker_info.json'
+
+# 缓存有效期（秒）：覆盖一轮定时任务中各抓取步骤的间隔
+INFO_TTL = 15 * 60
+
+# 只需要名称 / 行业等资料时的有效期（秒），价格另由批量行情刷新
+PROFILE_TTL = 7 * 24 * 3600
+
+# 批量行情每次请求的股票数
+QUOTE_BATCH_SIZE = 100
+
+# 缓存的 info 字段
+INFO_FIELDS = (
+    'shortName', 'longName', 'sector', 'industry',
+    'currentPrice', 'regularMarketPrice', 'previousClose', 'regularMarketPreviousClose',
+    'volume', 'regularMarketVolume', 'marketCap',
+    'dayHigh', 'regularMarketDayHigh', 'dayLow', 'regularMarketDayLow',
+    'fiftyTwoWeekHigh', 'fiftyTwoWeekLow', 'trailingPE',
+    'targetMeanPrice', 'targetHighPrice', 'targetLowPrice',
+    'recommendationKey', 'numberOfAnalystOpinions',
+)
+
+# 日线行情列 -> 覆盖的 info 字段
+QUOTE_FIELDS = {
+    'Close': ('currentPrice', 'regularMarketPrice'),
+    'Volume': ('volume', 'regularMarketVolume'),
+    'High': ('dayHigh', 'regularMarketDayHigh'),
+    'Low': ('dayLow', 'regularMarketDayLow'),
+}
+
+
+def fetch_quotes(scraper: Scraper, symbols: list) -> dict:
+    """批量获取最新日线行情，返回 {symbol: info 字段}（按 QUOTE_BATCH_SIZE 分批，每批一次请求）"""
+    import yfinance as yf
+
+    quotes = {}
+    for start in range(0, len(symbols), QUOTE_BATCH_SIZE):
+        batch = symbols[start:start + QUOTE_BATCH_SIZE]
+        try:
+            frame = scraper.call(yf.download, batch, period='5d', interval='1d', group_by='ticker',
+                                 auto_adjust=False, progress=False, threads=False)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            scraper.record_error(f"quotes {batch[0]}..{batch[-1]}", e)
+            continue
+        if frame is None or frame.empty:
+            continue
+        for symbol in batch:
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+            bars = frame[symbol].dropna(subset=['Close'])
+            if bars.empty:
+                continue
+            last = bars.iloc[-1]
+            quote = {}
+            for column, fields in QUOTE_FIELDS.items():
+                value = last.get(column)
+                if value is not None and value == value:  # 跳过 NaN
+                    value = int(value) if column == 'Volume' else round(float(value), 4)
+                    quote.update(dict.fromkeys(fields, value))
+            if len(bars) > 1:
+                prev_close = round(float(bars['Close'].iloc[-2]), 4)
+                quote['previousClose'] = quote['regularMarketPreviousClose'] = prev_close
+            quotes[symbol] = quote
+    return quotes
+
+
+def fetch_info(scraper: Scraper, symbols: list, ttl: float = INFO_TTL, quotes: bool = False) -> tuple:
+    """返回 ({symbol: info}, {symbol: 错误信息})
+
+    只对缓存中缺失或超过 ttl 的股票请求 Ticker.info；请求失败但缓存中有旧资料时
+    沿用旧资料。quotes=True 时再批量刷新全部股票的价格和成交量。
+    单只股票失败记入 scraper 的 _meta；数据源熔断时先保存已抓到的结果再抛出。
+    """
+    import yfinance as yf
+
+    cache = read_json(CACHE_FILE)
+    now = time.time()
+    infos, errors = {}, {}
+    fetched = quoted = 0
+    try:
+        for symbol in symbols:
+            entry = cache.get(symbol)
+            if entry and now - entry['fetched_at'] < ttl:
+                infos[symbol] = entry['info']
+                continue
+            with scraper.track(symbol):
+                try:
+                    info = scraper.call_required(getattr, yf.Ticker(symbol), 'info')
+                except CircuitOpenError:
+                    raise
+                except Exception as e:
+                    scraper.record_error(symbol, e)
+                    if entry:
+                        infos[symbol] = entry['info']
+                    else:
+                        errors[symbol] = str(e)
+                    continue
+            infos[symbol] = {key: info[key] for key in INFO_FIELDS if info.get(key) is not None}
+            cache[symbol] = {'fetched_at': now, 'info': infos[symbol]}
+            fetched += 1
+
+        if quotes and infos:
+            for symbol, quote in fetch_quotes(scraper, list(infos)).items():
+                infos[symbol].update(quote)
+                cache[symbol]['quoted_at'] = now
+                quoted += 1
+    finally:
+        if fetched or quoted:
+            write_json(CACHE_FILE, cache)
+    print(f"  Ticker info: {fetched} fetched, {len(infos) - fetched} from cache, {quoted} quotes refreshed")
+    return infos, errors
@@ -1,16 +1,47 @@
-"""FastAPI Web 服务"""
+"""FastAPI Web 服务
 
+生产环境以多个 worker 运行（WEB_WORKERS 环境变量，见 start_server）。读文件的路由
+都是普通 def 函数，由 FastAPI 放到线程池执行，不阻塞事件循环。页面在构建时渲染、
+经发布器原子发布，worker 之间经 mmap 共享同一份页面内容（见 PageCache）；历史报告
+页面和报告目录在构建时预渲染并预压缩，这里只发送文件。
+"""
+
+import asyncio
+import json
+import mmap
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from src.analyzers.symbol_index import SymbolNewsIndex
+from src.server.cache import UpstreamError
+from src.server.live import get_live
+from src.utils import metrics
+from src.utils.timeseries import DEFAULT_CAPACITY, METRICS, SeriesReader
+from src.utils.universe import get_universe
+
 # 路径配置
 BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
 OUTPUT_DIR = BASE_DIR / 'output'
+MANIFEST_FILE = OUTPUT_DIR / 'manifest.json'
+
+# worker 数量（环境变量，默认单进程）
+WORKERS_ENV = 'WEB_WORKERS'
+DEFAULT_WORKERS = 1
+
+# 各 worker 写出指标快照的间隔（秒）
+WORKER_METRICS_INTERVAL = 5
+
+# 每个 worker 保留映射的页面数
+PAGE_CACHE_ENTRIES = 256
 
 app = FastAPI(title="美股财经日报", version="1.0.0")
 
@@ -19,26 +50,148 @@ app = FastAPI(title="美股财经日报", version="1.0.0")
 class NoCacheMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         response = await call_next(request)
-        # 对所有页面禁用缓存
-        response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
+        # 除自行声明可缓存的静态归档外，对所有页面禁用缓存
+        if 'cache-control' not in response.headers:
+            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            response.headers["Pragma"] = "no-cache"
+            response.headers["Expires"] = "0"
         return response
 
 
 app.add_middleware(NoCacheMiddleware)
 
+
+# 请求耗时指标（按路由模板统计，避免日期等路径参数造成标签膨胀）
+class MetricsMiddleware(BaseHTTPMiddleware):
+    last_saved = 0.0
+
+    async def dispatch(self, request: Request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get('route')
+            metrics.REGISTRY.observe('http_request_seconds', {
+                'route': route.path if route else 'unmatched',
+                'method': request.method,
+                'status': str(status),
+            }, time.perf_counter() - start)
+            # 定期在线程池中写出本 worker 的快照，供 /metrics 跨 worker 合并
+            now = time.monotonic()
+            if now - MetricsMiddleware.last_saved >= WORKER_METRICS_INTERVAL:
+                MetricsMiddleware.last_saved = now
+                asyncio.get_running_loop().run_in_executor(None, metrics.save_worker_snapshot)
+
+
+app.add_middleware(MetricsMiddleware)
+
+
+class PageCache:
+    """已发布页面的跨 worker 共享缓存
+
+    页面文件以只读方式 mmap（MAP_SHARED）：所有 worker 映射的是同一个文件，共用内核页缓存中
+    的同一份内容，各 worker 只保存映射和 ETag，不各自复制一份页面。发布器用 rename 替换文件，
+    已有映射仍指向旧 inode，内容不会被写到一半。
+
+    发布器每次发布都会原子更新 output/manifest.json，这里以其 mtime 作为失效信号：
+    manifest 一变立即丢弃映射。未经发布器写入的文件按 (inode, mtime, size) 校验。
+    """
+
+    def __init__(self, manifest_file: Path, max_entries: int = PAGE_CACHE_ENTRIES):
+        self.manifest_file = manifest_file
+        self.max_entries = max_entries
+        self._manifest_mtime = None
+        self._manifest = {}
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_manifest(self):
+        """manifest 变化时重新加载并清空缓存"""
+        try:
+            mtime = self.manifest_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return
+        try:
+            manifest = json.loads(self.manifest_file.read_bytes()) if mtime else {}
+        except ValueError:
+            manifest = {}
+        with self._lock:
+            self._manifest_mtime = mtime
+            self._manifest = manifest
+            # 不主动关闭映射：其他线程可能仍在读取，由垃圾回收释放
+            self._pages.clear()
+
+    @staticmethod
+    def _map(path: Path):
+        """映射文件，返回 (校验键, 映射)；空文件没有可映射的内容，返回 b''"""
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if not stat.st_size:
+                return key, b''
+            return key, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, path: Path):
+        """返回 (内容字节串, ETag)，文件不存在时返回 None"""
+        self._check_manifest()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        cached = self._pages.get(path)
+        if cached and cached[0] == key:
+            metrics.cache_result('page', True)
+            return cached[1][:], cached[2]
+        metrics.cache_result('page', False)
+
+        try:
+            key, mapping = self._map(path)
+        except FileNotFoundError:
+            return None
+        try:
+            name = path.relative_to(self.manifest_file.parent).as_posix()
+        except ValueError:
+            name = path.name
+        file_info = self._manifest.get('files', {}).get(name, {})
+        etag = file_info.get('etag') or f'{key[1]:x}-{key[2]:x}'
+        with self._lock:
+            self._pages[path] = (key, mapping, etag)
+            self._pages.move_to_end(path)
+            # 每个映射占用一个文件描述符，只保留最近加载的页面
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return mapping[:], etag
+
+
+page_cache = PageCache(MANIFEST_FILE)
+
+
+def cached_page(path: Path):
+    """从页面缓存返回 HTMLResponse，文件不存在时返回 None"""
+    page = page_cache.get(path)
+    if page is None:
+        return None
+    content, etag = page
+    return HTMLResponse(content=content, headers={'ETag': f'"{etag}"'})
+
 # 挂载静态文件目录
 if (OUTPUT_DIR / 'assets').exists():
     app.mount("/assets", StaticFiles(directory=OUTPUT_DIR / 'assets'), name="assets")
 
 
 @app.get("/", response_class=HTMLResponse)
-async def index():
+def index():
     """首页 - 显示最新报告"""
-    index_file = OUTPUT_DIR / 'index.html'
-    if index_file.exists():
-        return HTMLResponse(content=index_file.read_text(encoding='utf-8'))
+    response = cached_page(OUTPUT_DIR / 'index.html')
+    if response is not None:
+        return response
 
     # 如果没有报告，显示提示页面
     return HTMLResponse(content="""
@@ -67,7 +220,7 @@ async def index():
 
 
 @app.get("/report/{date}", response_class=HTMLResponse)
-async def get_report(date: str, report_type: str = "premarket"):
+def get_report(date: str, report_type: str = "premarket"):
     """获取指定日期的报告"""
     # 验证日期格式
     try:
@@ -81,266 +234,180 @@ async def get_report(date: str, report_type: str = "premarket"):
         # 尝试不带类型的文件名
         report_file = OUTPUT_DIR / f'{date}.html'
 
-    if report_file.exists():
-        return HTMLResponse(content=report_file.read_text(encoding='utf-8'))
+    response = cached_page(report_file)
+    if response is not None:
+        return response
 
     raise HTTPException(status_code=404, detail=f"Report for {date} not found")
 
 
-def get_reports_list():
-    """获取报告列表数据"""
-    reports = []
+# 报告页面可按需加载的 Tab 片段
+FRAGMENT_SECTIONS = {'premarket', 'options'}
+
+
+def validate_date(date: str):
+    """校验日期格式"""
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format. Use YYYY-MM-DD")
+
+
+@app.get("/fragments/{date}/{section}", response_class=HTMLResponse)
+def get_fragment(date: str, section: str):
+    """获取报告的 Tab 片段（页面切换 Tab 时按需加载）"""
+    validate_date(date)
+    if section not in FRAGMENT_SECTIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown section: {section}")
+
+    response = cached_page(OUTPUT_DIR / 'fragments' / date / f'{section}.html')
+    if response is not None:
+        return response
+    raise HTTPException(status_code=404, detail=f"Fragment {section} for {date} not found")
+
+
+@app.get("/api/tooltips/{date}")
+def get_tooltips(date: str):
+    """API: 获取报告中股票 Tooltip 数据（首次 hover 时加载）"""
+    validate_date(date)
+    page = page_cache.get(OUTPUT_DIR / 'fragments' / date / 'tooltips.json')
+    if page is None:
+        return {}
+    content, etag = page
+    return Response(content=content, media_type='application/json', headers={'ETag': f'"{etag}"'})
+
+
+news_index = SymbolNewsIndex()
+
+# /api/news 单次最多返回条数
+MAX_NEWS_LIMIT = 50
 
-    if OUTPUT_DIR.exists():
-        for file in OUTPUT_DIR.glob('*.html'):
-            if file.name == 'index.html':
-                continue
 
-            # 解析文件名获取日期和类型
-            name = file.stem
-            parts = name.split('-')
+@app.get("/api/news")
+def api_news(symbol: str, limit: int = 10):
+    """API: 按股票代码查询相关新闻（新的在前）"""
+    limit = max(1, min(limit, MAX_NEWS_LIMIT))
+    news = news_index.lookup(symbol, limit)
+    return {'symbol': symbol.upper(), 'count': len(news), 'news': news}
 
-            if len(parts) >= 3:
-                date = '-'.join(parts[:3])
-                report_type = parts[3] if len(parts) > 3 else 'daily'
-            else:
-                date = name
-                report_type = 'daily'
 
-            # 类型显示名称
-            type_names = {
-                'daily': '综合日报',
-                'premarket': '盘前报告',
-                'options': '期权日报',
-            }
-            type_display = type_names.get(report_type, report_type)
+# 盘前行情（src.scrapers.quotes 常驻轮询，每轮原子写入）
+QUOTES_FILE = DATA_DIR / 'quotes.json'
 
-            reports.append({
-                'date': date,
-                'type': report_type,
-                'type_display': type_display,
-                'filename': file.name,
-                'url': f'/report/{date}?report_type={report_type}'
-            })
 
-    # 按日期降序排列
-    reports.sort(key=lambda x: (x['date'], x['type']), reverse=True)
-    return reports
+@app.get("/api/quotes")
+def api_quotes():
+    """API: 指数 ETF / 股指期货 / VIX 期限结构的最新行情和走势小图数据"""
+    page = page_cache.get(QUOTES_FILE)
+    if page is None:
+        return {}
+    content, etag = page
+    return Response(content=content, media_type='application/json', headers={'ETag': f'"{etag}"'})
+
+
+# 盘中时间序列（抓取进程写入的内存映射环形缓冲区，见 src/utils/timeseries.py）
+series_reader = SeriesReader()
+
+# /api/series 默认 / 最多返回的点数
+DEFAULT_SERIES_POINTS = 120
+MAX_SERIES_POINTS = DEFAULT_CAPACITY
+
+
+@app.get("/api/series/{metric}/{symbol}")
+def api_series(metric: str, symbol: str, points: int = DEFAULT_SERIES_POINTS):
+    """API: 某只股票某个指标（price / volume / option_volume / pc_ratio）最近的盘中走势
+
+    股票代码按股票池规范化（如 VIX -> ^VIX），与写入序列的抓取进程一致。
+    """
+    if metric not in METRICS:
+        raise HTTPException(status_code=404, detail=f"Unknown metric: {metric}")
+    points = max(1, min(points, MAX_SERIES_POINTS))
+    symbol = get_universe().normalize(symbol)
+    try:
+        series = series_reader.latest(metric, symbol, points)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid symbol: {symbol}")
+    return {'symbol': symbol, 'metric': metric, 'count': len(series), 'points': series}
+
+
+@app.get("/api/live/{data_type}/{symbol}")
+async def api_live(data_type: str, symbol: str):
+    """API: 按需实时数据（quote / chain），同一股票的并发请求只触发一次上游调用（见 src/server/live.py）"""
+    try:
+        data, state, age = await get_live(data_type, symbol)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except UpstreamError as e:
+        raise HTTPException(status_code=503, detail=f"Upstream unavailable: {e}")
+    return Response(content=json.dumps({'data': data, 'cache': state, 'age': round(age, 1)}),
+                    media_type='application/json', headers={'X-Cache': state})
+
+
+# 历史报告归档（构建时预渲染，见 src/generators/archive.py）
+ARCHIVE_DIR = OUTPUT_DIR / 'archive'
+
+# 归档文件的浏览器 / CDN 缓存时间：首页和目录随每日构建变化，月份页很少变化
+ARCHIVE_INDEX_CACHE = 'public, max-age=300'
+ARCHIVE_PAGE_CACHE = 'public, max-age=3600'
+
+
+def static_file(path: Path, request: Request, cache_control: str) -> Response:
+    """发送预生成的静态文件：客户端接受 gzip 时发送 .gz 预压缩版本，支持 ETag 304；文件不存在时返回 None"""
+    gz = path.with_name(f'{path.name}.gz')
+    media_type = 'application/json' if path.suffix == '.json' else 'text/html; charset=utf-8'
+    headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if 'gzip' in request.headers.get('accept-encoding', '') and gz.exists():
+        path = gz
+        headers['Content-Encoding'] = 'gzip'
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+
+    response = FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
+    etag = response.headers['etag']
+    if etag in request.headers.get('if-none-match', ''):
+        return Response(status_code=304, headers={**headers, 'ETag': etag})
+    return response
 
 
 @app.get("/reports", response_class=HTMLResponse)
-async def list_reports():
-    """列出所有可用报告 - HTML 页面"""
-    reports = get_reports_list()
-
-    # 按日期分组
-    reports_by_date = {}
-    for report in reports:
-        date = report['date']
-        if date not in reports_by_date:
-            reports_by_date[date] = []
-        reports_by_date[date].append(report)
-
-    # 生成 HTML
-    reports_html = ""
-    for date in sorted(reports_by_date.keys(), reverse=True):
-        date_reports = reports_by_date[date]
-        links_html = ""
-        for r in date_reports:
-            links_html += f'<a href="{r["url"]}" class="report-type-link">{r["type_display"]}</a>'
-
-        reports_html += f'''
-        <div class="report-item">
-            <div class="report-date">{date}</div>
-            <div class="report-links">{links_html}</div>
-        </div>
-        '''
+def list_reports(request: Request):
+    """历史报告 - 最新一月（预渲染的静态页面）"""
+    response = static_file(ARCHIVE_DIR / 'index.html', request, ARCHIVE_INDEX_CACHE)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Report archive not built yet")
+    return response
 
-    html = f'''
-    <!DOCTYPE html>
-    <html lang="zh-CN">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>历史报告 - 美股财经日报</title>
-        <link rel="stylesheet" href="/assets/styles.css">
-        <style>
-            .reports-container {{
-                max-width: 800px;
-                margin: 0 auto;
-            }}
-            .report-item {{
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                padding: 16px 20px;
-                background: var(--card-bg);
-                border-radius: 8px;
-                margin-bottom: 12px;
-                box-shadow: 0 1px 3px rgba(0, 0, 0, 0.1);
-            }}
-            .report-item:hover {{
-                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.15);
-            }}
-            .report-date {{
-                font-size: 18px;
-                font-weight: 600;
-                color: var(--text-color);
-            }}
-            .report-links {{
-                display: flex;
-                gap: 12px;
-            }}
-            .report-type-link {{
-                padding: 6px 16px;
-                background: var(--primary-color);
-                color: white;
-                text-decoration: none;
-                border-radius: 20px;
-                font-size: 14px;
-                font-weight: 500;
-                transition: background 0.2s;
-            }}
-            .report-type-link:hover {{
-                background: #1557b0;
-            }}
-            .page-title {{
-                text-align: center;
-                margin-bottom: 32px;
-            }}
-            .page-title h2 {{
-                font-size: 28px;
-                font-weight: 600;
-                margin-bottom: 8px;
-            }}
-            .page-title p {{
-                color: var(--text-secondary);
-            }}
-            .no-reports {{
-                text-align: center;
-                padding: 60px 20px;
-                color: var(--text-secondary);
-            }}
-        </style>
-    </head>
-    <body>
-        <header class="header">
-            <div class="container">
-                <a href="/" class="logo" data-i18n="siteTitle">美股财经日报</a>
-                <div class="header-right">
-                    <nav class="nav">
-                        <a href="/" data-i18n="latestReport">最新报告</a>
-                        <a href="/reports" data-i18n="historyReports">历史报告</a>
-                    </nav>
-                    <div class="lang-toggle" onclick="toggleLanguage()">
-                        <span class="lang-option" data-lang="zh">中</span>
-                        <span class="lang-option" data-lang="en">EN</span>
-                    </div>
-                </div>
-            </div>
-        </header>
-
-        <main class="main">
-            <div class="container">
-                <div class="reports-container">
-                    <div class="page-title">
-                        <h2 data-i18n="historyReportsTitle">历史报告</h2>
-                        <p data-i18n="historyReportsDesc">查看往期财经日报</p>
-                    </div>
-                    {reports_html if reports_html else '<div class="no-reports" data-i18n="noHistoryReports">暂无历史报告</div>'}
-                </div>
-            </div>
-        </main>
-
-        <footer class="footer">
-            <div class="container">
-                <p data-i18n="dataSource">数据来源：Yahoo Finance, Finnhub, Investing.com</p>
-            </div>
-        </footer>
-
-        <script>
-        const translations = {{
-            zh: {{
-                siteTitle: '美股财经日报',
-                latestReport: '最新报告',
-                historyReports: '历史报告',
-                historyReportsTitle: '历史报告',
-                historyReportsDesc: '查看往期财经日报',
-                noHistoryReports: '暂无历史报告',
-                dataSource: '数据来源：Yahoo Finance, Finnhub, Investing.com',
-                dailyReport: '综合日报',
-                premarketReport: '盘前报告',
-                optionsReport: '期权日报'
-            }},
-            en: {{
-                siteTitle: 'US Stock Daily',
-                latestReport: 'Latest',
-                historyReports: 'History',
-                historyReportsTitle: 'Report History',
-                historyReportsDesc: 'View past daily reports',
-                noHistoryReports: 'No reports available',
-                dataSource: 'Data: Yahoo Finance, Finnhub, Investing.com',
-                dailyReport: 'Daily Report',
-                premarketReport: 'Pre-Market',
-                optionsReport: 'Options'
-            }}
-        }};
-
-        function getCurrentLang() {{
-            return localStorage.getItem('lang') || 'zh';
-        }}
-
-        function toggleLanguage() {{
-            const currentLang = getCurrentLang();
-            const newLang = currentLang === 'zh' ? 'en' : 'zh';
-            localStorage.setItem('lang', newLang);
-            applyLanguage(newLang);
-        }}
-
-        function applyLanguage(lang) {{
-            document.querySelectorAll('[data-i18n]').forEach(el => {{
-                const key = el.getAttribute('data-i18n');
-                if (translations[lang][key]) {{
-                    el.textContent = translations[lang][key];
-                }}
-            }});
-
-            document.querySelectorAll('.lang-option').forEach(opt => {{
-                opt.classList.toggle('active', opt.getAttribute('data-lang') === lang);
-            }});
-
-            document.documentElement.lang = lang === 'zh' ? 'zh-CN' : 'en';
-
-            // 翻译报告类型链接
-            document.querySelectorAll('.report-type-link').forEach(link => {{
-                const text = link.textContent.trim();
-                if (lang === 'en') {{
-                    if (text === '综合日报') link.textContent = 'Daily Report';
-                    else if (text === '盘前报告') link.textContent = 'Pre-Market';
-                    else if (text === '期权日报') link.textContent = 'Options';
-                }} else {{
-                    if (text === 'Daily Report') link.textContent = '综合日报';
-                    else if (text === 'Pre-Market') link.textContent = '盘前报告';
-                    else if (text === 'Options') link.textContent = '期权日报';
-                }}
-            }});
-        }}
-
-        document.addEventListener('DOMContentLoaded', () => {{
-            applyLanguage(getCurrentLang());
-        }});
-        </script>
-    </body>
-    </html>
-    '''
 
-    return HTMLResponse(content=html)
+@app.get("/reports/{month}", response_class=HTMLResponse)
+def list_reports_month(month: str, request: Request):
+    """历史报告 - 指定月份（预渲染的静态页面）"""
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid month format. Use YYYY-MM")
+    response = static_file(ARCHIVE_DIR / f'{month}.html', request, ARCHIVE_PAGE_CACHE)
+    if response is None:
+        raise HTTPException(status_code=404, detail=f"No reports for {month}")
+    return response
 
 
 @app.get("/api/reports")
-async def api_reports():
+def api_reports(request: Request):
     """API: 获取报告列表 (JSON)"""
-    return {'reports': get_reports_list()}
+    response = static_file(ARCHIVE_DIR / 'catalog.json', request, ARCHIVE_INDEX_CACHE)
+    if response is None:
+        return {'reports': []}
+    return response
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus 指标：各 worker 的请求/缓存指标 + 流水线累计指标"""
+    content = metrics.render_prometheus(metrics.REGISTRY.snapshot(), *metrics.load_worker_snapshots(),
+                                        metrics.load_state())
+    return PlainTextResponse(content, media_type='text/plain; version=0.0.4')
 
 
 @app.get("/health")
@@ -353,10 +420,15 @@ async def health_check():
     }
 
 
-def start_server(host: str = "0.0.0.0", port: int = 8000):
-    """启动服务器"""
+def start_server(host: str = "0.0.0.0", port: int = 8000, workers: int = None):
+    """启动服务器（workers 默认取 WEB_WORKERS 环境变量；多 worker 时由 uvicorn 管理子进程）"""
     import uvicorn
-    uvicorn.run(app, host=host, port=port)
+    workers = workers or int(os.environ.get(WORKERS_ENV, DEFAULT_WORKERS))
+    metrics.start_instance()
+    if workers > 1:
+        uvicorn.run('src.server.app:app', host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
 
 
 if __name__ == '__main__':
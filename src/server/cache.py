@@ -0,0 +1,120 @@
+"""按需上游数据的异步缓存 - 单飞合并 + 按数据类型的 TTL + stale-while-revalidate
+
+同一 (数据类型, 键) 同时只有一个上游请求在执行，并发的请求共享它的结果（single-flight）。
+缓存条目按数据类型的策略分三段：
+- 新鲜期（ttl）内直接返回
+- 过期但在 stale 窗口（ttl + stale_ttl）内：立即返回旧值，同时在后台刷新一次
+- 超出 stale 窗口或没有缓存：等待上游请求（仍然合并）
+
+上游失败时沿用 stale 窗口内的旧值；error_ttl 内不再为同一个键重试，
+因此无论访问量多大，每个 worker 对每个键的上游请求频率都有上限。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from src.utils import metrics
+
+# 缓存条目上限（按最近使用淘汰）
+DEFAULT_MAX_ENTRIES = 1024
+
+# 上游失败后同一个键的默认重试间隔（秒）
+DEFAULT_ERROR_TTL = 30
+
+
+class CachePolicy:
+    """某种数据的缓存策略（秒）：新鲜期、之后可返回旧值的时长、失败后的重试间隔"""
+
+    def __init__(self, ttl: float, stale_ttl: float, error_ttl: float = DEFAULT_ERROR_TTL):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.error_ttl = error_ttl
+
+
+class CacheEntry:
+    __slots__ = ('value', 'loaded_at', 'failed_at', 'error')
+
+    def __init__(self):
+        self.value = None
+        self.loaded_at = None
+        self.failed_at = None
+        self.error = None
+
+
+class UpstreamError(Exception):
+    """上游请求失败且没有可用的旧值"""
+
+
+class AsyncCache:
+    """在事件循环内使用；loader 为返回协程的无参函数（阻塞调用用 asyncio.to_thread 包装）"""
+
+    def __init__(self, name: str, policies: dict, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.name = name
+        self.policies = policies
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    def _entry(self, key: tuple) -> CacheEntry:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = CacheEntry()
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                if oldest in self._inflight:
+                    break
+                del self._entries[oldest]
+        self._entries.move_to_end(key)
+        return entry
+
+    async def _load(self, key: tuple, entry: CacheEntry, loader):
+        try:
+            entry.value = await loader()
+            entry.loaded_at = time.monotonic()
+            entry.failed_at = entry.error = None
+        except Exception as e:
+            entry.failed_at = time.monotonic()
+            entry.error = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def _refresh(self, key: tuple, entry: CacheEntry, loader) -> asyncio.Task:
+        """启动（或复用进行中的）上游请求"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.create_task(self._load(key, entry, loader))
+            # 后台刷新没有等待方时，失败只记录在条目上
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def get(self, data_type: str, key: str, loader) -> tuple:
+        """返回 (值, 状态, 缓存时长秒)；状态为 fresh / stale / miss"""
+        policy = self.policies[data_type]
+        cache_key = (data_type, key)
+        entry = self._entry(cache_key)
+        now = time.monotonic()
+        age = now - entry.loaded_at if entry.loaded_at is not None else None
+        recently_failed = entry.failed_at is not None and now - entry.failed_at < policy.error_ttl
+
+        if age is not None and age < policy.ttl:
+            metrics.cache_result(self.name, True)
+            return entry.value, 'fresh', age
+        if age is not None and age < policy.ttl + policy.stale_ttl:
+            metrics.cache_result(self.name, True)
+            if not recently_failed:
+                self._refresh(cache_key, entry, loader)
+            return entry.value, 'stale', age
+
+        metrics.cache_result(self.name, False)
+        if recently_failed and cache_key not in self._inflight:
+            raise UpstreamError(entry.error)
+        try:
+            # shield：单个请求被取消（客户端断开）不影响其他等待方
+            await asyncio.shield(self._refresh(cache_key, entry, loader))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            raise UpstreamError(entry.error or str(e)) from e
+        return entry.value, 'miss', 0.0
@@ -0,0 +1,183 @@
+"""按需实时数据 - 经由 AsyncCache 访问上游（yfinance）
+
+只为股票池（config/universe.json）中的股票提供，避免任意代码绕过缓存打到上游。
+上游调用沿用抓取框架的超时和熔断，在线程池中执行；yfinance 在第一次请求实时数据时才导入，
+不影响 Web 服务启动。
+
+每个 worker 的所有实时请求共用一个 yfinance 熔断器，失败计数有变化时写回 source_health.json，
+与抓取任务和其他 worker 共享；抓取任务打开的熔断在下一次请求时同样生效。
+
+超时的上游调用无法取消：call_with_deadline 的线程会一直运行到 yfinance 返回。
+这类调用在真正结束前仍占用名额，同时进行中的调用超过 MAX_PENDING_CALLS 时直接拒绝新请求，
+上游卡死时每个 worker 残留的后台线程因此有上限。
+"""
+
+import asyncio
+import threading
+from datetime import datetime
+
+from src.scrapers.base import CircuitBreaker, DeadlineExceeded, Scraper, ScraperError
+from src.server.cache import AsyncCache, CachePolicy
+from src.utils.universe import get_universe
+
+# 单次上游调用超时（秒）：用户在等待，比抓取任务短
+CALL_TIMEOUT = 8
+
+# 期权链摘要中按成交量列出的合约数
+TOP_CONTRACTS = 5
+
+# 每个 worker 同时进行中的上游调用上限（包括已超时、仍在后台线程中运行的调用）
+MAX_PENDING_CALLS = 8
+
+# 各数据类型的缓存策略：行情 15 秒新鲜、2 分钟内可先返回旧值；期权链变化慢
+POLICIES = {
+    'quote': CachePolicy(ttl=15, stale_ttl=120),
+    'chain': CachePolicy(ttl=120, stale_ttl=600, error_ttl=60),
+}
+
+
+class UpstreamBusy(ScraperError):
+    """进行中的上游调用已达上限（上游响应过慢）"""
+
+
+# 本 worker 共用的 yfinance 熔断器
+breaker = CircuitBreaker('yfinance')
+
+_pending_calls = threading.BoundedSemaphore(MAX_PENDING_CALLS)
+
+
+def make_scraper() -> Scraper:
+    """单次请求的抓取任务，熔断器换成本 worker 共用的 breaker
+
+    Scraper 创建时从 source_health.json 读到的状态若熔断更晚结束（抓取任务或其他 worker 打开），以它为准。
+    """
+    scraper = Scraper('live', source='yfinance', call_timeout=CALL_TIMEOUT, retries=0)
+    persisted = scraper.breaker
+    with breaker._lock:
+        if persisted.opened_until > breaker.opened_until:
+            breaker.failures = max(breaker.failures, persisted.failures)
+            breaker.opened_until = persisted.opened_until
+            breaker.last_error = persisted.last_error
+    scraper.breaker = breaker
+    return scraper
+
+
+def upstream(scraper: Scraper, op: str, fn):
+    """经由共享熔断器执行一次上游调用 fn()，op 为指标中的操作名
+
+    名额在 fn 真正返回时才释放：超时后后台线程仍在运行，名额随之保留。
+    """
+    if not _pending_calls.acquire(blocking=False):
+        raise UpstreamBusy(f"{MAX_PENDING_CALLS} yfinance calls still pending")
+    released = threading.Event()
+
+    def release():
+        if not released.is_set():
+            released.set()
+            _pending_calls.release()
+
+    def run():
+        try:
+            return fn()
+        finally:
+            release()
+
+    run.__name__ = op
+    failures = breaker.failures
+    try:
+        return scraper.call(run)
+    except DeadlineExceeded:
+        raise
+    except Exception:
+        # 熔断中未发起调用时名额由这里释放
+        release()
+        raise
+    finally:
+        if breaker.failures != failures:
+            breaker.save()
+
+
+def fetch_quote(symbol: str) -> dict:
+    """最新价格（Ticker.fast_info）"""
+    import yfinance as yf
+
+    scraper = make_scraper()
+    with scraper.track(symbol):
+        info = upstream(scraper, 'fast_info', lambda: dict(yf.Ticker(symbol).fast_info))
+    price, prev_close = info.get('lastPrice'), info.get('previousClose')
+    change = price - prev_close if price is not None and prev_close else None
+    return {
+        'symbol': symbol,
+        'price': price,
+        'prev_close': prev_close,
+        'change': round(change, 4) if change is not None else None,
+        'change_pct': round(change / prev_close * 100, 2) if change is not None else None,
+        'day_high': info.get('dayHigh'),
+        'day_low': info.get('dayLow'),
+        'volume': info.get('lastVolume'),
+        'fetched_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def _top_contracts(frame) -> list:
+    if frame is None or frame.empty:
+        return []
+    frame = frame.dropna(subset=['volume']).sort_values('volume', ascending=False).head(TOP_CONTRACTS)
+    return [
+        {'strike': float(row.strike), 'last': float(row.lastPrice), 'volume': int(row.volume),
+         'open_interest': int(row.openInterest) if row.openInterest == row.openInterest else 0,
+         'iv': round(float(row.impliedVolatility), 4)}
+        for row in frame.itertuples()
+    ]
+
+
+def fetch_chain(symbol: str) -> dict:
+    """最近到期日的期权链摘要：Call / Put 成交量、未平仓量和成交最活跃的合约"""
+    import yfinance as yf
+
+    scraper = make_scraper()
+    ticker = yf.Ticker(symbol)
+    with scraper.track(symbol):
+        expirations = upstream(scraper, 'options', lambda: ticker.options)
+        if not expirations:
+            return {'symbol': symbol, 'expiry': None}
+        chain = upstream(scraper, 'option_chain', lambda: ticker.option_chain(expirations[0]))
+    calls, puts = chain.calls, chain.puts
+    call_volume = int(calls['volume'].fillna(0).sum())
+    put_volume = int(puts['volume'].fillna(0).sum())
+    return {
+        'symbol': symbol,
+        'expiry': expirations[0],
+        'call_volume': call_volume,
+        'put_volume': put_volume,
+        'pc_ratio': round(put_volume / call_volume, 2) if call_volume else None,
+        'call_open_interest': int(calls['openInterest'].fillna(0).sum()),
+        'put_open_interest': int(puts['openInterest'].fillna(0).sum()),
+        'top_calls': _top_contracts(calls),
+        'top_puts': _top_contracts(puts),
+        'fetched_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+LOADERS = {
+    'quote': fetch_quote,
+    'chain': fetch_chain,
+}
+
+live_cache = AsyncCache('live', POLICIES)
+
+
+def known_symbols() -> set:
+    universe = get_universe()
+    return {symbol for section in universe.sections for symbol in universe.symbols(section)}
+
+
+async def get_live(data_type: str, symbol: str) -> tuple:
+    """返回 (数据, 缓存状态, 缓存时长秒)；未知数据类型或股票抛出 KeyError"""
+    if data_type not in LOADERS:
+        raise KeyError(f"unknown data type: {data_type}")
+    symbol = get_universe().normalize(symbol)
+    if symbol not in known_symbols():
+        raise KeyError(f"symbol not in universe: {symbol}")
+    fetch = LOADERS[data_type]
+    return await live_cache.get(data_type, symbol, lambda: asyncio.to_thread(fetch, symbol))
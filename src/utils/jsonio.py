@@ -0,0 +1,111 @@
+"""JSON 读写模块 - orjson 快速路径 + 标准库回退
+
+所有 data/ 文件统一经由这里读写：
+- 默认输出紧凑 JSON（无缩进）
+- 写入先落到同目录临时文件，fsync 后 rename，读方永远看不到写了一半的文件
+- JSON Lines 文件支持追加写入和逐行流式读取（如不断增长的新闻日志）
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时回退到标准库
+    orjson = None
+
+
+def _default(obj):
+    """序列化 numpy / pandas 标量等非标准类型"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """序列化为 UTF-8 字节串"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    if indent:
+        text = json.dumps(obj, ensure_ascii=False, indent=2, default=_default)
+    else:
+        text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=_default)
+    return text.encode('utf-8')
+
+
+def loads(data):
+    """反序列化字节串或字符串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def atomic_write(path, data: bytes):
+    """原子写入：临时文件 + fsync + rename"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def read_json(path, default=None):
+    """读取 JSON 文件，文件不存在时返回 default（默认空字典）"""
+    path = Path(path)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return {} if default is None else default
+    return loads(data)
+
+
+def write_json(path, obj, indent: bool = False):
+    """原子写入 JSON 文件"""
+    atomic_write(path, dumps(obj, indent=indent))
+
+
+def append_jsonl(path, records: list):
+    """向 JSON Lines 文件追加记录（每行一条）"""
+    if not records:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = b''.join(dumps(record) + b'\n' for record in records)
+    with open(path, 'ab') as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def iter_jsonl(path):
+    """逐行流式读取 JSON Lines 文件，跳过空行和未写完的尾行"""
+    path = Path(path)
+    if not path.exists():
+        return
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield loads(line)
+            except ValueError:
+                continue
@@ -0,0 +1,414 @@
+"""计时与指标模块 - 结构化 span、Prometheus 指标、每次运行的耗时报告
+
+- span(stage, **labels)：记录一段代码的耗时（直方图）和异常（计数）
+- upstream_span(source, op, symbol)：记录一次上游调用（symbol 只进 span 明细，不做标签）
+- cache_result(cache, hit)：记录缓存命中/未命中
+- render_prometheus()：按 Prometheus 文本格式输出
+
+Web 服务以多个 worker 运行时，各 worker 定期把自己的指标快照写到
+data/metrics_workers/<实例 ID>-<pid>.json，/metrics 合并本次启动的所有存活 worker
+的快照输出。实例 ID 在服务启动时生成（data/ 是持久卷，上一个容器留下的快照可能与
+当前进程 PID 重复，只按 PID 判断存活并不可靠）。
+
+抓取、分析、构建各自在独立进程中运行。调用 start_run() 的进程退出时：
+- 把本进程的计数和直方图累加到 data/metrics_state.json（Web 服务的 /metrics 一并输出）
+- 把 span 明细追加到 data/timings/<run_id>.jsonl
+run_id 通过环境变量传给子进程；最先开始运行的进程（如 daily_job）退出时
+汇总本次运行的全部 span，写入 data/timings/<run_id>.json 和 data/timing_report.json。
+"""
+
+import atexit
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from src.utils.jsonio import append_jsonl, iter_jsonl, read_json, write_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+DATA_DIR = BASE_DIR / 'data'
+STATE_FILE = DATA_DIR / 'metrics_state.json'
+TIMINGS_DIR = DATA_DIR / 'timings'
+REPORT_FILE = DATA_DIR / 'timing_report.json'
+WORKERS_DIR = DATA_DIR / 'metrics_workers'
+
+# 子进程继承的运行 ID
+RUN_ID_ENV = 'PIPELINE_RUN_ID'
+
+# Web 服务 worker 继承的实例 ID
+INSTANCE_ENV = 'METRICS_INSTANCE_ID'
+
+# 直方图分桶（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# 保留的运行报告数量
+RUNS_TO_KEEP = 30
+
+METRIC_HELP = {
+    'pipeline_stage_seconds': ('histogram', 'Duration of pipeline stages'),
+    'pipeline_stage_errors_total': ('counter', 'Pipeline stages that raised'),
+    'upstream_call_seconds': ('histogram', 'Duration of upstream API calls'),
+    'upstream_calls_total': ('counter', 'Upstream API calls'),
+    'upstream_errors_total': ('counter', 'Failed upstream API calls'),
+    'cache_requests_total': ('counter', 'Cache lookups by result'),
+    'http_request_seconds': ('histogram', 'HTTP request latency'),
+}
+
+
+def _key(name: str, labels: dict) -> str:
+    return json.dumps([name, sorted(labels.items())], separators=(',', ':'))
+
+
+def _parse_key(key: str) -> tuple:
+    name, labels = json.loads(key)
+    return name, dict(labels)
+
+
+class Registry:
+    """进程内指标注册表（计数器 + 直方图）"""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, labels: dict, value: float = 1):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, labels: dict, value: float):
+        key = _key(name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    hist['buckets'][i] += 1
+                    break
+            hist['sum'] += value
+            hist['count'] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'histograms': {k: {**v, 'buckets': list(v['buckets'])} for k, v in self.histograms.items()},
+            }
+
+    def clear(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+REGISTRY = Registry()
+
+# 本进程记录的 span 明细
+_spans = []
+_spans_lock = threading.Lock()
+
+# 当前运行信息（start_run 后设置）
+_run = {}
+
+
+def _record_span(stage: str, labels: dict, start: float, duration: float, ok: bool):
+    if not _run:
+        return
+    with _spans_lock:
+        _spans.append({
+            'stage': stage,
+            **labels,
+            'process': _run['process'],
+            'start': round(start, 3),
+            'duration': round(duration, 4),
+            'ok': ok,
+        })
+
+
+@contextmanager
+def span(stage: str, **labels):
+    """记录一个流水线阶段的耗时"""
+    start = time.time()
+    t0 = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        REGISTRY.inc('pipeline_stage_errors_total', {'stage': stage, **labels})
+        raise
+    finally:
+        duration = time.perf_counter() - t0
+        REGISTRY.observe('pipeline_stage_seconds', {'stage': stage, **labels}, duration)
+        _record_span(stage, labels, start, duration, ok)
+
+
+@contextmanager
+def upstream_span(source: str, op: str, symbol: str = None):
+    """记录一次上游调用"""
+    start = time.time()
+    t0 = time.perf_counter()
+    labels = {'source': source, 'op': op}
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        REGISTRY.inc('upstream_errors_total', labels)
+        raise
+    finally:
+        duration = time.perf_counter() - t0
+        REGISTRY.inc('upstream_calls_total', labels)
+        REGISTRY.observe('upstream_call_seconds', labels, duration)
+        extra = {'symbol': symbol} if symbol else {}
+        _record_span('upstream', {**labels, **extra}, start, duration, ok)
+
+
+def cache_result(cache: str, hit: bool, count: int = 1):
+    """记录缓存命中/未命中"""
+    if count:
+        REGISTRY.inc('cache_requests_total', {'cache': cache, 'result': 'hit' if hit else 'miss'}, count)
+
+
+class StageTimer:
+    """顺序执行的多个阶段计时：lap(name) 结束上一阶段并开始新阶段"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self._section = None
+        self._start = None
+        self._t0 = None
+
+    def lap(self, section: str = None):
+        now = time.perf_counter()
+        if self._section is not None:
+            duration = now - self._t0
+            labels = {'stage': self.stage, 'section': self._section}
+            REGISTRY.observe('pipeline_stage_seconds', labels, duration)
+            _record_span(self.stage, {'section': self._section}, self._start, duration, True)
+        self._section = section
+        self._start = time.time()
+        self._t0 = now
+
+    def done(self):
+        self.lap(None)
+
+
+# ===== 跨进程汇总 =====
+
+def _merge_state(snapshot: dict):
+    """把本进程的指标累加到共享状态文件（文件锁保护）"""
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_FILE.with_suffix('.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        state = read_json(STATE_FILE)
+        counters = state.setdefault('counters', {})
+        histograms = state.setdefault('histograms', {})
+        for key, value in snapshot['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, hist in snapshot['histograms'].items():
+            merged = histograms.get(key)
+            if merged is None or len(merged['buckets']) != len(BUCKETS):
+                histograms[key] = hist
+                continue
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], hist['buckets'])]
+            merged['sum'] += hist['sum']
+            merged['count'] += hist['count']
+        state['updated_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        write_json(STATE_FILE, state)
+
+
+def load_state() -> dict:
+    """读取流水线累计指标"""
+    return read_json(STATE_FILE)
+
+
+def start_instance() -> str:
+    """Web 服务启动时调用（在创建 worker 之前）：清空以前留下的快照并生成新的实例 ID"""
+    shutil.rmtree(WORKERS_DIR, ignore_errors=True)
+    instance = os.environ[INSTANCE_ENV] = uuid.uuid4().hex[:12]
+    return instance
+
+
+def _instance() -> str:
+    return os.environ.get(INSTANCE_ENV, 'default')
+
+
+def save_worker_snapshot():
+    """写入本 worker 的指标快照（供其他 worker 的 /metrics 合并）"""
+    write_json(WORKERS_DIR / f'{_instance()}-{os.getpid()}.json', REGISTRY.snapshot())
+
+
+def load_worker_snapshots() -> list:
+    """读取本实例其他存活 worker 的指标快照（其他实例和已退出 worker 的文件顺带清理）"""
+    snapshots = []
+    instance = _instance()
+    for path in WORKERS_DIR.glob('*.json'):
+        owner, _, pid = path.stem.rpartition('-')
+        if owner != instance or not pid.isdigit():
+            path.unlink(missing_ok=True)
+            continue
+        pid = int(pid)
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            path.unlink(missing_ok=True)
+            continue
+        except PermissionError:
+            pass
+        try:
+            snapshots.append(read_json(path))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def start_run(process: str) -> str:
+    """开始记录本进程的 span；进程退出时写入汇总。返回运行 ID"""
+    if _run:
+        return _run['id']
+    run_id = os.environ.get(RUN_ID_ENV)
+    owner = run_id is None
+    if owner:
+        run_id = datetime.now().strftime('%Y%m%dT%H%M%S') + f'-{os.getpid()}'
+        os.environ[RUN_ID_ENV] = run_id
+    _run.update({'id': run_id, 'process': process, 'owner': owner, 'started': time.time()})
+    atexit.register(flush)
+    return run_id
+
+
+def flush():
+    """写入本进程的指标与 span；运行发起者同时生成本次运行的耗时报告"""
+    if not _run:
+        return
+    snapshot = REGISTRY.snapshot()
+    REGISTRY.clear()
+    with _spans_lock:
+        spans = list(_spans)
+        _spans.clear()
+
+    try:
+        _merge_state(snapshot)
+        append_jsonl(TIMINGS_DIR / f"{_run['id']}.jsonl", spans)
+        if _run['owner']:
+            write_report(_run['id'], _run['started'])
+    except OSError as e:
+        print(f"Failed to write metrics: {e}")
+
+
+def summarize_spans(spans: list) -> dict:
+    """把 span 明细汇总为按阶段 / 上游的耗时统计"""
+    stages = {}
+    upstream = {}
+    for s in spans:
+        if s['stage'] == 'upstream':
+            key = f"{s.get('source')}.{s.get('op')}"
+            item = upstream.setdefault(key, {'calls': 0, 'errors': 0, 'total': 0.0, 'max': 0.0, 'slowest': None})
+            item['calls'] += 1
+            item['errors'] += 0 if s['ok'] else 1
+            item['total'] += s['duration']
+            if s['duration'] >= item['max']:
+                item['max'] = s['duration']
+                item['slowest'] = s.get('symbol')
+            continue
+        label = ','.join(f"{k}={v}" for k, v in s.items()
+                         if k not in ('stage', 'process', 'start', 'duration', 'ok'))
+        key = f"{s['stage']}[{label}]" if label else s['stage']
+        item = stages.setdefault(key, {'count': 0, 'errors': 0, 'total': 0.0, 'max': 0.0, 'process': s['process']})
+        item['count'] += 1
+        item['errors'] += 0 if s['ok'] else 1
+        item['total'] += s['duration']
+        item['max'] = max(item['max'], s['duration'])
+
+    for item in list(stages.values()) + list(upstream.values()):
+        item['total'] = round(item['total'], 3)
+        item['max'] = round(item['max'], 3)
+    return {
+        'stages': dict(sorted(stages.items(), key=lambda kv: -kv[1]['total'])),
+        'upstream': dict(sorted(upstream.items(), key=lambda kv: -kv[1]['total'])),
+    }
+
+
+def write_report(run_id: str, started: float):
+    """汇总一次运行的全部 span，写入耗时报告"""
+    spans_file = TIMINGS_DIR / f'{run_id}.jsonl'
+    spans = list(iter_jsonl(spans_file))
+    report = {
+        'run_id': run_id,
+        'started_at': datetime.fromtimestamp(started).strftime('%Y-%m-%d %H:%M:%S'),
+        'duration': round(time.time() - started, 3),
+        'span_count': len(spans),
+        **summarize_spans(spans),
+    }
+    write_json(TIMINGS_DIR / f'{run_id}.json', report, indent=True)
+    write_json(REPORT_FILE, report, indent=True)
+    spans_file.unlink(missing_ok=True)
+
+    reports = sorted(TIMINGS_DIR.glob('*.json'))
+    for old in reports[:-RUNS_TO_KEEP]:
+        old.unlink(missing_ok=True)
+
+
+# ===== Prometheus 输出 =====
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + '}'
+
+
+def render_prometheus(*snapshots: dict) -> str:
+    """把若干指标快照合并输出为 Prometheus 文本格式"""
+    counters = {}
+    histograms = {}
+    for snap in snapshots:
+        for key, value in snap.get('counters', {}).items():
+            counters[key] = counters.get(key, 0) + value
+        for key, hist in snap.get('histograms', {}).items():
+            if len(hist['buckets']) != len(BUCKETS):
+                continue
+            merged = histograms.setdefault(key, {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0})
+            merged['buckets'] = [a + b for a, b in zip(merged['buckets'], hist['buckets'])]
+            merged['sum'] += hist['sum']
+            merged['count'] += hist['count']
+
+    by_name = {}
+    for key, value in counters.items():
+        name, labels = _parse_key(key)
+        by_name.setdefault(name, []).append((labels, value))
+    for key, hist in histograms.items():
+        name, labels = _parse_key(key)
+        by_name.setdefault(name, []).append((labels, hist))
+
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text = METRIC_HELP.get(name, ('counter', name))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in by_name[name]:
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, value['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels({**labels, "le": bound})} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels({**labels, "le": "+Inf"})} {value["count"]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {round(value["sum"], 6)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
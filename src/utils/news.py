@@ -0,0 +1,9 @@
+"""新闻数据的公共解析 - 抓取、分析、索引各层共用"""
+
+
+def related_symbols(news: dict) -> list:
+    """解析新闻的相关股票（Finnhub 返回逗号分隔的字符串）"""
+    related = news.get('related') or ''
+    if isinstance(related, list):
+        return [s for s in related if s]
+    return [s.strip() for s in related.split(',') if s.strip()]
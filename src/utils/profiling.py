@@ -0,0 +1,236 @@
+"""性能剖析模块 - 按阶段采集 cProfile、采样火焰图和导入耗时
+
+每个阶段在当前进程内运行（runpy 执行模块的 __main__，等价于 python -m），输出到
+profiles/<运行 ID>/：
+- <阶段>.prof：cProfile 统计（pstats / snakeviz 可读）
+- <阶段>.folded：采样得到的折叠调用栈（flamegraph.pl / speedscope 可读）
+
+上游调用在超时守护线程中执行，新闻分析在线程池中执行，因此两者都覆盖所有线程：
+采样器每次采集全部线程的调用栈（按线程名分组），阶段内启动的线程各自挂上
+cProfile（threading.setprofile），结束时与主线程的统计合并。
+- <阶段>.imports.folded：python -X importtime 的导入耗时（单位微秒，同为折叠格式）
+- summary.txt：各阶段耗时与 cProfile 累计耗时前几名
+"""
+
+import cProfile
+import io
+import pstats
+import re
+import runpy
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+PROFILES_DIR = BASE_DIR / 'profiles'
+
+# 采样间隔（秒）
+SAMPLE_INTERVAL = 0.005
+
+# summary.txt 中每个阶段列出的函数数量
+TOP_FUNCTIONS = 15
+
+
+class StackSampler:
+    """定时采样所有线程（采样线程自身除外）的调用栈，汇总为折叠格式（"a;b;c 次数"）
+
+    栈的根为线程名（去掉编号，同类线程合并为一组），主线程阻塞在 join / wait 上时
+    也照常计入，因此各组的采样数即为墙钟时间的分布。
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    @staticmethod
+    def _thread_label(thread) -> str:
+        name = thread.name if thread is not None else 'unknown'
+        return re.sub(r'[-_]\d+', '', name).replace(';', ',')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            threads = {t.ident: t for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self._thread.ident:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                names.append(f"[{self._thread_label(threads.get(thread_id))}]")
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path: Path):
+        path.write_text(''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common()),
+                        encoding='utf-8')
+
+
+class ThreadProfiles:
+    """为阶段内新启动的线程各挂一个 cProfile，结束时合并到主线程的统计
+
+    Python 3.12 起 cProfile 基于 sys.monitoring，一个 Profile 即覆盖所有线程，
+    且不允许同时启用多个，此时不再单独挂线程剖析器。
+    """
+
+    def __init__(self):
+        self.profiles = []
+        self._lock = threading.Lock()
+        self.enabled = sys.version_info < (3, 12)
+
+    def _start(self, frame, event, arg):
+        # 线程的第一个剖析事件：换成本线程自己的 cProfile
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        profile.enable()
+
+    def __enter__(self):
+        if self.enabled:
+            threading.setprofile(self._start)
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            threading.setprofile(None)
+
+    def merge_into(self, stats: pstats.Stats):
+        with self._lock:
+            profiles = list(self.profiles)
+        for profile in profiles:
+            stats.add(profile)
+
+
+def import_times(module: str) -> list:
+    """在新的解释器中用 python -X importtime 导入模块
+
+    返回 [(深度, 模块名, 自身耗时微秒, 累计耗时微秒)]，顺序同 importtime 输出（子模块在前）。
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BASE_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise ImportError(f"import {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        # 格式：import time: self [us] | cumulative | 缩进的模块名
+        self_us, cumulative_us, name = line.split(':', 1)[1].split('|')
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def import_profile(module: str, path: Path) -> float:
+    """测量导入模块的耗时，写出折叠格式，返回该模块的累计导入耗时（秒）
+
+    折叠文件中也保留解释器启动时的导入（site、encodings 等），便于对比。
+    """
+    # importtime 先输出子模块再输出父模块，反转后即为先序遍历
+    stack = []
+    lines = []
+    total = 0
+    for depth, name, self_us, cumulative_us in reversed(import_times(module)):
+        stack = stack[:depth] + [name]
+        lines.append(f"{';'.join(stack)} {self_us}\n")
+        if depth == 0 and name == module:
+            total = cumulative_us
+    path.write_text(''.join(lines), encoding='utf-8')
+    return total / 1e6
+
+
+class Profiler:
+    """一次剖析运行：各阶段的结果写入同一目录"""
+
+    def __init__(self, name: str):
+        self.run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{name}"
+        self.output_dir = PROFILES_DIR / self.run_id
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.stages = []
+
+    def profile_imports(self, module: str) -> float:
+        """测量模块导入耗时，写出 <模块>.imports.folded，返回秒数"""
+        return import_profile(module, self.output_dir / f'{module}.imports.folded')
+
+    def profile(self, stage: str, fn, *args, imports: float = None, **kwargs):
+        """在 cProfile + 采样器下运行 fn，返回 (结果, 异常)；imports 为该阶段的导入耗时（记入汇总）"""
+        profiler = cProfile.Profile()
+        sampler = StackSampler()
+        threads = ThreadProfiles()
+        result, error = None, None
+        start = time.perf_counter()
+        with sampler, threads:
+            profiler.enable()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+
+        # 主线程和各工作线程的统计合并为一份
+        stats = pstats.Stats(profiler)
+        threads.merge_into(stats)
+        safe_name = stage.replace('/', '_')
+        stats.dump_stats(self.output_dir / f'{safe_name}.prof')
+        sampler.write(self.output_dir / f'{safe_name}.folded')
+
+        buffer = io.StringIO()
+        stats.stream = buffer
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        self.stages.append({'stage': stage, 'duration': duration, 'imports': imports, 'stats': buffer.getvalue()})
+        return result, error
+
+    def run_module(self, module: str, args: list = ()) -> subprocess.CompletedProcess:
+        """在当前进程内以 __main__ 方式运行模块（等价于 python -m module args），
+        同时测量该模块的导入耗时。返回值与 subprocess.run 相同，便于替换子进程调用。"""
+        import_seconds = self.profile_imports(module)
+
+        saved_argv = sys.argv
+        sys.argv = [module, *args]
+        try:
+            _, error = self.profile(module, runpy.run_module, module, imports=import_seconds,
+                                    run_name='__main__', alter_sys=True)
+        finally:
+            sys.argv = saved_argv
+
+        returncode, stderr = 0, ''
+        if isinstance(error, SystemExit):
+            code = error.code
+            returncode = code if isinstance(code, int) else (0 if code is None else 1)
+        elif error is not None:
+            returncode = 1
+            stderr = ''.join(traceback.format_exception(error))
+        return subprocess.CompletedProcess([module, *args], returncode, '', stderr)
+
+    def write_summary(self) -> Path:
+        """写出各阶段耗时汇总"""
+        lines = [f"Profile run {self.run_id}\n\n"]
+        for s in self.stages:
+            imports = f", imports {s['imports']:.3f}s" if s['imports'] is not None else ''
+            lines.append(f"{s['stage']:<40} {s['duration']:8.3f}s{imports}\n")
+        for s in self.stages:
+            lines.append(f"\n===== {s['stage']} =====\n{s['stats']}")
+        path = self.output_dir / 'summary.txt'
+        path.write_text(''.join(lines), encoding='utf-8')
+        return path
@@ -0,0 +1,198 @@
+"""盘中时间序列 - 内存映射文件上的定长环形缓冲区
+
+每只股票的每个指标一个文件：data/series/<指标>/<股票>.ring，保存最近 capacity 个
+(时间戳, 数值)。抓取进程追加（O(1)，只写一个槽位和计数），Web 服务以只读方式
+mmap 同一文件，直接从共享的页缓存读取最近 N 个点，不经过 JSON 序列化和解析。
+
+文件布局（本机字节序）：
+- 头部 32 字节：magic(8) | version(u32) | capacity(u32) | seq(u64) | count(u64)
+- 之后 capacity 个槽位，每个为两个 float64：(时间戳, 数值)
+
+count 为累计写入的点数，最新点在槽位 (count - 1) % capacity。写入按 seqlock 协议：
+先把 seq 加一（奇数表示写入中），写槽位和 count，再把 seq 加一；读方读到奇数或
+前后 seq 不一致时重读，因此读方不加锁也不会读到写了一半的点。多个写入进程之间用
+flock 互斥。只依赖标准库，Web 服务可以直接使用。
+"""
+
+import fcntl
+import mmap
+import os
+import re
+import struct
+from contextlib import contextmanager
+from pathlib import Path
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+SERIES_DIR = BASE_DIR / 'data' / 'series'
+
+# 支持的指标：price / volume 来自行情轮询，option_volume / pc_ratio 来自期权抓取
+METRICS = ('price', 'volume', 'option_volume', 'pc_ratio')
+
+# 每个序列保留的点数（1 分钟一个点约一天半）
+DEFAULT_CAPACITY = 2048
+
+# 文件头
+MAGIC = b'FINRING1'
+VERSION = 1
+HEADER = struct.Struct('=8sIIQQ')
+HEADER_SIZE = HEADER.size
+
+# 每个槽位的 float64 个数（时间戳, 数值）
+SLOT_FIELDS = 2
+
+# 读方遇到并发写入时的最大重读次数
+READ_RETRIES = 100
+
+# 股票代码中允许的字符（用作文件名）
+SYMBOL_PATTERN = re.compile(r'^[A-Za-z0-9^=._-]{1,32}$')
+
+
+def series_path(metric: str, symbol: str) -> Path:
+    if metric not in METRICS:
+        raise ValueError(f"unknown metric: {metric}")
+    if not SYMBOL_PATTERN.match(symbol):
+        raise ValueError(f"invalid symbol: {symbol}")
+    return SERIES_DIR / metric / f'{symbol}.ring'
+
+
+def create_series(path: Path, capacity: int = DEFAULT_CAPACITY):
+    """创建空序列文件（写好文件头后硬链接到目标路径，读方不会看到不完整的文件头）"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, capacity, 0, 0))
+        f.truncate(HEADER_SIZE + capacity * SLOT_FIELDS * 8)
+    try:
+        # 已被其他写入进程创建时保留对方的文件
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        tmp.unlink()
+
+
+class RingSeries:
+    """一个序列文件的映射视图（writable=False 时只读）"""
+
+    def __init__(self, path: Path, writable: bool = False, capacity: int = DEFAULT_CAPACITY):
+        self.path = Path(path)
+        if writable and not self.path.exists():
+            create_series(self.path, capacity)
+        self._file = open(self.path, 'r+b' if writable else 'rb')
+        self.inode = os.fstat(self._file.fileno()).st_ino
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, self.capacity, _, _ = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"not a ring series file: {self.path}")
+        # seq / count 与各槽位直接映射为数组（不复制）
+        self._view = memoryview(self._map)
+        self._control = self._view[16:HEADER_SIZE].cast('Q')
+        self._slots = self._view[HEADER_SIZE:].cast('d')
+
+    def __len__(self) -> int:
+        return min(self._control[1], self.capacity)
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+
+    def append(self, ts: float, value: float) -> bool:
+        """追加一个点；时间戳与最新点相同时覆盖最新点，更早的点忽略（返回 False）"""
+        control, slots, capacity = self._control, self._slots, self.capacity
+        with self._locked():
+            count = control[1]
+            index, new_count = count % capacity, count + 1
+            if count:
+                last = (count - 1) % capacity
+                last_ts = slots[last * SLOT_FIELDS]
+                if ts < last_ts:
+                    return False
+                if ts == last_ts:
+                    index, new_count = last, count
+            seq = control[0]
+            control[0] = seq + 1
+            slots[index * SLOT_FIELDS] = ts
+            slots[index * SLOT_FIELDS + 1] = value
+            control[1] = new_count
+            control[0] = seq + 2
+        return True
+
+    def extend(self, points) -> int:
+        """按时间顺序追加多个点，返回写入（含覆盖）的点数"""
+        return sum(self.append(ts, value) for ts, value in points)
+
+    def latest(self, n: int = None) -> list:
+        """最近 n 个点 [(时间戳, 数值)]，时间升序"""
+        control, slots, capacity = self._control, self._slots, self.capacity
+        for _ in range(READ_RETRIES):
+            seq = control[0]
+            if seq % 2:
+                continue
+            count = control[1]
+            size = min(count, capacity) if n is None else min(n, count, capacity)
+            points = []
+            for i in range(count - size, count):
+                offset = (i % capacity) * SLOT_FIELDS
+                points.append((slots[offset], slots[offset + 1]))
+            if control[0] == seq:
+                return points
+        raise RuntimeError(f"series {self.path} is being rewritten continuously")
+
+    def last(self):
+        points = self.latest(1)
+        return points[0] if points else None
+
+    def close(self):
+        for name in ('_control', '_slots', '_view'):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self._map.close()
+        self._file.close()
+
+
+def open_series(metric: str, symbol: str, writable: bool = False, capacity: int = DEFAULT_CAPACITY) -> RingSeries:
+    """打开某只股票某个指标的序列（写入时不存在则创建）"""
+    return RingSeries(series_path(metric, symbol), writable=writable, capacity=capacity)
+
+
+def append_points(metric: str, points: dict, ts: float):
+    """抓取任务批量写入同一时刻的数值 {symbol: value}（跳过 None）"""
+    for symbol, value in points.items():
+        if value is None:
+            continue
+        series = open_series(metric, symbol, writable=True)
+        try:
+            series.append(ts, float(value))
+        finally:
+            series.close()
+
+
+class SeriesReader:
+    """只读序列的缓存（Web 服务用）：映射保持打开，文件被替换时重新映射"""
+
+    def __init__(self):
+        self._series = {}
+
+    def get(self, metric: str, symbol: str):
+        """返回 RingSeries，序列文件不存在时返回 None"""
+        path = series_path(metric, symbol)
+        try:
+            inode = path.stat().st_ino
+        except FileNotFoundError:
+            return None
+        series = self._series.get(path)
+        if series is None or series.inode != inode:
+            # 旧映射可能仍在其他线程中读取，不主动关闭，由垃圾回收释放
+            series = self._series[path] = RingSeries(path)
+        return series
+
+    def latest(self, metric: str, symbol: str, n: int = None) -> list:
+        series = self.get(metric, symbol)
+        return series.latest(n) if series is not None else []
@@ -0,0 +1,116 @@
+"""股票池注册表 - 各抓取模块在运行时从配置解析要抓取的股票
+
+配置文件默认为 config/universe.json，可用环境变量 UNIVERSE_FILE 指向部署自己的文件：
+- sections：报告板块 -> {data: 数据类型, symbols: [...], include: [其他板块]}
+- aliases：股票代码别名（如 VIX -> ^VIX），解析时统一为规范代码
+
+同一数据类型的各板块合并去重为一份抓取计划（fetch_plan），每只股票每种数据
+只抓取一次，再按板块归属分发结果。
+"""
+
+import os
+from pathlib import Path
+
+from src.utils.jsonio import read_json
+
+# 路径配置
+BASE_DIR = Path(__file__).parent.parent.parent
+UNIVERSE_FILE = BASE_DIR / 'config' / 'universe.json'
+
+# 指定配置文件的环境变量
+UNIVERSE_ENV = 'UNIVERSE_FILE'
+
+# 支持的数据类型：options 为期权链，info 为 yfinance 基本信息（评级 / hover 共用），
+# quotes 为盘前行情轮询（分钟线）
+DATA_TYPES = ('options', 'info', 'quotes')
+
+_universe = None
+
+
+class Universe:
+    """解析后的股票池：各板块的股票列表（已规范化、去重、展开 include）"""
+
+    def __init__(self, config: dict):
+        self.aliases = {k.upper(): v.upper() for k, v in config.get('aliases', {}).items()}
+        self.config = config.get('sections', {})
+        self.sections = {}
+        for name in self.config:
+            self._resolve(name, ())
+
+    def normalize(self, symbol: str) -> str:
+        """规范化股票代码（大写、去空白、别名映射）"""
+        symbol = symbol.strip().upper()
+        return self.aliases.get(symbol, symbol)
+
+    def _resolve(self, name: str, stack: tuple) -> list:
+        if name in self.sections:
+            return self.sections[name]
+        if name not in self.config:
+            raise ValueError(f"unknown universe section: {name}")
+        if name in stack:
+            raise ValueError(f"circular include: {' -> '.join(stack + (name,))}")
+        section = self.config[name]
+        if section.get('data') not in DATA_TYPES:
+            raise ValueError(f"section {name}: data must be one of {', '.join(DATA_TYPES)}")
+
+        symbols = []
+        for included in section.get('include', []):
+            symbols.extend(self._resolve(included, stack + (name,)))
+        symbols.extend(self.normalize(s) for s in section.get('symbols', []))
+        self.sections[name] = list(dict.fromkeys(symbols))
+        return self.sections[name]
+
+    def symbols(self, section: str) -> list:
+        """某个板块的股票列表"""
+        if section not in self.sections:
+            raise ValueError(f"unknown universe section: {section}")
+        return list(self.sections[section])
+
+    def sections_for(self, data_type: str) -> list:
+        """使用某种数据的板块名"""
+        return [name for name, section in self.config.items() if section['data'] == data_type]
+
+    def fetch_plan(self) -> dict:
+        """数据类型 -> 去重后的股票列表（按板块顺序）"""
+        plan = {}
+        for data_type in DATA_TYPES:
+            symbols = [s for name in self.sections_for(data_type) for s in self.sections[name]]
+            plan[data_type] = list(dict.fromkeys(symbols))
+        return plan
+
+
+def universe_path() -> Path:
+    return Path(os.environ.get(UNIVERSE_ENV) or UNIVERSE_FILE)
+
+
+def load_universe(path: Path = None) -> Universe:
+    """读取并解析股票池配置"""
+    path = Path(path) if path else universe_path()
+    if not path.exists():
+        raise FileNotFoundError(f"universe config not found: {path}")
+    return Universe(read_json(path))
+
+
+def get_universe() -> Universe:
+    """当前进程的股票池（首次调用时加载）"""
+    global _universe
+    if _universe is None:
+        _universe = load_universe()
+    return _universe
+
+
+def symbols(section: str) -> list:
+    return get_universe().symbols(section)
+
+
+def fetch_plan() -> dict:
+    return get_universe().fetch_plan()
+
+
+if __name__ == '__main__':
+    universe = get_universe()
+    print(f"Universe: {universe_path()}")
+    for name, section_symbols in universe.sections.items():
+        print(f"  {name:<16} {universe.config[name]['data']:<8} {len(section_symbols):3d} symbols")
+    for data_type, plan_symbols in universe.fetch_plan().items():
+        print(f"Fetch plan {data_type}: {len(plan_symbols)} symbols")
@@ -0,0 +1,35 @@
+"""归档：不再有报告的月份页经发布器下线，manifest 中不留记录"""
+
+import pytest
+
+from src.generators import archive, publish
+from src.utils.jsonio import read_json
+
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    out = tmp_path / 'output'
+    out.mkdir()
+    monkeypatch.setattr(publish, 'OUTPUT_DIR', out)
+    monkeypatch.setattr(publish, 'RELEASES_DIR', out / 'releases')
+    monkeypatch.setattr(publish, 'MANIFEST_FILE', out / 'manifest.json')
+    monkeypatch.setattr(publish, 'LOCK_FILE', out / '.manifest.lock')
+    monkeypatch.setattr(archive, 'OUTPUT_DIR', out)
+    monkeypatch.setattr(archive, 'STATE_FILE', tmp_path / 'archive_index.json')
+    return out
+
+
+def test_empty_month_is_unpublished(output):
+    for name in ('2026-09-30-daily.html', '2026-10-01-daily.html'):
+        (output / name).write_text('<html></html>')
+    archive.update_archive()
+    assert 'archive/2026-09.html' in read_json(publish.MANIFEST_FILE)['files']
+
+    (output / '2026-09-30-daily.html').unlink()
+    archive.update_archive(rebuild=True)
+
+    files = read_json(publish.MANIFEST_FILE)['files']
+    assert 'archive/2026-09.html' not in files
+    assert 'archive/2026-09.html.gz' not in files
+    assert not (output / 'archive' / '2026-09.html').exists()
+    assert 'archive/2026-10.html' in files
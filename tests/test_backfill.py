@@ -0,0 +1,55 @@
+"""历史报告重建：快照和模板都没有变化且日报仍在时跳过，渲染结果未变的页面不重新发布"""
+
+import pytest
+
+from src.generators import backfill, build, history, publish
+
+
+def snapshot(date: str, pc_ratio: float = 0.8) -> dict:
+    files = {name: {} for name in build.REPORT_FILES}
+    files['options.json'] = {'market_overview': {'pc_ratio': pc_ratio}}
+    return {'date': date, 'files': files}
+
+
+@pytest.fixture
+def output(tmp_path, monkeypatch):
+    out = tmp_path / 'output'
+    monkeypatch.setattr(history, 'HISTORY_DIR', tmp_path / 'history')
+    monkeypatch.setattr(backfill, 'OUTPUT_DIR', out)
+    monkeypatch.setattr(backfill, 'STATE_FILE', tmp_path / 'backfill_state.json')
+    monkeypatch.setattr(build, 'OUTPUT_DIR', out)
+    monkeypatch.setattr(publish, 'OUTPUT_DIR', out)
+    monkeypatch.setattr(publish, 'RELEASES_DIR', out / 'releases')
+    monkeypatch.setattr(publish, 'MANIFEST_FILE', out / 'manifest.json')
+    monkeypatch.setattr(publish, 'LOCK_FILE', out / '.manifest.lock')
+    for date in ('2026-10-15', '2026-10-16'):
+        history.save_snapshot(date, snapshot(date))
+    return out
+
+
+def test_unchanged_dates_are_skipped(output):
+    result = backfill.backfill(workers=1)
+    assert result['rendered'] == ['2026-10-15', '2026-10-16']
+    assert result['published'] == ['2026-10-15', '2026-10-16']
+    assert (output / '2026-10-16-daily.html').exists()
+
+    result = backfill.backfill(workers=1)
+    assert result == {'rendered': [], 'published': [], 'skipped': ['2026-10-15', '2026-10-16']}
+
+
+def test_changed_or_missing_dates_are_rerendered(output):
+    backfill.backfill(workers=1)
+
+    history.save_snapshot('2026-10-15', snapshot('2026-10-15', pc_ratio=1.2))
+    (output / '2026-10-16-daily.html').unlink()
+    result = backfill.backfill(workers=1)
+    assert result['rendered'] == ['2026-10-15', '2026-10-16']
+    assert result['published'] == ['2026-10-15', '2026-10-16']
+
+
+def test_forced_render_with_same_output_is_not_published(output):
+    backfill.backfill(workers=1)
+
+    result = backfill.backfill(workers=1, force=True)
+    assert result['rendered'] == ['2026-10-15', '2026-10-16']
+    assert result['published'] == []
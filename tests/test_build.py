@@ -0,0 +1,79 @@
+"""合并日报：输入和模板都没有变化的 Tab 片段不重新渲染和发布"""
+
+import pytest
+
+from src.generators import build
+from src.utils import metrics
+from src.utils.jsonio import write_json
+
+TODAY = '2026-10-19'
+
+
+def make_inputs(**files) -> dict:
+    data = {name: {} for name in build.REPORT_FILES}
+    data.update(files)
+    return {
+        'date': TODAY,
+        'files': data,
+        'update_times': {},
+        'changes': {'changed_sections': [], 'has_previous': False},
+        'tooltip_news': {},
+    }
+
+
+@pytest.fixture
+def published(tmp_path, monkeypatch):
+    """把片段指纹和 manifest 指向临时目录，返回"发布"一组指纹的函数"""
+    monkeypatch.setattr(build, 'FRAGMENT_STATE_FILE', tmp_path / 'fragment_state.json')
+    monkeypatch.setattr(build, 'MANIFEST_FILE', tmp_path / 'manifest.json')
+
+    def publish(fingerprints: dict):
+        write_json(build.FRAGMENT_STATE_FILE, fingerprints)
+        write_json(build.MANIFEST_FILE, {'files': dict.fromkeys(fingerprints, {})})
+
+    return publish
+
+
+def test_only_changed_fragments_are_rerendered(published):
+    env = build.get_environment()
+    before = make_inputs(**{'options.json': {'market_overview': {'pc_ratio': 0.8}}})
+    published(build.fragment_fingerprints(env, before))
+
+    after = make_inputs(**{'options.json': {'market_overview': {'pc_ratio': 1.2}}})
+    skip = build.unchanged_fragments(build.fragment_fingerprints(env, after))
+    pages = build.render_combined(env, after, metrics.StageTimer('test'), skip)
+
+    assert skip == {f'fragments/{TODAY}/premarket.html', f'fragments/{TODAY}/tooltips.json'}
+    assert set(pages) == {f'fragments/{TODAY}/options.html', f'{TODAY}-daily.html'}
+
+
+def test_fragments_missing_from_manifest_are_rerendered(published):
+    env = build.get_environment()
+    inputs = make_inputs()
+    fingerprints = build.fragment_fingerprints(env, inputs)
+    published(fingerprints)
+    write_json(build.MANIFEST_FILE, {'files': {}})
+
+    assert build.unchanged_fragments(fingerprints) == set()
+
+
+def test_stale_marker_changes_fingerprint():
+    env = build.get_environment()
+    fresh = build.fragment_fingerprints(env, make_inputs(**{'options.json': {'date': TODAY}}))
+    stale = build.fragment_fingerprints(env, make_inputs(**{'options.json': {'date': TODAY, '_meta': {'stale': True}}}))
+
+    assert fresh[f'fragments/{TODAY}/options.html'] != stale[f'fragments/{TODAY}/options.html']
+
+
+def test_old_snapshot_without_newer_files_renders():
+    env = build.get_environment()
+    inputs = {
+        'date': TODAY,
+        'files': {'calendar.json': {}, 'earnings.json': {}, 'ratings.json': {},
+                  'news.json': {}, 'stock_info.json': {}, 'options.json': {}},
+    }
+
+    pages = build.render_combined(env, inputs, metrics.StageTimer('test'))
+
+    assert f'fragments/{TODAY}/options.html' in pages
+    assert f'{TODAY}-daily.html' in pages
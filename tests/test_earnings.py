@@ -0,0 +1,103 @@
+"""财报日历：增量合并与改期移除、抓取窗口规划，市值只为报告会显示的公司查询"""
+
+from datetime import datetime
+
+import pytest
+
+from src.scrapers import base, earnings
+
+
+def event(symbol: str, date: str, revenue: float = None, market_cap: float = None) -> dict:
+    return {'symbol': symbol, 'date': date, 'revenue_estimate': revenue, 'market_cap': market_cap}
+
+
+@pytest.fixture
+def lookups(tmp_path, monkeypatch):
+    """yfinance 查询由测试控制：ETF 没有市值，其他股票市值为 1e9"""
+    monkeypatch.setattr(base, 'HEALTH_FILE', tmp_path / 'source_health.json')
+    calls = []
+
+    def fetch_info(scraper, symbols, ttl):
+        calls.append(list(symbols))
+        return {s: ({} if s.startswith('ETF') else {'marketCap': 1e9}) for s in symbols}, {}
+
+    monkeypatch.setattr(earnings, 'fetch_info', fetch_info)
+    return calls
+
+
+def fetched(symbol: str, date: str, **fields) -> dict:
+    return {'symbol': symbol, 'date': date, **fields}
+
+
+def test_merge_updates_and_removes_rescheduled():
+    events = {}
+    counts = earnings.merge_events(events, [
+        fetched('A', '2026-10-19', epsEstimate=1.0), fetched('B', '2026-10-19'), fetched('C', '2026-10-20'),
+    ], '2026-10-19', '2026-10-26')
+    assert counts == {'added': 3, 'updated': 0, 'removed': 0}
+    events['A|2026-10-19']['market_cap'] = 1e9
+
+    counts = earnings.merge_events(events, [
+        fetched('A', '2026-10-19', epsActual=1.2), fetched('B', '2026-10-19'),
+    ], '2026-10-19', '2026-10-26')
+    assert counts == {'added': 0, 'updated': 1, 'removed': 1}
+    assert set(events) == {'A|2026-10-19', 'B|2026-10-19'}
+    a = events['A|2026-10-19']
+    assert (a['eps_estimate'], a['eps_actual'], a['eps_surprise_pct'], a['market_cap']) == (1.0, 1.2, 20.0, 1e9)
+
+
+def test_incomplete_fetch_removes_nothing():
+    events = {}
+    earnings.merge_events(events, [fetched(s, '2026-10-20') for s in 'ABCD'] + [fetched('OLD', '2026-10-01')],
+                          '2026-10-01', '2026-10-26')
+
+    counts = earnings.merge_events(events, [fetched('A', '2026-10-20')], '2026-10-19', '2026-10-26')
+    assert counts['removed'] == 0 and counts['kept'] == 3
+    assert len(events) == 5
+
+    counts = earnings.merge_events(events, [], '2026-10-19', '2026-10-26')
+    assert counts['kept'] == 4
+    assert len(events) == 5
+
+
+def test_plan_window_full_refresh_when_stale():
+    today = datetime(2026, 10, 19, 8, 0)
+    full = ('2026-10-16', '2026-11-02', True)
+    assert earnings.plan_window({}, today) == full
+
+    store = {'full_refreshed_at': '2026-10-19 06:00:00', 'window_end': '2026-11-02'}
+    assert earnings.plan_window(store, today) == ('2026-10-16', '2026-10-19', False)
+    assert earnings.plan_window(store, today, full=True) == full
+    assert earnings.plan_window({**store, 'full_refreshed_at': '2026-10-18 19:00:00'}, today) == full
+    assert earnings.plan_window({**store, 'window_end': '2026-10-18'}, today) == full
+
+
+def test_candidates_limited_to_displayed_companies(monkeypatch):
+    monkeypatch.setattr(earnings, 'TODAY_LIMIT', 2)
+    monkeypatch.setattr(earnings, 'WEEK_AHEAD_PER_DAY', 1)
+    events = {f'{e["symbol"]}|{e["date"]}': e for e in [
+        event('A', '2026-10-19', 30), event('B', '2026-10-19', 20), event('C', '2026-10-19', 10),
+        event('D', '2026-10-20', 5), event('E', '2026-10-20', 50),
+        event('F', '2026-10-21', 99, market_cap=1e12),
+        event('G', '2026-11-30', 99),
+    ]}
+    assert earnings.cap_candidates(events, '2026-10-19', '2026-10-26') == ['A', 'B', 'E']
+
+
+def test_misses_are_not_retried(lookups):
+    store = {'events': {'ETF1|2026-10-19': event('ETF1', '2026-10-19'),
+                        'MSFT|2026-10-19': event('MSFT', '2026-10-19')}}
+    assert earnings.fill_market_caps(store, '2026-10-19', '2026-10-26')
+    assert lookups == [['ETF1', 'MSFT']]
+    assert store['events']['MSFT|2026-10-19']['market_cap'] == 1e9
+    assert set(store['cap_misses']) == {'ETF1'}
+
+    assert not earnings.fill_market_caps(store, '2026-10-19', '2026-10-26')
+    assert lookups == [['ETF1', 'MSFT']]
+
+
+def test_expired_misses_are_retried(lookups):
+    store = {'events': {'ETF1|2026-10-19': event('ETF1', '2026-10-19')},
+             'cap_misses': {'ETF1': 0}}
+    assert earnings.fill_market_caps(store, '2026-10-19', '2026-10-26')
+    assert lookups == [['ETF1']]
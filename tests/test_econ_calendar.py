@@ -0,0 +1,77 @@
+"""财经日历：只能提供当天事件的数据源在同一周内每天都要重新抓取"""
+
+from datetime import datetime
+
+import pytest
+
+from src.scrapers import base, econ_calendar
+from src.scrapers.base import Scraper
+from src.scrapers.calendar_sources import InvestingSource, make_event
+
+
+@pytest.fixture
+def calendar(tmp_path, monkeypatch):
+    """把数据文件指向临时目录，时钟和 Investing.com 页面都由测试控制"""
+    monkeypatch.setattr(base, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(base, 'HEALTH_FILE', tmp_path / 'source_health.json')
+    monkeypatch.setattr(econ_calendar, 'WEEK_FILE', tmp_path / 'econ_calendar_week.json')
+
+    clock = {'now': None}
+    calls = []
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock['now']
+
+    def fetch(self, scraper, start, end):
+        today = clock['now'].strftime('%Y-%m-%d')
+        calls.append(today)
+        return [make_event(today, '08:30', f'Report for {today}', self.name, impact='high')]
+
+    monkeypatch.setattr(econ_calendar, 'datetime', FrozenDatetime)
+    monkeypatch.setattr(InvestingSource, 'fetch', fetch)
+
+    def run(moment: str) -> dict:
+        clock['now'] = datetime.strptime(moment, '%Y-%m-%d %H:%M')
+        return econ_calendar.fetch_calendar(Scraper('calendar', source='calendar'), source_names=('investing',))
+
+    return run, calls
+
+
+def test_day_only_source_is_fetched_each_day_of_the_week(calendar):
+    run, calls = calendar
+
+    monday = run('2026-10-19 06:00')
+    tuesday = run('2026-10-20 06:00')
+
+    assert [e['event'] for e in monday['us_events']] == ['Report for 2026-10-19']
+    assert [e['event'] for e in tuesday['us_events']] == ['Report for 2026-10-20']
+    assert calls == ['2026-10-19', '2026-10-20']
+
+
+def test_day_only_source_is_fetched_once_per_day(calendar):
+    run, calls = calendar
+
+    run('2026-10-20 06:00')
+    later = run('2026-10-20 07:00')
+
+    assert [e['event'] for e in later['us_events']] == ['Report for 2026-10-20']
+    assert calls == ['2026-10-20']
+
+
+def test_pending_actuals_only_recent_data_releases():
+    def event(time, name, **values):
+        return make_event('2026-10-20', time, name, 'finnhub', **values)
+
+    events = {e['event']: e for e in [
+        event('08:30', 'CPI m/m', estimate='0.3%', prev='0.4%'),
+        event('08:30', 'Initial Jobless Claims', estimate='220K', actual='215K'),
+        event('09:00', 'Fed Chair Speaks'),
+        event('06:00', 'Early Release', prev='1.0%'),
+        event('11:00', 'Later Release', estimate='2.0%'),
+    ]}
+
+    pending = econ_calendar.pending_actuals(events, datetime(2026, 10, 20, 9, 15))
+
+    assert [e['event'] for e in pending] == ['CPI m/m']
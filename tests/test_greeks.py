@@ -0,0 +1,45 @@
+"""向量化 IV 求解：Newton 与二分法兜底都能还原定价用的波动率，无效报价返回 NaN"""
+
+import numpy as np
+import pytest
+
+from src.analyzers import greeks
+
+SPOT = 100.0
+STRIKES = np.array([80.0, 95.0, 100.0, 105.0, 130.0, 80.0, 100.0, 130.0])
+IS_CALL = np.array([True, True, True, True, True, False, False, False])
+T = np.array([0.02, 0.1, 0.25, 0.5, 1.0, 0.25, 0.5, 2.0])
+SIGMAS = np.array([0.8, 0.35, 0.2, 0.25, 0.6, 0.3, 0.45, 0.5])
+
+
+def prices() -> np.ndarray:
+    return greeks.bs_price(SPOT, STRIKES, T, greeks.RISK_FREE_RATE, SIGMAS, IS_CALL)
+
+
+def test_newton_recovers_volatility():
+    iv = greeks.implied_volatility(prices(), SPOT, STRIKES, T, IS_CALL)
+    np.testing.assert_allclose(iv, SIGMAS, atol=1e-3)
+
+
+def test_bisection_fallback_recovers_volatility(monkeypatch):
+    monkeypatch.setattr(greeks, 'NEWTON_ITERATIONS', 0)
+    iv = greeks.implied_volatility(prices(), SPOT, STRIKES, T, IS_CALL)
+    np.testing.assert_allclose(iv, SIGMAS, atol=1e-3)
+
+
+def test_invalid_quotes_are_nan():
+    price = np.array([19.0, 0.001, SPOT + 1, 5.0])
+    strike = np.array([80.0, 200.0, 100.0, 100.0])
+    t = np.array([0.25, 0.25, 0.25, 0.0])
+    iv = greeks.implied_volatility(price, SPOT, strike, t, np.ones(4, dtype=bool))
+    # 低于内在价值、时间价值不足一个报价单位、高于现价、已到期
+    assert np.isnan(iv).all()
+
+
+def test_put_call_delta_parity():
+    strike, t, sigma = np.array([90.0, 110.0]), np.array([0.25, 0.25]), np.array([0.3, 0.3])
+    calls = greeks.compute_greeks(SPOT, strike, t, sigma, np.array([True, True]))
+    puts = greeks.compute_greeks(SPOT, strike, t, sigma, np.array([False, False]))
+    np.testing.assert_allclose(calls['delta'] - puts['delta'], 1.0)
+    np.testing.assert_allclose(calls['gamma'], puts['gamma'])
+    assert calls['gamma'][0] > 0 and calls['vega'][1] > 0
@@ -0,0 +1,70 @@
+"""实时数据：同一 worker 的请求共用 yfinance 熔断器，失败计数写回 source_health.json"""
+
+import threading
+
+import pytest
+
+from src.scrapers import base
+from src.scrapers.base import CircuitBreaker, CircuitOpenError, DeadlineExceeded
+from src.server import live
+from src.utils.jsonio import read_json
+
+
+@pytest.fixture
+def health(tmp_path, monkeypatch):
+    """熔断状态写到临时目录，每个测试使用全新的共享熔断器和调用名额"""
+    health_file = tmp_path / 'source_health.json'
+    monkeypatch.setattr(base, 'HEALTH_FILE', health_file)
+    monkeypatch.setattr(live, 'breaker', CircuitBreaker('yfinance'))
+    monkeypatch.setattr(live, '_pending_calls', threading.BoundedSemaphore(live.MAX_PENDING_CALLS))
+    return health_file
+
+
+def failing():
+    raise ConnectionError('upstream down')
+
+
+def test_failures_accumulate_across_requests(health):
+    for _ in range(base.FAILURE_THRESHOLD - 1):
+        with pytest.raises(ConnectionError):
+            live.upstream(live.make_scraper(), 'fast_info', failing)
+    assert read_json(health)['yfinance']['failures'] == base.FAILURE_THRESHOLD - 1
+
+    with pytest.raises(ConnectionError):
+        live.upstream(live.make_scraper(), 'fast_info', failing)
+    with pytest.raises(CircuitOpenError):
+        live.upstream(live.make_scraper(), 'fast_info', lambda: {})
+    assert read_json(health)['yfinance']['opened_until'] > 0
+
+
+def test_success_resets_persisted_failures(health):
+    with pytest.raises(ConnectionError):
+        live.upstream(live.make_scraper(), 'fast_info', failing)
+    assert live.upstream(live.make_scraper(), 'fast_info', lambda: {'lastPrice': 1.0}) == {'lastPrice': 1.0}
+    assert read_json(health)['yfinance']['failures'] == 0
+
+
+def test_circuit_opened_by_scrapers_applies(health):
+    scraper_breaker = CircuitBreaker('yfinance')
+    for _ in range(base.FAILURE_THRESHOLD):
+        scraper_breaker.record_failure(ConnectionError('upstream down'))
+    with pytest.raises(CircuitOpenError):
+        live.upstream(live.make_scraper(), 'fast_info', lambda: {})
+
+
+def test_timed_out_calls_hold_their_slot(health, monkeypatch):
+    monkeypatch.setattr(live, 'CALL_TIMEOUT', 0.05)
+    monkeypatch.setattr(live, '_pending_calls', threading.BoundedSemaphore(1))
+    stuck = threading.Event()
+
+    with pytest.raises(DeadlineExceeded):
+        live.upstream(live.make_scraper(), 'fast_info', stuck.wait)
+    with pytest.raises(live.UpstreamBusy):
+        live.upstream(live.make_scraper(), 'fast_info', lambda: {})
+
+    stuck.set()
+    for _ in range(100):
+        if live._pending_calls.acquire(timeout=0.05):
+            live._pending_calls.release()
+            break
+    assert live.upstream(live.make_scraper(), 'fast_info', lambda: {'ok': True}) == {'ok': True}
@@ -0,0 +1,63 @@
+"""新闻分析：按内容哈希缓存摘要，失败的批次只影响自身"""
+
+import pytest
+
+from src.analyzers import news_analyzer
+from src.analyzers.backends import HeuristicBackend
+from src.utils.jsonio import write_json
+
+
+class CountingBackend(HeuristicBackend):
+    """启发式后端，记录每批请求的新闻条数；fail 中的标题所在批次抛出异常"""
+
+    def __init__(self, fail: tuple = ()):
+        self.batches = []
+        self.fail = fail
+
+    def summarize_news(self, batch, timeout=news_analyzer.CHUNK_TIMEOUT):
+        self.batches.append(len(batch))
+        if any(news['headline'] in self.fail for _, news in batch):
+            raise RuntimeError('backend failed')
+        return super().summarize_news(batch, timeout)
+
+
+@pytest.fixture
+def news(tmp_path, monkeypatch):
+    """12 条互不相同的新闻（不聚类），数据和缓存文件都在临时目录"""
+    monkeypatch.setattr(news_analyzer, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(news_analyzer, 'CACHE_FILE', tmp_path / 'analysis_cache.json')
+    headlines = [
+        'Apple unveils new iPhone lineup', 'Tesla recalls sedans over brakes', 'Nvidia beats chip revenue forecasts',
+        'Boeing delays jet deliveries again', 'Pfizer wins vaccine approval', 'Walmart raises holiday outlook',
+        'Chevron expands Permian drilling', 'Netflix adds record subscribers', 'Intel cuts factory spending',
+        'Oracle signs cloud deal with bank', 'Adobe launches design assistant', 'Cisco acquires security startup',
+    ]
+    write_json(tmp_path / 'news.json', {'news': [
+        {'id': i, 'headline': h, 'summary': f'story {i}', 'related': ''} for i, h in enumerate(headlines)
+    ]})
+    return headlines
+
+
+def test_summaries_are_batched_and_cached(news):
+    first = CountingBackend()
+    result = news_analyzer.analyze_news(first)
+    assert first.batches == [5, 5, 2]
+    assert result['stats']['news_requested'] == 12
+    assert len(result['core_news']) == news_analyzer.CORE_NEWS_COUNT
+
+    second = CountingBackend()
+    result = news_analyzer.analyze_news(second)
+    assert second.batches == []
+    assert result['stats'] == {'news_cached': 12, 'news_requested': 0, 'failed_chunks': 0}
+
+
+def test_failed_batch_falls_back_to_headlines(news):
+    backend = CountingBackend(fail=(news[0],))
+    result = news_analyzer.analyze_news(backend)
+
+    assert result['stats']['failed_chunks'] == 1
+    assert result['core_news'][0] == news_analyzer.default_news_item({'headline': news[0]})
+
+    retry = CountingBackend()
+    news_analyzer.analyze_news(retry)
+    assert retry.batches == [5]
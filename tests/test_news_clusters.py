@@ -0,0 +1,56 @@
+"""新闻聚类：近似重复的报道归入同一事件，事件 ID 跨次运行保持不变"""
+
+from src.analyzers import news_clusters
+from src.analyzers.news_clusters import NewsIndex, cluster_news, minhash, similarity, tokenize
+
+NEWS = [
+    {'id': 1, 'headline': 'Fed holds interest rates steady, signals two cuts later this year',
+     'summary': 'Federal Reserve policymakers kept the benchmark rate unchanged.', 'related': ''},
+    {'id': 2, 'headline': 'Fed holds rates steady and signals two cuts later this year',
+     'summary': 'Federal Reserve policymakers kept the benchmark rate unchanged on Wednesday.', 'related': ''},
+    {'id': 3, 'headline': 'Nvidia unveils next-generation AI chips at developer conference',
+     'summary': 'The chipmaker showed its new accelerator lineup.', 'related': 'NVDA'},
+    {'id': 4, 'headline': 'Oil prices slide as OPEC output rises',
+     'summary': 'Crude futures fell for a third session.', 'related': 'XOM,CVX'},
+]
+
+
+def test_signature_similarity_tracks_jaccard():
+    same = minhash(tokenize(NEWS[0]))
+    assert similarity(same, minhash(tokenize(NEWS[0]))) == 1.0
+    assert similarity(same, minhash(tokenize(NEWS[1]))) >= news_clusters.SIMILARITY_THRESHOLD
+    assert similarity(same, minhash(tokenize(NEWS[2]))) < news_clusters.SIMILARITY_THRESHOLD
+
+
+def test_near_duplicates_form_one_event():
+    events = cluster_news(NEWS)
+
+    assert len(events) == 3
+    fed = events[0]
+    assert fed['members'] == [0, 1] and fed['size'] == 2 and fed['lead'] == 0
+
+
+def test_watched_symbols_rank_events():
+    events = cluster_news(NEWS[2:], watched={'NVDA'})
+    assert [e['lead'] for e in events] == [0, 1]
+
+    events = cluster_news(NEWS[2:], watched={'XOM', 'CVX'})
+    assert [e['lead'] for e in events] == [1, 0]
+
+
+def test_event_ids_are_stable_across_runs(tmp_path):
+    path = tmp_path / 'news_index.json'
+    index = NewsIndex.load(path)
+    first = {e['event_id']: e['members'] for e in cluster_news(NEWS[:1] + NEWS[2:], index=index)}
+    index.save(path)
+
+    # 下一次运行：同一事件的新报道归入已有事件
+    second = cluster_news(NEWS[1:2], index=NewsIndex.load(path))
+    assert second[0]['event_id'] in first
+    assert second[0]['event_id'] == str(NEWS[0]['id'])
+
+
+def test_watched_symbols_come_from_universe_watchlist():
+    watched = news_clusters.watched_symbols()
+    assert {'AAPL', 'SPY', '^VIX'} <= watched
+    assert 'ES=F' not in watched
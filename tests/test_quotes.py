@@ -0,0 +1,48 @@
+"""盘前行情：前收盘价取前一交易日常规时段的最后一根分钟线"""
+
+import pandas as pd
+
+from src.scrapers import quotes
+
+
+def make_bars(rows: list) -> pd.DataFrame:
+    """rows 为 (美东时间, 收盘价, 成交量)，索引与 yf.download 一样为 UTC"""
+    index = pd.DatetimeIndex([t for t, _, _ in rows]).tz_localize(quotes.MARKET_TZ).tz_convert('UTC')
+    return pd.DataFrame({'Close': [c for _, c, _ in rows], 'Volume': [v for _, _, v in rows]}, index=index)
+
+
+def test_prev_close_ignores_after_hours():
+    bars = make_bars([
+        ('2026-10-15 15:59', 100.0, 500),
+        ('2026-10-15 17:30', 101.0, 50),
+        ('2026-10-16 08:00', 102.0, 10),
+        ('2026-10-16 08:01', 103.0, None),
+        ('2026-10-16 08:02', None, 30),
+    ])
+    quote, points = quotes.parse_bars('SPY', bars)
+
+    assert quote['prev_close'] == 100.0
+    assert quote['price'] == 103.0
+    assert (quote['change'], quote['change_pct']) == (3.0, 3.0)
+    assert quote['volume'] == 10
+    assert (quote['time'], quote['session'], quote['label']) == ('08:01', 'pre', 'S&P 500')
+    assert [p[1:] for p in points] == [(100.0, 500.0), (101.0, 50.0), (102.0, 10.0), (103.0, 0.0)]
+
+
+def test_prev_close_falls_back_without_regular_session():
+    bars = make_bars([
+        ('2026-10-15 18:00', 5800.0, 1),
+        ('2026-10-15 23:59', 5810.0, 1),
+        ('2026-10-16 07:00', 5790.0, 1),
+    ])
+    quote, _ = quotes.parse_bars('ES=F', bars)
+    assert quote['prev_close'] == 5810.0
+
+
+def test_single_day_has_no_prev_close():
+    quote, _ = quotes.parse_bars('QQQ', make_bars([('2026-10-16 10:00', 480.0, 100)]))
+    assert quote['prev_close'] is None
+    assert quote['change'] is None and quote['change_pct'] is None
+    assert quote['session'] == 'regular'
+
+    assert quotes.parse_bars('QQQ', make_bars([('2026-10-16 10:00', None, 100)])) == (None, [])
@@ -0,0 +1,88 @@
+"""抓取框架：每次调用最多计一次失败，条目级错误不计入数据源熔断"""
+
+import os
+import threading
+
+import pytest
+
+from src.scrapers import base
+from src.scrapers.base import CircuitBreaker, EmptyResponse, Scraper
+from src.utils.jsonio import read_json, write_json
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    monkeypatch.setattr(base, 'HEALTH_FILE', tmp_path / 'source_health.json')
+    monkeypatch.setattr(base, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(base, 'backoff_delay', lambda attempt: 0)
+    return Scraper('test', source='yfinance', retries=2)
+
+
+def failing():
+    raise ConnectionError('upstream down')
+
+
+def test_retries_count_as_one_failure(scraper):
+    with pytest.raises(ConnectionError):
+        scraper.call(failing)
+    assert scraper.calls == 3
+    assert scraper.breaker.failures == 1
+    assert not scraper.breaker.is_open
+
+
+def test_item_errors_do_not_trip_breaker(scraper):
+    for _ in range(base.FAILURE_THRESHOLD + 1):
+        with pytest.raises(EmptyResponse):
+            scraper.call_required(lambda: None)
+        with pytest.raises(KeyError):
+            scraper.call(lambda: {}['missing'])
+    assert scraper.breaker.failures == 0
+    assert scraper.call(lambda: 'ok') == 'ok'
+
+
+def test_breaker_opens_after_threshold_calls(scraper):
+    for _ in range(base.FAILURE_THRESHOLD):
+        with pytest.raises(ConnectionError):
+            scraper.call(failing)
+    with pytest.raises(base.CircuitOpenError):
+        scraper.call(lambda: 'ok')
+    assert read_json(base.HEALTH_FILE)['yfinance']['opened_until'] > 0
+
+
+def test_concurrent_saves_keep_every_source(scraper):
+    breakers = [CircuitBreaker(f'source-{i}') for i in range(8)]
+
+    def save(breaker):
+        for _ in range(20):
+            breaker.save()
+
+    threads = [threading.Thread(target=save, args=(b,)) for b in breakers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert set(read_json(base.HEALTH_FILE)) == {b.source for b in breakers}
+
+
+def test_deadline_stops_waiting_for_hung_call():
+    hung = threading.Event()
+    with pytest.raises(base.DeadlineExceeded):
+        base.call_with_deadline(hung.wait, 0.05)
+    hung.set()
+    assert base.call_with_deadline(lambda x, y=0: x + y, 1, (1,), {'y': 2}) == 3
+
+
+def test_mark_stale_keeps_data_and_mtime(scraper):
+    write_json(scraper.output_file, {'date': '2026-10-16', 'rows': [1, 2],
+                                     '_meta': {'fetched_at': '2026-10-16 08:00:00'}})
+    os.utime(scraper.output_file, (1_000_000, 1_000_000))
+
+    scraper.mark_stale(ConnectionError('upstream down'))
+    scraper.mark_stale(ConnectionError('still down'))
+
+    data = read_json(scraper.output_file)
+    assert data['rows'] == [1, 2]
+    assert data['_meta']['stale'] is True
+    assert data['_meta']['fetched_at'] == '2026-10-16 08:00:00'
+    assert data['_meta']['last_error'] == 'ConnectionError: still down'
+    assert scraper.output_file.stat().st_mtime == 1_000_000
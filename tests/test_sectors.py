@@ -0,0 +1,48 @@
+"""板块汇总：涨跌宽度、市值加权涨跌幅，没有 call 成交量时 P/C 为空"""
+
+import pytest
+
+from src.analyzers import sectors
+
+
+def stock(sector: str, market_cap: float, change_pct) -> dict:
+    return {'sector': sector, 'industry': '', 'market_cap': market_cap, 'change_pct': change_pct}
+
+
+@pytest.fixture
+def grouped():
+    stock_info = {'stocks': {
+        'AAPL': stock('Technology', 300, 2.0),
+        'MSFT': stock('Technology', 100, -2.0),
+        'NVDA': stock('Technology', 50, None),
+        'XOM': stock('Energy', 40, 1.0),
+        'SPY': stock(None, 500, 0.5),
+    }}
+    options = {'stock_options': [
+        {'symbol': 'AAPL', 'call_volume': 100, 'put_volume': 50},
+        {'symbol': 'MSFT', 'call_volume': 100, 'put_volume': 150},
+        {'symbol': 'XOM', 'call_volume': 0, 'put_volume': 20},
+    ]}
+    ratings = {'ratings': [{'symbol': 'AAPL', 'upside_pct': 10}, {'symbol': 'MSFT', 'upside_pct': '20'}]}
+    frame = sectors.build_frame(stock_info, options, ratings)
+    return sectors.aggregate(frame[frame['sector'] != sectors.UNCLASSIFIED])
+
+
+def test_breadth_and_cap_weighting(grouped):
+    tech = {r['sector']: r for r in sectors.to_records(grouped)}['Technology']
+    assert (tech['symbols'], tech['advancing'], tech['declining']) == (3, 1, 1)
+    assert tech['breadth'] == 0.0
+    # NVDA 没有涨跌幅，不计入权重：(300 * 2 - 100 * 2) / 400
+    assert tech['cap_weighted_change'] == 1.0
+    assert tech['market_cap'] == 450
+    assert tech['pc_ratio'] == 1.0
+    assert (tech['avg_upside'], tech['rated']) == (15.0, 2)
+
+
+def test_unclassified_excluded_and_missing_pc_is_none(grouped):
+    records = sectors.to_records(grouped)
+    assert [r['sector'] for r in records] == ['Technology', 'Energy']
+    energy = records[1]
+    assert energy['pc_ratio'] is None
+    assert energy['avg_upside'] is None and energy['rated'] == 0
+    assert energy['cap_weighted_change'] == 1.0
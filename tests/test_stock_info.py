@@ -0,0 +1,34 @@
+"""hover 股票：从报告数据文件和新闻中发现，超出上限时只截掉新闻相关的股票"""
+
+import pytest
+
+from src.scrapers import stock_info
+from src.utils import universe
+from src.utils.jsonio import write_json
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(stock_info, 'DATA_DIR', tmp_path)
+    monkeypatch.setattr(universe, '_universe', universe.Universe({'aliases': {'VIX': '^VIX'}}))
+    write_json(tmp_path / 'options.json', {
+        'index_options': [{'symbol': 'VIX'}, {'symbol': 'SPY'}],
+        'top_25_stocks': [{'symbol': 'aapl'}, {'symbol': 'NVDA'}],
+    })
+    write_json(tmp_path / 'ratings.json', {'recent_changes': [{'symbol': 'TSLA'}, {'symbol': None}]})
+    write_json(tmp_path / 'news.json', {'news': [
+        {'related': 'AMD,NVDA'}, {'related': ['INTC', 'amd']}, {'related': ''},
+    ]})
+    return tmp_path
+
+
+def test_report_symbols_first_then_news(data_dir):
+    assert stock_info.discover_symbols(exclude=['SPY']) == ['^VIX', 'AAPL', 'NVDA', 'TSLA', 'AMD', 'INTC']
+
+
+def test_cap_only_drops_news_symbols(data_dir, monkeypatch):
+    monkeypatch.setattr(stock_info, 'MAX_DISCOVERED', 6)
+    assert stock_info.discover_symbols() == ['^VIX', 'SPY', 'AAPL', 'NVDA', 'TSLA', 'AMD']
+
+    monkeypatch.setattr(stock_info, 'MAX_DISCOVERED', 2)
+    assert stock_info.discover_symbols() == ['^VIX', 'SPY', 'AAPL', 'NVDA', 'TSLA']
@@ -0,0 +1,56 @@
+"""股票新闻倒排索引：未写完的尾行留到下次，日志截断时重建"""
+
+import json
+
+import pytest
+
+from src.analyzers.symbol_index import SymbolNewsIndex, update_symbol_index
+
+
+def line(news_id: int, related: str) -> bytes:
+    return (json.dumps({'id': news_id, 'headline': f'story {news_id}', 'related': related}) + '\n').encode()
+
+
+@pytest.fixture
+def files(tmp_path):
+    return tmp_path / 'news_log.jsonl', tmp_path / 'news_symbol_index.json'
+
+
+def test_partial_tail_line_waits_for_next_update(files):
+    log, index_file = files
+    complete = line(1, 'AAPL') + line(2, 'AAPL,MSFT')
+    partial = line(3, 'AAPL')
+    log.write_bytes(complete + partial[:10])
+
+    assert update_symbol_index(log, index_file) == 2
+    index = SymbolNewsIndex(index_file, log)
+    assert [n['id'] for n in index.lookup('aapl')] == [2, 1]
+
+    with open(log, 'ab') as f:
+        f.write(partial[10:])
+    assert update_symbol_index(log, index_file) == 1
+    assert [n['id'] for n in index.lookup('AAPL', limit=2)] == [3, 2]
+    assert index.symbols() == ['AAPL', 'MSFT']
+
+
+def test_truncated_log_rebuilds_index(files):
+    log, index_file = files
+    log.write_bytes(line(1, 'AAPL') + line(2, 'MSFT') + line(3, 'MSFT'))
+    update_symbol_index(log, index_file)
+
+    log.write_bytes(line(4, 'TSLA'))
+    assert update_symbol_index(log, index_file) == 1
+    index = SymbolNewsIndex(index_file, log)
+    assert index.symbols() == ['TSLA']
+    assert [n['id'] for n in index.lookup('TSLA')] == [4]
+    assert index.lookup('MSFT') == []
+
+
+def test_missing_log_returns_no_news(files):
+    log, index_file = files
+    log.write_bytes(line(1, 'AAPL'))
+    update_symbol_index(log, index_file)
+    log.unlink()
+
+    assert update_symbol_index(log, index_file) == 0
+    assert SymbolNewsIndex(index_file, log).lookup('AAPL') == []
@@ -0,0 +1,96 @@
+"""盘中时间序列：环形缓冲区的追加、覆盖、回绕和 seqlock 读取，以及 /api/series"""
+
+import threading
+
+import pytest
+
+from src.utils import timeseries
+
+
+@pytest.fixture
+def series_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(timeseries, 'SERIES_DIR', tmp_path / 'series')
+    return tmp_path / 'series'
+
+
+def test_append_overwrites_same_timestamp_and_ignores_older(series_dir):
+    series = timeseries.open_series('price', 'SPY', writable=True, capacity=4)
+    assert series.append(100, 1.0)
+    assert series.append(160, 2.0)
+    assert series.append(160, 2.5)
+    assert not series.append(120, 9.0)
+
+    assert len(series) == 2
+    assert series.latest() == [(100, 1.0), (160, 2.5)]
+    assert series.last() == (160, 2.5)
+    series.close()
+
+
+def test_wraps_to_keep_latest_points(series_dir):
+    writer = timeseries.open_series('volume', 'SPY', writable=True, capacity=4)
+    assert writer.extend((ts, ts * 10.0) for ts in range(1, 11)) == 10
+    writer.close()
+
+    reader = timeseries.open_series('volume', 'SPY')
+    assert len(reader) == 4
+    assert reader.latest() == [(7, 70.0), (8, 80.0), (9, 90.0), (10, 100.0)]
+    assert reader.latest(2) == [(9, 90.0), (10, 100.0)]
+    reader.close()
+
+
+def test_reader_never_sees_torn_points(series_dir):
+    writer = timeseries.open_series('price', 'QQQ', writable=True, capacity=8)
+    reader = timeseries.open_series('price', 'QQQ')
+    done = threading.Event()
+
+    def write():
+        for ts in range(1, 5001):
+            writer.append(ts, -ts)
+        done.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    while not done.is_set():
+        points = reader.latest()
+        assert all(value == -ts for ts, value in points)
+        assert [ts for ts, _ in points] == sorted(ts for ts, _ in points)
+    thread.join()
+    assert reader.last() == (5000, -5000)
+    reader.close()
+    writer.close()
+
+
+def test_reader_gives_up_while_write_in_progress(series_dir, monkeypatch):
+    monkeypatch.setattr(timeseries, 'READ_RETRIES', 3)
+    writer = timeseries.open_series('price', 'IWM', writable=True)
+    writer.append(1, 1.0)
+    writer._control[0] += 1
+
+    reader = timeseries.open_series('price', 'IWM')
+    with pytest.raises(RuntimeError):
+        reader.latest()
+    writer._control[0] += 1
+    assert reader.latest() == [(1, 1.0)]
+    reader.close()
+    writer.close()
+
+
+def test_invalid_names_are_rejected(series_dir):
+    with pytest.raises(ValueError):
+        timeseries.series_path('price', '../etc/passwd')
+    with pytest.raises(ValueError):
+        timeseries.series_path('spread', 'SPY')
+    assert timeseries.SeriesReader().latest('price', 'NONE') == []
+
+
+def test_api_series_normalizes_symbol_aliases(series_dir):
+    from src.server import app
+
+    series = timeseries.open_series('price', '^VIX', writable=True)
+    series.append(1_700_000_000, 18.5)
+    series.close()
+
+    result = app.api_series('price', 'vix')
+
+    assert result['symbol'] == '^VIX'
+    assert result['points'] == [(1_700_000_000, 18.5)]
@@ -0,0 +1,49 @@
+"""股票池：代码规范化和别名映射、include 展开去重、循环引用报错"""
+
+import pytest
+
+from src.utils.universe import Universe, load_universe
+
+
+def test_aliases_and_case_are_normalized():
+    universe = Universe({
+        'aliases': {'vix': '^vix'},
+        'sections': {'index_options': {'data': 'options', 'symbols': [' spy ', 'VIX', 'Spy']}},
+    })
+    assert universe.normalize(' Vix') == '^VIX'
+    assert universe.symbols('index_options') == ['SPY', '^VIX']
+
+
+def test_includes_expand_and_fetch_plan_dedupes():
+    universe = Universe({'sections': {
+        'core': {'data': 'options', 'symbols': ['AAPL', 'MSFT']},
+        'stock_options': {'data': 'options', 'include': ['core'], 'symbols': ['TSLA', 'AAPL']},
+        'stock_info': {'data': 'info', 'include': ['core'], 'symbols': ['NVDA']},
+    }})
+    assert universe.symbols('stock_options') == ['AAPL', 'MSFT', 'TSLA']
+    assert universe.fetch_plan() == {
+        'options': ['AAPL', 'MSFT', 'TSLA'],
+        'info': ['AAPL', 'MSFT', 'NVDA'],
+        'quotes': [],
+    }
+
+
+def test_circular_include_is_rejected():
+    with pytest.raises(ValueError, match='circular include: a -> b -> a'):
+        Universe({'sections': {
+            'a': {'data': 'info', 'include': ['b']},
+            'b': {'data': 'info', 'include': ['a']},
+        }})
+
+
+def test_invalid_sections_are_rejected():
+    with pytest.raises(ValueError, match='unknown universe section'):
+        Universe({'sections': {'a': {'data': 'info', 'include': ['missing']}}})
+    with pytest.raises(ValueError, match='data must be one of'):
+        Universe({'sections': {'a': {'data': 'prices'}}})
+
+
+def test_bundled_config_loads(monkeypatch):
+    monkeypatch.delenv('UNIVERSE_FILE', raising=False)
+    plan = load_universe().fetch_plan()
+    assert plan['options'] and plan['info']
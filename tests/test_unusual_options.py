@@ -0,0 +1,56 @@
+"""期权异动基线：窗口已满后同一交易日重复刷新"""
+
+import numpy as np
+
+from src.analyzers.unusual_options import BASELINE_DAYS, Baseline
+
+KEY = 'AAPL|call|200.0'
+
+
+def filled_baseline() -> tuple:
+    """写满 BASELINE_DAYS 天（第 d 天成交量 100 + d），返回 (基线, 行号)"""
+    baseline = Baseline()
+    rows = baseline.rows([KEY])
+    for day in range(1, BASELINE_DAYS + 1):
+        baseline.update(rows, day, np.array([[100 + day, 1000]]))
+    return baseline, rows
+
+
+def test_same_day_refresh_keeps_full_window():
+    baseline, rows = filled_baseline()
+    day = BASELINE_DAYS + 1
+
+    first_mean, first_std, first_days = baseline.update(rows, day, np.array([[500, 1000]]))
+    refresh_mean, refresh_std, refresh_days = baseline.update(rows, day, np.array([[900, 1000]]))
+
+    assert first_days[0] == refresh_days[0] == BASELINE_DAYS
+    np.testing.assert_allclose(refresh_mean, first_mean)
+    np.testing.assert_allclose(refresh_std, first_std)
+    assert first_mean[0, 0] == np.mean([100 + d for d in range(1, BASELINE_DAYS + 1)])
+
+
+def test_next_day_uses_latest_refresh():
+    baseline, rows = filled_baseline()
+    day = BASELINE_DAYS + 1
+    baseline.update(rows, day, np.array([[500, 1000]]))
+    baseline.update(rows, day, np.array([[900, 1000]]))
+
+    mean, _, days = baseline.update(rows, day + 1, np.array([[0, 0]]))
+
+    expected = [100 + d for d in range(2, BASELINE_DAYS + 1)] + [900]
+    assert days[0] == BASELINE_DAYS
+    assert mean[0, 0] == np.mean(expected)
+
+
+def test_refresh_survives_save_and_load(tmp_path):
+    baseline, rows = filled_baseline()
+    day = BASELINE_DAYS + 1
+    first_mean, _, _ = baseline.update(rows, day, np.array([[500, 1000]]))
+    path = tmp_path / 'baseline.npz'
+    baseline.save(path)
+
+    loaded = Baseline.load(path)
+    refresh_mean, _, refresh_days = loaded.update(loaded.rows([KEY]), day, np.array([[900, 1000]]))
+
+    assert refresh_days[0] == BASELINE_DAYS
+    np.testing.assert_allclose(refresh_mean, first_mean)